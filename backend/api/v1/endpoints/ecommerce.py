@@ -1,16 +1,33 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Cookie, Response, Query
-from starlette.status import HTTP_201_CREATED, HTTP_404_NOT_FOUND
+from fastapi import APIRouter, Depends, HTTPException, Cookie, Request, Response, Query
+from starlette.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
 import uuid
 
 from models.ecommerce import (
     Product, ProductCategory, CartItem, ShoppingCart, 
-    Order, OrderItem, Address, Discount, Review
+    Order, OrderItem, Address, Discount, Review, ReviewSummary, ProductImportResult, StockLevel
 )
-from services.ecommerce_service import ECommerceService
+from services.ecommerce_async import AsyncECommerceService
+from services.ecommerce_inventory import InsufficientStockError
+from services.ecommerce_import import IMPORT_FORMATS
+from services.ecommerce_service import IMPORT_BATCH_SIZE
 
 router = APIRouter()
-ecommerce_service = ECommerceService()
+# Store-Zugriffe laufen im Thread-Pool des Service, nicht im Event-Loop
+ecommerce_service = AsyncECommerceService()
+
+
+@router.on_event("startup")
+def start_cart_sweeper() -> None:
+    """Startet das regelmäßige Löschen abgelaufener Warenkörbe"""
+    ecommerce_service.service.start_cart_sweeper()
+
+@router.on_event("shutdown")
+def stop_cart_sweeper() -> None:
+    """Beendet den Aufräum-Thread und den Thread-Pool, vorgemerkte Bestände werden noch übernommen"""
+    ecommerce_service.service.stop_cart_sweeper()
+    ecommerce_service.service.flush_stock_levels()
+    ecommerce_service.shutdown()
 
 # Session-Management-Hilfsfunktionen
 def get_session_id(session_id: Optional[str] = Cookie(None)) -> str:
@@ -29,34 +46,125 @@ def set_session_cookie(response: Response, session_id: str) -> None:
         samesite="lax"
     )
 
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Setzt den Cursor der nächsten Seite als Header, falls es eine gibt"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+def json_page(content: bytes, next_cursor: Optional[str] = None) -> Response:
+    """
+    Gibt bereits kodiertes JSON direkt zurück
+    
+    Die Daten stammen aus den eigenen Stores und werden nicht noch einmal
+    über das response_model validiert; es dient hier nur der API-Doku.
+    """
+    response = Response(content=content, media_type="application/json")
+    set_next_cursor(response, next_cursor)
+    return response
+
 # Produkt-Routen
 @router.get("/produkte", response_model=List[Product], tags=["Produkte"])
 async def get_products(
     skip: int = 0, 
     limit: int = 100,
     category_id: Optional[int] = None,
+    active_only: bool = True,
+    cursor: Optional[str] = None,
+    include_subcategories: bool = False,
+    sort: Optional[str] = Query(None, description="popular: meistverkaufte Produkte zuerst")
+):
+    """Produkte auflisten, optional nach Kategorie filtern
+    
+    Ohne skip wird seitenweise über den Cursor geblättert; der Cursor der
+    nächsten Seite steht im Header X-Next-Cursor. Mit include_subcategories
+    enthält die Liste auch die Produkte aller (mit active_only: aktiven)
+    Unterkategorien. Sortierte Listen (sort) werden über skip/limit geblättert,
+    ein Cursor zusammen mit sort wird mit 400 abgelehnt.
+    """
+    if sort and cursor:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST,
+                            detail="Sortierte Produktlisten unterstützen keinen Cursor, bitte skip/limit verwenden")
+    if sort or (skip and not cursor):
+        try:
+            return await ecommerce_service.get_products(skip, limit, category_id, active_only,
+                                                        include_subcategories, sort)
+        except ValueError as e:
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        content, next_cursor = await ecommerce_service.get_products_page_json(
+            limit, cursor, category_id, active_only, include_subcategories
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return json_page(content, next_cursor)
+
+@router.post("/produkte/import", response_model=ProductImportResult, tags=["Produkte"])
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson oder csv, sonst aus dem Content-Type"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000)
+):
+    """Produkte als NDJSON oder CSV anlegen bzw. anhand der Artikelnummer aktualisieren
+    
+    Der Request-Body wird während des Empfangs zeilenweise gelesen und
+    blockweise validiert und gespeichert, ohne ihn vorher vollständig
+    zwischenzuspeichern. Fehlerhafte Zeilen werden im Ergebnis gemeldet,
+    ohne den Import abzubrechen.
+    """
+    import_format = format
+    if import_format is None:
+        content_type = request.headers.get("content-type", "")
+        import_format = "csv" if "csv" in content_type else "ndjson"
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Unbekanntes Importformat: {import_format}")
+    
+    try:
+        return await ecommerce_service.import_products_stream(request.stream(), import_format, batch_size)
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=f"Datei ist nicht UTF-8-kodiert: {e}")
+
+@router.get("/produkte/suche", response_model=List[Product], tags=["Produkte"])
+async def search_products(
+    q: str = Query(..., min_length=1, description="Suchbegriffe, auch Wortanfänge"),
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = None,
     active_only: bool = True
 ):
-    """Produkte auflisten, optional nach Kategorie filtern"""
-    return ecommerce_service.get_products(skip, limit, category_id, active_only)
+    """Produkte nach Name, Beschreibung, Artikelnummer und Tags durchsuchen"""
+    return json_page(await ecommerce_service.search_products_json(q, limit, category_id, active_only))
 
 @router.get("/produkte/{product_id}", response_model=Product, tags=["Produkte"])
 async def get_product(product_id: int):
     """Ein bestimmtes Produkt abrufen"""
-    product = ecommerce_service.get_product(product_id)
+    product = await ecommerce_service.get_product(product_id)
     if not product:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Produkt nicht gefunden")
     return product
 
+@router.get("/produkte/{product_id}/bestand", response_model=StockLevel, tags=["Produkte"])
+async def get_stock(product_id: int):
+    """Lagerbestand, Reservierungen und verfügbaren Bestand eines Produkts abrufen"""
+    stock = await ecommerce_service.get_stock(product_id)
+    if not stock:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Produkt nicht gefunden")
+    return stock
+
+@router.get("/produkte/{product_id}/zusammen-gekauft", response_model=List[Product], tags=["Produkte"])
+async def get_related_products(product_id: int, limit: int = Query(10, ge=1, le=50)):
+    """Produkte, die häufig zusammen mit diesem Produkt gekauft werden"""
+    if not await ecommerce_service.get_product(product_id):
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Produkt nicht gefunden")
+    return await ecommerce_service.get_related_products(product_id, limit)
+
 @router.post("/produkte", response_model=Product, status_code=HTTP_201_CREATED, tags=["Produkte"])
 async def create_product(product: Product):
     """Ein neues Produkt erstellen"""
-    return ecommerce_service.create_product(product)
+    return await ecommerce_service.create_product(product)
 
 @router.put("/produkte/{product_id}", response_model=Product, tags=["Produkte"])
 async def update_product(product_id: int, product: Product):
     """Ein Produkt aktualisieren"""
-    updated_product = ecommerce_service.update_product(product_id, product)
+    updated_product = await ecommerce_service.update_product(product_id, product)
     if not updated_product:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Produkt nicht gefunden")
     return updated_product
@@ -64,7 +172,7 @@ async def update_product(product_id: int, product: Product):
 @router.delete("/produkte/{product_id}", tags=["Produkte"])
 async def delete_product(product_id: int):
     """Ein Produkt löschen (deaktivieren)"""
-    success = ecommerce_service.delete_product(product_id)
+    success = await ecommerce_service.delete_product(product_id)
     if not success:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Produkt nicht gefunden")
     return {"status": "success", "message": "Produkt wurde deaktiviert"}
@@ -73,12 +181,12 @@ async def delete_product(product_id: int):
 @router.get("/kategorien", response_model=List[ProductCategory], tags=["Kategorien"])
 async def get_categories(skip: int = 0, limit: int = 100, active_only: bool = True):
     """Produktkategorien auflisten"""
-    return ecommerce_service.get_categories(skip, limit, active_only)
+    return await ecommerce_service.get_categories(skip, limit, active_only)
 
 @router.get("/kategorien/{category_id}", response_model=ProductCategory, tags=["Kategorien"])
 async def get_category(category_id: int):
     """Eine bestimmte Kategorie abrufen"""
-    category = ecommerce_service.get_category(category_id)
+    category = await ecommerce_service.get_category(category_id)
     if not category:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Kategorie nicht gefunden")
     return category
@@ -86,12 +194,15 @@ async def get_category(category_id: int):
 @router.post("/kategorien", response_model=ProductCategory, status_code=HTTP_201_CREATED, tags=["Kategorien"])
 async def create_category(category: ProductCategory):
     """Eine neue Kategorie erstellen"""
-    return ecommerce_service.create_category(category)
+    return await ecommerce_service.create_category(category)
 
 @router.put("/kategorien/{category_id}", response_model=ProductCategory, tags=["Kategorien"])
 async def update_category(category_id: int, category: ProductCategory):
     """Eine Kategorie aktualisieren"""
-    updated_category = ecommerce_service.update_category(category_id, category)
+    try:
+        updated_category = await ecommerce_service.update_category(category_id, category)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
     if not updated_category:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Kategorie nicht gefunden")
     return updated_category
@@ -99,7 +210,7 @@ async def update_category(category_id: int, category: ProductCategory):
 @router.delete("/kategorien/{category_id}", tags=["Kategorien"])
 async def delete_category(category_id: int):
     """Eine Kategorie löschen (deaktivieren)"""
-    success = ecommerce_service.delete_category(category_id)
+    success = await ecommerce_service.delete_category(category_id)
     if not success:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Kategorie nicht gefunden")
     return {"status": "success", "message": "Kategorie wurde deaktiviert"}
@@ -111,7 +222,7 @@ async def get_cart(
     session_id: str = Depends(get_session_id)
 ):
     """Den aktuellen Warenkorb abrufen"""
-    cart = ecommerce_service.get_cart(session_id)
+    cart = await ecommerce_service.get_cart(session_id)
     set_session_cookie(response, session_id)
     return cart
 
@@ -124,10 +235,12 @@ async def add_to_cart(
 ):
     """Ein Produkt zum Warenkorb hinzufügen"""
     try:
-        cart = ecommerce_service.add_to_cart(session_id, product_id, quantity)
+        cart = await ecommerce_service.add_to_cart(session_id, product_id, quantity)
         if response:
             set_session_cookie(response, session_id)
         return cart
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
 
@@ -140,7 +253,7 @@ async def remove_from_cart(
 ):
     """Ein Produkt aus dem Warenkorb entfernen"""
     try:
-        cart = ecommerce_service.remove_from_cart(session_id, product_id, quantity)
+        cart = await ecommerce_service.remove_from_cart(session_id, product_id, quantity)
         if response:
             set_session_cookie(response, session_id)
         return cart
@@ -153,7 +266,31 @@ async def clear_cart(
     session_id: str = Depends(get_session_id)
 ):
     """Den Warenkorb leeren"""
-    cart = ecommerce_service.clear_cart(session_id)
+    cart = await ecommerce_service.clear_cart(session_id)
+    set_session_cookie(response, session_id)
+    return cart
+
+@router.post("/warenkorb/rabatt", response_model=ShoppingCart, tags=["Warenkorb"])
+async def apply_discount_to_cart(
+    code: str,
+    response: Response,
+    session_id: str = Depends(get_session_id)
+):
+    """Einen Rabattcode auf den Warenkorb anwenden"""
+    try:
+        cart = await ecommerce_service.apply_discount_to_cart(session_id, code)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    set_session_cookie(response, session_id)
+    return cart
+
+@router.delete("/warenkorb/rabatt", response_model=ShoppingCart, tags=["Warenkorb"])
+async def remove_discount_from_cart(
+    response: Response,
+    session_id: str = Depends(get_session_id)
+):
+    """Den Rabattcode vom Warenkorb entfernen"""
+    cart = await ecommerce_service.remove_discount_from_cart(session_id)
     set_session_cookie(response, session_id)
     return cart
 
@@ -170,8 +307,8 @@ async def create_order(
 ):
     """Eine neue Bestellung erstellen"""
     try:
-        cart = ecommerce_service.get_cart(session_id)
-        order = ecommerce_service.create_order(
+        cart = await ecommerce_service.get_cart(session_id)
+        order = await ecommerce_service.create_order(
             cart, 
             customer_id, 
             shipping_address_id, 
@@ -181,6 +318,8 @@ async def create_order(
         )
         set_session_cookie(response, session_id)
         return order
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -188,15 +327,22 @@ async def create_order(
 async def get_orders(
     customer_id: int, 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Bestellungen eines Kunden abrufen"""
-    return ecommerce_service.get_orders(customer_id, skip, limit)
+    """Bestellungen eines Kunden abrufen (Folge-Cursor im Header X-Next-Cursor)"""
+    if skip and not cursor:
+        return await ecommerce_service.get_orders(customer_id, skip, limit)
+    try:
+        content, next_cursor = await ecommerce_service.get_orders_page_json(customer_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return json_page(content, next_cursor)
 
 @router.get("/bestellungen/{order_id}", response_model=Order, tags=["Bestellungen"])
 async def get_order(order_id: int):
     """Eine bestimmte Bestellung abrufen"""
-    order = ecommerce_service.get_order(order_id)
+    order = await ecommerce_service.get_order(order_id)
     if not order:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Bestellung nicht gefunden")
     return order
@@ -204,12 +350,15 @@ async def get_order(order_id: int):
 @router.get("/bestellungen/{order_id}/items", response_model=List[OrderItem], tags=["Bestellungen"])
 async def get_order_items(order_id: int):
     """Die Positionen einer Bestellung abrufen"""
-    return ecommerce_service.get_order_items(order_id)
+    return await ecommerce_service.get_order_items(order_id)
 
 @router.put("/bestellungen/{order_id}/status", response_model=Order, tags=["Bestellungen"])
 async def update_order_status(order_id: int, status: str):
     """Den Status einer Bestellung aktualisieren"""
-    updated_order = ecommerce_service.update_order_status(order_id, status)
+    try:
+        updated_order = await ecommerce_service.update_order_status(order_id, status)
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
     if not updated_order:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Bestellung nicht gefunden")
     return updated_order
@@ -218,12 +367,20 @@ async def update_order_status(order_id: int, status: str):
 @router.get("/adressen", response_model=List[Address], tags=["Adressen"])
 async def get_addresses(customer_id: int):
     """Die Adressen eines Kunden abrufen"""
-    return ecommerce_service.get_addresses(customer_id)
+    return await ecommerce_service.get_addresses(customer_id)
+
+@router.get("/adressen/standard", response_model=Address, tags=["Adressen"])
+async def get_default_address(customer_id: int, address_type: str):
+    """Die Standardadresse eines Kunden für einen Adresstyp abrufen"""
+    address = await ecommerce_service.get_default_address(customer_id, address_type)
+    if not address:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Keine Standardadresse vorhanden")
+    return address
 
 @router.get("/adressen/{address_id}", response_model=Address, tags=["Adressen"])
 async def get_address(address_id: int):
     """Eine bestimmte Adresse abrufen"""
-    address = ecommerce_service.get_address(address_id)
+    address = await ecommerce_service.get_address(address_id)
     if not address:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Adresse nicht gefunden")
     return address
@@ -231,12 +388,12 @@ async def get_address(address_id: int):
 @router.post("/adressen", response_model=Address, status_code=HTTP_201_CREATED, tags=["Adressen"])
 async def create_address(address: Address):
     """Eine neue Adresse erstellen"""
-    return ecommerce_service.create_address(address)
+    return await ecommerce_service.create_address(address)
 
 @router.put("/adressen/{address_id}", response_model=Address, tags=["Adressen"])
 async def update_address(address_id: int, address: Address):
     """Eine Adresse aktualisieren"""
-    updated_address = ecommerce_service.update_address(address_id, address)
+    updated_address = await ecommerce_service.update_address(address_id, address)
     if not updated_address:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Adresse nicht gefunden")
     return updated_address
@@ -244,7 +401,7 @@ async def update_address(address_id: int, address: Address):
 @router.delete("/adressen/{address_id}", tags=["Adressen"])
 async def delete_address(address_id: int):
     """Eine Adresse löschen"""
-    success = ecommerce_service.delete_address(address_id)
+    success = await ecommerce_service.delete_address(address_id)
     if not success:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Adresse nicht gefunden")
     return {"status": "success", "message": "Adresse wurde gelöscht"}
@@ -253,12 +410,12 @@ async def delete_address(address_id: int):
 @router.get("/rabatte", response_model=List[Discount], tags=["Rabatte"])
 async def get_discounts(active_only: bool = True):
     """Rabatte auflisten"""
-    return ecommerce_service.get_discounts(active_only)
+    return await ecommerce_service.get_discounts(active_only)
 
 @router.get("/rabatte/{discount_id}", response_model=Discount, tags=["Rabatte"])
 async def get_discount(discount_id: int):
     """Einen bestimmten Rabatt abrufen"""
-    discount = ecommerce_service.get_discount(discount_id)
+    discount = await ecommerce_service.get_discount(discount_id)
     if not discount:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Rabatt nicht gefunden")
     return discount
@@ -266,7 +423,7 @@ async def get_discount(discount_id: int):
 @router.get("/rabatte/code/{code}", response_model=Discount, tags=["Rabatte"])
 async def get_discount_by_code(code: str):
     """Einen Rabatt nach Code abrufen"""
-    discount = ecommerce_service.get_discount_by_code(code)
+    discount = await ecommerce_service.get_discount_by_code(code)
     if not discount:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Rabatt nicht gefunden")
     return discount
@@ -274,12 +431,12 @@ async def get_discount_by_code(code: str):
 @router.post("/rabatte", response_model=Discount, status_code=HTTP_201_CREATED, tags=["Rabatte"])
 async def create_discount(discount: Discount):
     """Einen neuen Rabatt erstellen"""
-    return ecommerce_service.create_discount(discount)
+    return await ecommerce_service.create_discount(discount)
 
 @router.put("/rabatte/{discount_id}", response_model=Discount, tags=["Rabatte"])
 async def update_discount(discount_id: int, discount: Discount):
     """Einen Rabatt aktualisieren"""
-    updated_discount = ecommerce_service.update_discount(discount_id, discount)
+    updated_discount = await ecommerce_service.update_discount(discount_id, discount)
     if not updated_discount:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Rabatt nicht gefunden")
     return updated_discount
@@ -287,7 +444,7 @@ async def update_discount(discount_id: int, discount: Discount):
 @router.delete("/rabatte/{discount_id}", tags=["Rabatte"])
 async def delete_discount(discount_id: int):
     """Einen Rabatt löschen (deaktivieren)"""
-    success = ecommerce_service.delete_discount(discount_id)
+    success = await ecommerce_service.delete_discount(discount_id)
     if not success:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Rabatt nicht gefunden")
     return {"status": "success", "message": "Rabatt wurde deaktiviert"}
@@ -298,20 +455,40 @@ async def get_product_reviews(
     product_id: int, 
     skip: int = 0, 
     limit: int = 100,
-    approved_only: bool = True
+    approved_only: bool = True,
+    cursor: Optional[str] = None
 ):
-    """Bewertungen für ein Produkt abrufen"""
-    return ecommerce_service.get_product_reviews(product_id, skip, limit, approved_only)
+    """Bewertungen für ein Produkt abrufen (Folge-Cursor im Header X-Next-Cursor)"""
+    if skip and not cursor:
+        return await ecommerce_service.get_product_reviews(product_id, skip, limit, approved_only)
+    try:
+        content, next_cursor = await ecommerce_service.get_product_reviews_page_json(
+            product_id, limit, cursor, approved_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return json_page(content, next_cursor)
+
+@router.get("/produkte/{product_id}/bewertungen/zusammenfassung", response_model=ReviewSummary, tags=["Bewertungen"])
+async def get_product_review_summary(product_id: int):
+    """Anzahl, Durchschnitt und Sterneverteilung der Bewertungen eines Produkts abrufen"""
+    summaries = await ecommerce_service.get_review_summaries([product_id])
+    return summaries[0]
+
+@router.get("/bewertungen/zusammenfassungen", response_model=List[ReviewSummary], tags=["Bewertungen"])
+async def get_review_summaries(product_ids: List[int] = Query(..., max_items=500)):
+    """Bewertungszusammenfassungen für mehrere Produkte abrufen (z.B. für eine Kategorieseite)"""
+    return await ecommerce_service.get_review_summaries(product_ids)
 
 @router.post("/bewertungen", response_model=Review, status_code=HTTP_201_CREATED, tags=["Bewertungen"])
 async def create_review(review: Review):
     """Eine neue Produktbewertung erstellen"""
-    return ecommerce_service.create_review(review)
+    return await ecommerce_service.create_review(review)
 
 @router.put("/bewertungen/{review_id}/approve", response_model=Review, tags=["Bewertungen"])
 async def approve_review(review_id: int):
     """Eine Bewertung genehmigen"""
-    approved_review = ecommerce_service.approve_review(review_id)
+    approved_review = await ecommerce_service.approve_review(review_id)
     if not approved_review:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Bewertung nicht gefunden")
     return approved_review
@@ -319,7 +496,7 @@ async def approve_review(review_id: int):
 @router.delete("/bewertungen/{review_id}", tags=["Bewertungen"])
 async def delete_review(review_id: int):
     """Eine Bewertung löschen"""
-    success = ecommerce_service.delete_review(review_id)
+    success = await ecommerce_service.delete_review(review_id)
     if not success:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Bewertung nicht gefunden")
     return {"status": "success", "message": "Bewertung wurde gelöscht"} 
\ No newline at end of file
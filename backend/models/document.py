@@ -6,9 +6,18 @@ Integriert Odoo-Dokument-Funktionalitäten in unser System
 from datetime import datetime
 from enum import Enum
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import uuid
 
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
 class DocumentType(str, Enum):
     PDF = "pdf"
     WORD = "word"
@@ -23,6 +32,10 @@ class DocumentStatus(str, Enum):
     ARCHIVED = "archived"
     DELETED = "deleted"
 
+# Wert -> Enum-Mitglied, schneller als der Enum-Aufruf beim Laden vieler Dokumente
+_DOCUMENT_TYPES = {member.value: member for member in DocumentType}
+_DOCUMENT_STATUSES = {member.value: member for member in DocumentStatus}
+
 class Document:
     """
     Hauptklasse für das Dokumentenmanagement
@@ -44,7 +57,7 @@ class Document:
         self.document_type = document_type
         self.owner_id = owner_id
         self.description = description
-        self.tags = tags or []
+        self.tags = set(tags or [])  # Menge von Tag-IDs
         self.folder_id = folder_id
         self.parent_id = parent_id
         self.status = DocumentStatus.DRAFT
@@ -55,6 +68,39 @@ class Document:
         self.versions = []  # Speichert Versionshistorie
         self.shared_with = []  # Liste von Benutzer-IDs, mit denen geteilt
 
+    def to_record(self) -> Dict[str, Any]:
+        """Gibt die Metadaten als JSON-fähiges Dict zurück"""
+        record = dict(self.__dict__)
+        record["document_type"] = self.document_type.value
+        record["status"] = self.status.value
+        record["created_at"] = _isoformat(self.created_at)
+        record["updated_at"] = _isoformat(self.updated_at)
+        record["tags"] = sorted(self.tags)
+        record["versions"] = [
+            {**version, "updated_at": _isoformat(version["updated_at"])} for version in self.versions
+        ]
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Document":
+        """
+        Stellt ein Dokument aus ``to_record`` wieder her, ohne auf die Datei zuzugreifen
+
+        Das Dict wird als Attribut-Dict übernommen und darf danach nicht
+        anderweitig verwendet werden (beim Laden von Millionen Einträgen
+        spart das eine Kopie je Dokument).
+        """
+        document = cls.__new__(cls)
+        document.__dict__ = record
+        record["document_type"] = _DOCUMENT_TYPES[record["document_type"]]
+        record["status"] = _DOCUMENT_STATUSES[record["status"]]
+        record["created_at"] = _parse_datetime(record["created_at"])
+        record["updated_at"] = _parse_datetime(record["updated_at"])
+        record["tags"] = set(record["tags"])
+        for version in record["versions"]:
+            version["updated_at"] = _parse_datetime(version["updated_at"])
+        return document
+
     def _get_file_size(self) -> int:
         """Ermittelt die Dateigröße in Bytes"""
         try:
@@ -88,7 +134,7 @@ class Document:
         if description:
             self.description = description
         if tags:
-            self.tags = tags
+            self.tags = set(tags)
         if folder_id:
             self.folder_id = folder_id
             
@@ -172,20 +218,45 @@ class Folder:
         self.description = description
         self.created_at = datetime.now()
         self.updated_at = datetime.now()
-        self.documents = []  # Liste von Dokument-IDs in diesem Ordner
+        self.documents = set()  # Menge von Dokument-IDs in diesem Ordner
         self.subfolders = []  # Liste von Unterordner-IDs
         self.shared_with = []  # Liste von Benutzer-IDs, mit denen geteilt
 
+    def to_record(self) -> Dict[str, Any]:
+        """
+        Gibt die Metadaten als JSON-fähiges Dict zurück
+
+        Dokument- und Unterordnerlisten ergeben sich aus ``folder_id`` bzw.
+        ``parent_id`` der Einträge und werden nicht mitgespeichert.
+        """
+        record = {k: v for k, v in self.__dict__.items() if k not in ("documents", "subfolders")}
+        record["created_at"] = _isoformat(self.created_at)
+        record["updated_at"] = _isoformat(self.updated_at)
+        record["shared_with"] = list(self.shared_with)
+        return record
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Folder":
+        """Stellt einen Ordner aus ``to_record`` wieder her (mit leeren Inhaltslisten)"""
+        folder = cls.__new__(cls)
+        folder.__dict__.update(record)
+        folder.created_at = _parse_datetime(record["created_at"])
+        folder.updated_at = _parse_datetime(record["updated_at"])
+        folder.documents = set()
+        folder.subfolders = []
+        folder.shared_with = list(record.get("shared_with", []))
+        return folder
+
     def add_document(self, document_id: str) -> None:
         """Fügt ein Dokument zum Ordner hinzu"""
         if document_id not in self.documents:
-            self.documents.append(document_id)
+            self.documents.add(document_id)
             self.updated_at = datetime.now()
 
     def remove_document(self, document_id: str) -> None:
         """Entfernt ein Dokument aus dem Ordner"""
         if document_id in self.documents:
-            self.documents.remove(document_id)
+            self.documents.discard(document_id)
             self.updated_at = datetime.now()
 
     def add_subfolder(self, folder_id: str) -> None:
@@ -221,14 +292,26 @@ class Tag:
         self.name = name
         self.color = color
         self.created_at = datetime.now()
-        self.documents = []  # Liste von Dokumenten mit diesem Tag
+        self.documents = set()  # Menge von Dokument-IDs mit diesem Tag
+
+    def to_record(self) -> Dict[str, Any]:
+        """Gibt die Metadaten als JSON-fähiges Dict zurück (ohne die Dokumentliste)"""
+        return {"id": self.id, "name": self.name, "color": self.color,
+                "created_at": _isoformat(self.created_at)}
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "Tag":
+        """Stellt einen Tag aus ``to_record`` wieder her (mit leerer Dokumentliste)"""
+        tag = cls.__new__(cls)
+        tag.__dict__.update(record)
+        tag.created_at = _parse_datetime(record["created_at"])
+        tag.documents = set()
+        return tag
 
     def add_document(self, document_id: str) -> None:
         """Fügt ein Dokument zum Tag hinzu"""
-        if document_id not in self.documents:
-            self.documents.append(document_id)
+        self.documents.add(document_id)
 
     def remove_document(self, document_id: str) -> None:
         """Entfernt ein Dokument vom Tag"""
-        if document_id in self.documents:
-            self.documents.remove(document_id) 
\ No newline at end of file
+        self.documents.discard(document_id) 
\ No newline at end of file
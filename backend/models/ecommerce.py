@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -53,6 +53,8 @@ class ShoppingCart(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: Optional[datetime] = None
     items: List[CartItem] = Field(default_factory=list)
+    discount_code: Optional[str] = Field(None, description="Eingelöster Rabattcode")
+    discount_amount: float = Field(default=0.0, description="Rabattbetrag auf die aktuellen Positionen")
     
 
 class Order(BaseModel):
@@ -137,4 +139,40 @@ class Review(BaseModel):
     verified_purchase: bool = Field(default=False, description="Verifizierter Kauf")
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: Optional[datetime] = None
-    is_approved: bool = Field(default=False, description="Ist genehmigt") 
\ No newline at end of file
+    is_approved: bool = Field(default=False, description="Ist genehmigt")
+
+
+class ReviewSummary(BaseModel):
+    """Zusammenfassung der Bewertungen eines Produkts"""
+    product_id: int = Field(..., description="Produkt-ID")
+    review_count: int = Field(default=0, description="Anzahl aller Bewertungen")
+    average_rating: Optional[float] = Field(None, description="Durchschnitt aller Bewertungen")
+    rating_histogram: Dict[int, int] = Field(default_factory=dict, description="Anzahl je Sternezahl (1-5)")
+    approved_count: int = Field(default=0, description="Anzahl genehmigter Bewertungen")
+    approved_average_rating: Optional[float] = Field(None, description="Durchschnitt genehmigter Bewertungen")
+    approved_histogram: Dict[int, int] = Field(default_factory=dict, description="Genehmigte Bewertungen je Sternezahl")
+
+
+class ProductImportError(BaseModel):
+    """Fehler einer Zeile beim Produktimport"""
+    row: int = Field(..., description="Zeilennummer in der Importdatei")
+    sku: Optional[str] = Field(None, description="Artikelnummer, falls lesbar")
+    error: str = Field(..., description="Fehlermeldung")
+
+
+class ProductImportResult(BaseModel):
+    """Ergebnis eines Produktimports"""
+    created: int = Field(default=0, description="Neu angelegte Produkte")
+    updated: int = Field(default=0, description="Aktualisierte Produkte")
+    unchanged: int = Field(default=0, description="Produkte ohne Änderungen")
+    failed: int = Field(default=0, description="Fehlerhafte Zeilen")
+    errors: List[ProductImportError] = Field(default_factory=list, description="Fehler je Zeile (gekürzt)")
+
+
+class StockLevel(BaseModel):
+    """Lagerbestand eines Produkts mit den Reservierungen offener Warenkörbe"""
+    product_id: int = Field(..., description="Produkt-ID")
+    sku: str = Field(..., description="Artikelnummer")
+    on_hand: int = Field(default=0, description="Lagerbestand")
+    reserved: int = Field(default=0, description="In Warenkörben reserviert")
+    available: int = Field(default=0, description="Frei verfügbar")
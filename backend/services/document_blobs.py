@@ -0,0 +1,198 @@
+"""
+Inhaltsadressierte Ablage der Dateiversionen
+
+Jeder Dateiinhalt liegt genau einmal unter seinem SHA-256-Hash
+(``<hash[:2]>/<hash>``). Die Versionsdateien der Dokumente sind Hardlinks auf
+diese Blobs; die Linkanzahl des Dateisystems ist damit der Referenzzähler und
+bleibt auch bei mehreren Prozessen ohne eigene Buchführung konsistent. Beim
+Ablegen wird die Datei in einem Durchgang gelesen, gehasht und in eine
+temporäre Datei geschrieben; ist der Inhalt schon vorhanden, wird diese
+verworfen. Blobs ohne Versionsdatei entfernt ``collect_garbage``.
+"""
+
+import os
+import sys
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: kein Reflink, es wird kopiert
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Lesepuffer beim Ablegen
+CHUNK_SIZE = 1 << 20
+
+# Blobs und temporäre Dateien, die jünger sind, gelten als noch in Arbeit
+GC_MIN_AGE = 3600
+
+# ioctl FICLONE (Linux): Copy-on-Write-Kopie auf Btrfs, XFS u.a.
+_FICLONE = 0x40049409
+
+_TMP_PREFIX = ".tmp"
+
+
+def _clone_or_copy(source: str, dest: str) -> None:
+    """Kopiert per Reflink, sofern das Dateisystem ihn unterstützt, sonst vollständig"""
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            with open(source, 'rb') as src, open(dest, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, dest)
+
+
+def _remove(path: str) -> None:
+    """Löscht eine Datei, auch wenn sie schreibgeschützt ist (unter Windows sonst PermissionError)"""
+    if os.name == 'nt':
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+    os.remove(path)
+
+
+def remove_tree(path: str) -> None:
+    """
+    Löscht ein Verzeichnis samt Versionsdateien
+
+    Versionsdateien sind Hardlinks auf schreibgeschützte Blobs und werden wie
+    diese über ``_remove`` gelöscht. Fehler werden weitergegeben, damit kein
+    Verzeichnis unbemerkt liegen bleibt und seine Blobs dauerhaft belegt.
+    """
+    if not os.path.isdir(path):
+        return
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            _remove(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(path)
+
+
+class BlobStore:
+    """SHA-256 -> Dateiinhalt, referenziert über Hardlinks der Versionsdateien"""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _spool(self, source: str) -> Tuple[str, str]:
+        """Schreibt ``source`` in eine temporäre Datei und hasht dabei, gibt (Hash, Pfad) zurück"""
+        fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=self.directory)
+        try:
+            digest = hashlib.sha256()
+            with open(source, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+        except Exception:
+            _remove(tmp_path)
+            raise
+        return digest.hexdigest(), tmp_path
+
+    def _publish(self, tmp_path: str, blob_path: str) -> None:
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Blobs sind geteilt und dürfen über keine Versionsdatei verändert werden
+        os.chmod(tmp_path, stat.S_IREAD)
+        try:
+            os.replace(tmp_path, blob_path)
+        except OSError:
+            # Windows ersetzt einen gleichzeitig abgelegten, schreibgeschützten Blob nicht;
+            # sein Inhalt ist derselbe
+            if not os.path.exists(blob_path):
+                raise
+
+    def add(self, source: str, dest: str) -> str:
+        """
+        Legt den Inhalt von ``source`` ab und verweist ``dest`` darauf
+
+        Args:
+            source: Pfad der hochgeladenen Datei
+            dest: Pfad der neuen Versionsdatei
+
+        Returns:
+            SHA-256-Hash des Inhalts
+
+        Raises:
+            FileExistsError: Wenn ``dest`` bereits mit anderem Inhalt existiert
+        """
+        digest, tmp_path = self._spool(source)
+        blob_path = self.path(digest)
+        try:
+            with self.lock:
+                if not os.path.exists(blob_path):
+                    self._publish(tmp_path, blob_path)
+                try:
+                    os.link(blob_path, dest)
+                except FileNotFoundError:
+                    # Blob wurde zwischen Prüfung und Link von einem anderen Prozess entfernt
+                    if not os.path.exists(tmp_path):
+                        raise
+                    self._publish(tmp_path, blob_path)
+                    os.link(blob_path, dest)
+                except FileExistsError:
+                    # Eine bestehende Versionsdatei wird nie überschrieben
+                    if not os.path.samefile(blob_path, dest):
+                        raise
+                except OSError as e:
+                    # Dateisystem ohne Hardlinks: eigene Kopie, ohne Deduplizierung
+                    logger.warning(f"Hardlink auf {blob_path} nicht möglich, Datei wird kopiert: {str(e)}")
+                    _clone_or_copy(blob_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                _remove(tmp_path)
+        return digest
+
+    def references(self, digest: str) -> int:
+        """Gibt die Anzahl der Versionsdateien mit diesem Inhalt zurück"""
+        try:
+            return os.stat(self.path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def collect_garbage(self, min_age: float = GC_MIN_AGE) -> int:
+        """
+        Entfernt Blobs ohne Versionsdatei und liegengebliebene temporäre Dateien
+
+        Dateien, die sich nicht löschen lassen, werden protokolliert und übersprungen.
+
+        Args:
+            min_age: Mindestalter in Sekunden, jüngere Dateien werden übersprungen
+
+        Returns:
+            Anzahl der entfernten Dateien
+        """
+        removed = 0
+        cutoff = time.time() - min_age
+        with self.lock:
+            for entry in os.scandir(self.directory):
+                if entry.is_dir(follow_symlinks=False):
+                    candidates = list(os.scandir(entry.path))
+                elif entry.name.startswith(_TMP_PREFIX):
+                    candidates = [entry]
+                else:
+                    continue
+                for candidate in candidates:
+                    try:
+                        info = candidate.stat(follow_symlinks=False)
+                        # Temporäre Dateien haben nie einen zweiten Link
+                        if info.st_nlink <= 1 and info.st_mtime <= cutoff:
+                            _remove(candidate.path)
+                            removed += 1
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.error(f"Blob {candidate.path} konnte nicht entfernt werden: {str(e)}")
+        return removed
@@ -0,0 +1,84 @@
+"""
+Ordnerindex für die Dokumentenverwaltung
+
+Zu jeder Ordner-ID (None für die oberste Ebene) führt der Index die direkten
+Unterordner und die nicht gelöschten Dokumente, jeweils in der Reihenfolge
+ihrer Aufnahme. Ordnerinhalte und Unterbäume werden damit ohne Durchlauf
+aller Ordner und Dokumente bestimmt; der Aufwand hängt nur von der Größe des
+betroffenen Unterbaums ab.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+# Ordner-ID (None = oberste Ebene) -> IDs als geordnete Menge (Dict mit None-Werten)
+_Children = Dict[Optional[str], Dict[str, None]]
+
+
+def _add(children: _Children, parent_id: Optional[str], child_id: str) -> None:
+    children.setdefault(parent_id, {})[child_id] = None
+
+
+def _discard(children: _Children, parent_id: Optional[str], child_id: str) -> None:
+    entries = children.get(parent_id)
+    if entries is not None:
+        entries.pop(child_id, None)
+        if not entries:
+            del children[parent_id]
+
+
+class FolderIndex:
+    """Übergeordneter Ordner -> Unterordner und Ordner -> Dokumente"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._subfolders: _Children = {}
+        self._documents: _Children = {}
+
+    def add_folder(self, folder_id: str, parent_id: Optional[str]) -> None:
+        with self.lock:
+            _add(self._subfolders, parent_id, folder_id)
+
+    def move_folder(self, folder_id: str, old_parent_id: Optional[str], new_parent_id: Optional[str]) -> None:
+        """Hängt einen Ordner um; sein Unterbaum wandert über die Elternverweise mit"""
+        with self.lock:
+            _discard(self._subfolders, old_parent_id, folder_id)
+            _add(self._subfolders, new_parent_id, folder_id)
+
+    def remove_folder(self, folder_id: str, parent_id: Optional[str]) -> None:
+        with self.lock:
+            _discard(self._subfolders, parent_id, folder_id)
+            self._subfolders.pop(folder_id, None)
+            self._documents.pop(folder_id, None)
+
+    def add_document(self, document_id: str, folder_id: Optional[str]) -> None:
+        with self.lock:
+            _add(self._documents, folder_id, document_id)
+
+    def remove_document(self, document_id: str, folder_id: Optional[str]) -> None:
+        with self.lock:
+            _discard(self._documents, folder_id, document_id)
+
+    def subfolders(self, folder_id: Optional[str]) -> List[str]:
+        """Gibt die direkten Unterordner zurück"""
+        with self.lock:
+            return list(self._subfolders.get(folder_id, ()))
+
+    def documents(self, folder_id: Optional[str]) -> List[str]:
+        """Gibt die nicht gelöschten Dokumente direkt in einem Ordner zurück"""
+        with self.lock:
+            return list(self._documents.get(folder_id, ()))
+
+    def subtree(self, folder_id: str) -> List[str]:
+        """Gibt den Ordner und alle Nachfahren zurück, übergeordnete Ordner vor ihren Unterordnern"""
+        with self.lock:
+            result = [folder_id]
+            seen = {folder_id}
+            # Tiefensuche mit eigenem Stapel, tiefe Bäume stoßen nicht an die Rekursionsgrenze
+            stack = [folder_id]
+            while stack:
+                children = [child for child in self._subfolders.get(stack.pop(), ()) if child not in seen]
+                seen.update(children)
+                result.extend(children)
+                stack.extend(reversed(children))
+            return result
@@ -0,0 +1,164 @@
+"""
+Persistente Metadaten für den Dokumentenservice
+
+Dokumente, Ordner und Tags werden als Snapshot (``snapshot.json``) plus
+Append-Only-Log (``changes.log``, eine NDJSON-Zeile je Änderung) gespeichert.
+Beim Laden wird der Snapshot gelesen und das Log darauf eingespielt. Sobald
+das Log länger wird als die Hälfte der gespeicherten Einträge (mindestens
+``compact_min`` Zeilen), schreibt ein Hintergrund-Thread einen neuen Snapshot
+und leert das Log. Die Ladezeit hängt damit von der Anzahl der Einträge ab,
+nicht von der Länge der Änderungshistorie. Das Einspielen ist idempotent, ein
+Absturz zwischen Snapshot und Leeren des Logs verliert keine Änderungen.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List
+
+try:
+    import orjson
+except ImportError:  # optional, beschleunigt Laden und Schreiben großer Snapshots
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("documents", "folders", "tags")
+
+# Mindestlänge des Logs, ab der kompaktiert wird
+COMPACT_MIN = 10000
+
+Records = Dict[str, Dict[str, Dict[str, Any]]]
+Snapshot = Dict[str, List[Dict[str, Any]]]
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class DocumentMetadataStore:
+    """
+    Snapshot und Änderungslog der Dokument-Metadaten eines Speicherverzeichnisses
+
+    Der Store hält selbst keine Objekte: ``load`` liefert die gespeicherten
+    Datensätze je Art, ``put``/``delete`` hängen Änderungen an das Log an und
+    ``compact`` schreibt den vom Aufrufer über ``snapshot`` gelieferten Stand.
+    """
+
+    def __init__(self, directory: str, snapshot: Callable[[], Snapshot], compact_min: int = COMPACT_MIN):
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.log_path = os.path.join(directory, "changes.log")
+        self.compact_min = compact_min
+        self.lock = threading.RLock()
+        self._snapshot = snapshot
+        self._log = None
+        self._log_entries = 0
+        self._record_count = 0
+        self._compacting = False
+
+    def _replay(self, records: Records) -> int:
+        try:
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        entries = 0
+        # Eine unvollständige letzte Zeile (Absturz beim Schreiben) wird verworfen
+        for line in data[:data.rfind(b'\n') + 1].splitlines():
+            try:
+                change = _loads(line)
+                if change['op'] == 'put':
+                    records[change['kind']][change['record']['id']] = change['record']
+                elif change['op'] == 'delete':
+                    records[change['kind']].pop(change['id'], None)
+            except Exception as e:
+                logger.error(f"Ungültiger Log-Eintrag in {self.log_path}: {str(e)}")
+                continue
+            entries += 1
+        return entries
+
+    def load(self) -> Records:
+        """Liest Snapshot und Log und gibt die Datensätze je Art (ID -> Datensatz) zurück"""
+        with self.lock:
+            records: Records = {kind: {} for kind in KINDS}
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    snapshot = _loads(f.read())
+                for kind in KINDS:
+                    records[kind] = {record['id']: record for record in snapshot.get(kind, [])}
+            except FileNotFoundError:
+                pass
+            self._log_entries = self._replay(records)
+            self._record_count = sum(len(kind_records) for kind_records in records.values())
+            return records
+
+    def _append(self, change: Dict[str, Any]) -> None:
+        with self.lock:
+            if self._log is None:
+                self._log = open(self.log_path, 'ab+')
+                # Unvollständige letzte Zeile eines Absturzes abschließen, sonst verschmilzt
+                # sie mit dem nächsten Eintrag und beide gehen beim Laden verloren
+                if self._log.seek(0, os.SEEK_END):
+                    self._log.seek(-1, os.SEEK_END)
+                    if self._log.read(1) != b'\n':
+                        self._log.write(b'\n')
+            self._log.write(_dumps(change) + b'\n')
+            self._log.flush()
+            self._log_entries += 1
+            if (self._log_entries >= max(self.compact_min, self._record_count // 2)
+                    and not self._compacting):
+                self._compacting = True
+                threading.Thread(target=self.compact, name="document-metadata-compact", daemon=True).start()
+
+    def put(self, kind: str, record: Dict[str, Any]) -> None:
+        """Speichert einen neuen oder geänderten Datensatz"""
+        self._append({'op': 'put', 'kind': kind, 'record': record})
+
+    def delete(self, kind: str, record_id: str) -> None:
+        """Entfernt einen Datensatz"""
+        self._append({'op': 'delete', 'kind': kind, 'id': record_id})
+
+    def compact(self) -> bool:
+        """Schreibt einen neuen Snapshot und leert das Log"""
+        tmp_path = None
+        try:
+            with self.lock:
+                snapshot = self._snapshot()
+                directory = os.path.dirname(self.snapshot_path)
+                fd, tmp_path = tempfile.mkstemp(prefix="snapshot", suffix=".tmp", dir=directory)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(_dumps(snapshot))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.snapshot_path)
+                tmp_path = None
+                if self._log is not None:
+                    self._log.close()
+                    self._log = None
+                open(self.log_path, 'wb').close()
+                self._log_entries = 0
+                self._record_count = sum(len(records) for records in snapshot.values())
+            return True
+        except Exception as e:
+            logger.error(f"Fehler beim Schreiben des Snapshots {self.snapshot_path}: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        finally:
+            self._compacting = False
+
+    def close(self) -> None:
+        """Schließt das Log; weitere Änderungen öffnen es erneut"""
+        with self.lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
@@ -0,0 +1,157 @@
+"""
+Volltextindex für die Dokumentensuche
+
+Name, Beschreibung und optional der Dateitext jedes Dokuments werden klein
+geschrieben und mit Randmarkierungen in Trigramme zerlegt. Je Trigramm führt
+der Index eine aufsteigend sortierte Liste der Dokument-Ordinalzahlen. Eine
+Teilstring-Suche schneidet die Listen der Trigramme des Suchbegriffs, kürzere
+Begriffe vereinigen die Listen aller Trigramme, in denen sie vorkommen. Das
+Ergebnis ist eine Obermenge der Treffer, die der Service am Dokument bestätigt.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Randmarkierungen: kurze Felder ergeben so mindestens ein Trigramm, und
+# Trigramme verschiedener Felder verbinden sich nicht zu Scheintreffern
+_START = "\x02"
+_END = "\x03"
+
+
+def trigrams(texts: Iterable[Optional[str]]) -> Set[str]:
+    """Gibt die Trigramme mehrerer Texte (klein geschrieben, mit Randmarkierungen) zurück"""
+    grams = set()
+    for text in texts:
+        if not text:
+            continue
+        padded = f"{_START}{text.lower()}{_END}"
+        grams.update({padded[i:i + 3] for i in range(len(padded) - 2)})
+    return grams
+
+
+def _intersect(smaller: array, larger: array) -> array:
+    # Wenige Kandidaten: binär in der langen Liste suchen statt sie ganz zu durchlaufen
+    if len(smaller) * 8 < len(larger):
+        result = array('I')
+        for ordinal in smaller:
+            position = bisect_left(larger, ordinal)
+            if position < len(larger) and larger[position] == ordinal:
+                result.append(ordinal)
+        return result
+    return array('I', sorted(set(smaller).intersection(larger)))
+
+
+class DocumentOrdinals:
+    """Fortlaufende Ordinalzahlen für Dokument-IDs, in der Reihenfolge der ersten Vergabe"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._ordinals: Dict[str, int] = {}
+        self._ids: List[str] = []
+
+    def get(self, document_id: str) -> int:
+        """Gibt die Ordinalzahl eines Dokuments zurück und vergibt bei Bedarf eine neue"""
+        ordinal = self._ordinals.get(document_id)
+        if ordinal is None:
+            with self.lock:
+                ordinal = self._ordinals.get(document_id)
+                if ordinal is None:
+                    ordinal = self._ordinals[document_id] = len(self._ids)
+                    self._ids.append(document_id)
+        return ordinal
+
+    def extend(self, document_ids: Iterable[str]) -> None:
+        """Vergibt Ordinalzahlen für mehrere Dokumente auf einmal (beim Laden)"""
+        with self.lock:
+            new_ids = [document_id for document_id in dict.fromkeys(document_ids)
+                       if document_id not in self._ordinals]
+            self._ordinals.update(zip(new_ids, range(len(self._ids), len(self._ids) + len(new_ids))))
+            self._ids.extend(new_ids)
+
+    def ids(self, ordinals: Iterable[int]) -> List[str]:
+        """Gibt die Dokument-IDs zu Ordinalzahlen zurück"""
+        return [self._ids[ordinal] for ordinal in ordinals]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class DocumentSearchIndex:
+    """Trigramm-Index: Trigramm -> aufsteigend sortierte Ordinalzahlen"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._postings: Dict[str, array] = {}
+
+    def rebuild(self, documents: Iterable[Tuple[int, Set[str]]]) -> None:
+        """Baut den Index aus (Ordinalzahl, Trigramme) aller Dokumente neu auf"""
+        postings: Dict[str, List[int]] = {}
+        for ordinal, grams in documents:
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [ordinal]
+                else:
+                    posting.append(ordinal)
+        with self.lock:
+            self._postings = {gram: array('I', sorted(posting)) for gram, posting in postings.items()}
+
+    def add(self, ordinal: int, grams: Iterable[str]) -> None:
+        """Nimmt die Trigramme eines Dokuments auf"""
+        with self.lock:
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = array('I', (ordinal,))
+                elif posting[-1] < ordinal:
+                    posting.append(ordinal)
+                else:
+                    position = bisect_left(posting, ordinal)
+                    if position == len(posting) or posting[position] != ordinal:
+                        insort(posting, ordinal)
+
+    def remove(self, ordinal: int, grams: Iterable[str]) -> None:
+        """Entfernt die Trigramme eines Dokuments"""
+        with self.lock:
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    continue
+                position = bisect_left(posting, ordinal)
+                if position < len(posting) and posting[position] == ordinal:
+                    del posting[position]
+                    if not posting:
+                        del self._postings[gram]
+
+    def update(self, ordinal: int, old_grams: Set[str], new_grams: Set[str]) -> None:
+        """Führt nur die geänderten Trigramme eines Dokuments nach"""
+        with self.lock:
+            self.remove(ordinal, old_grams - new_grams)
+            self.add(ordinal, new_grams - old_grams)
+
+    def candidates(self, query: str) -> List[int]:
+        """Gibt aufsteigend die Ordinalzahlen aller Dokumente zurück, deren Texte ``query`` enthalten können"""
+        query = query.lower()
+        with self.lock:
+            if len(query) >= 3:
+                postings = []
+                for gram in {query[i:i + 3] for i in range(len(query) - 2)}:
+                    posting = self._postings.get(gram)
+                    if posting is None:
+                        return []
+                    postings.append(posting)
+                postings.sort(key=len)
+                result = postings[0]
+                for posting in postings[1:]:
+                    result = _intersect(result, posting)
+                    if not result:
+                        break
+                return result.tolist()
+            # Ein- und zweistellige Begriffe liegen vollständig in mindestens einem Trigramm
+            matches = set()
+            for gram, posting in self._postings.items():
+                if query in gram:
+                    matches.update(posting)
+            return sorted(matches)
@@ -3,32 +3,218 @@ Dokumentenverwaltungs-Service für das AI-Driven ERP-System
 Bietet Schnittstellen für die Arbeit mit Dokumenten
 """
 
+import gc
 import os
-import shutil
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterator, Set, Tuple
 
 from backend.models.document import Document, Folder, Tag, DocumentType, DocumentStatus
+from backend.services.document_blobs import GC_MIN_AGE, BlobStore, remove_tree
+from backend.services.document_folders import FolderIndex
+from backend.services.document_metadata import COMPACT_MIN, DocumentMetadataStore
+from backend.services.document_search import DocumentOrdinals, DocumentSearchIndex, trigrams
+from backend.services.document_tags import TagBitmapIndex
+
+# Unterverzeichnis des Speicherpfads für Snapshot und Änderungslog
+METADATA_DIR = "_metadata"
+
+# Unterverzeichnis des Speicherpfads für die inhaltsadressierten Dateiinhalte
+BLOBS_DIR = "_blobs"
+
+# Höchstens so viele Bytes einer Textdatei werden in den Suchindex aufgenommen
+MAX_INDEXED_TEXT_BYTES = 1 << 20
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """Setzt die Garbage Collection aus, solange sehr viele Objekte auf einmal entstehen"""
+    # Millionen neuer Objekte würden sonst wiederholt volle GC-Läufe auslösen
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
 class DocumentService:
     """
     Service-Klasse für die Verwaltung von Dokumenten
     """
-    def __init__(self, storage_path: str):
+    def __init__(self, storage_path: str, compact_min: int = COMPACT_MIN, index_file_text: bool = False):
         """
         Initialisiert den Dokumentenservice mit dem angegebenen Speicherpfad
         
+        Die Metadaten werden erst beim ersten Zugriff aus Snapshot und
+        Änderungslog unter ``storage_path/_metadata`` geladen.
+        
         Args:
             storage_path: Pfad zum Speichern der hochgeladenen Dokumente
+            compact_min: Mindestlänge des Änderungslogs, ab der ein neuer Snapshot geschrieben wird
+            index_file_text: Inhalt von Textdokumenten in die Volltextsuche aufnehmen
         """
         self.storage_path = storage_path
         # Erstelle Speicherverzeichnis, falls es nicht existiert
         os.makedirs(storage_path, exist_ok=True)
         
-        # Speichert Dokumente, Ordner und Tags im Speicher (später Datenbank)
-        self.documents = {}  # document_id -> Document
-        self.folders = {}    # folder_id -> Folder
-        self.tags = {}       # tag_id -> Tag
+        # Versionsdateien sind Hardlinks auf einmalig gespeicherte Inhalte
+        self.blobs = BlobStore(os.path.join(storage_path, BLOBS_DIR))
+        self.metadata = DocumentMetadataStore(
+            os.path.join(storage_path, METADATA_DIR), self._metadata_snapshot, compact_min
+        )
+        self._load_lock = threading.Lock()
+        self._documents: Optional[Dict[str, Document]] = None  # document_id -> Document
+        self._folders: Optional[Dict[str, Folder]] = None      # folder_id -> Folder
+        self._tags: Optional[Dict[str, Tag]] = None            # tag_id -> Tag
+        
+        # Fortlaufende Nummern der Dokumente für die Indizes, in Lade- und Anlagereihenfolge
+        self.ordinals = DocumentOrdinals()
+        # Trigramm-Index für die Suche, Aufbau beim ersten Suchbegriff
+        self.index_file_text = index_file_text
+        self._search_index: Optional[DocumentSearchIndex] = None
+        self._search_index_lock = threading.Lock()
+        # Tag-ID -> Bitmap der Dokumente, Aufbau beim ersten Tag-Filter
+        self._tag_index: Optional[TagBitmapIndex] = None
+        self._tag_index_lock = threading.Lock()
+        # Ordner -> Unterordner und Dokumente, wird beim Laden aufgebaut
+        self.folder_index = FolderIndex()
+
+    @property
+    def documents(self) -> Dict[str, Document]:
+        self._ensure_loaded()
+        return self._documents
+
+    @property
+    def folders(self) -> Dict[str, Folder]:
+        self._ensure_loaded()
+        return self._folders
+
+    @property
+    def tags(self) -> Dict[str, Tag]:
+        self._ensure_loaded()
+        return self._tags
+
+    def _ensure_loaded(self) -> None:
+        """Lädt die Metadaten beim ersten Zugriff und stellt die Zuordnungslisten wieder her"""
+        if self._documents is not None:
+            return
+        with self._load_lock:
+            if self._documents is not None:
+                return
+            with _gc_paused():
+                records = self.metadata.load()
+                documents = {k: Document.from_record(v) for k, v in records["documents"].items()}
+                folders = {k: Folder.from_record(v) for k, v in records["folders"].items()}
+                tags = {k: Tag.from_record(v) for k, v in records["tags"].items()}
+            
+            # Inhalte von Ordnern und Tags ergeben sich aus den Einträgen selbst
+            for folder in folders.values():
+                self.folder_index.add_folder(folder.id, folder.parent_id)
+                if folder.parent_id in folders:
+                    folders[folder.parent_id].subfolders.append(folder.id)
+            for document in documents.values():
+                if document.status == DocumentStatus.DELETED:
+                    continue
+                self.folder_index.add_document(document.id, document.folder_id)
+                if document.folder_id in folders:
+                    folders[document.folder_id].documents.add(document.id)
+                for tag_id in document.tags:
+                    if tag_id in tags:
+                        tags[tag_id].documents.add(document.id)
+            
+            # Ordinalzahlen in Ladereihenfolge, damit Indextreffer in derselben Reihenfolge erscheinen
+            self.ordinals.extend(documents)
+            self._folders = folders
+            self._tags = tags
+            self._documents = documents
+
+    def _metadata_snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Liefert den aktuellen Stand für einen neuen Snapshot"""
+        # list() kopiert die Werte in einem Schritt, parallele Änderungen stören nicht
+        return {
+            "documents": [d.to_record() for d in list(self.documents.values())],
+            "folders": [f.to_record() for f in list(self.folders.values())],
+            "tags": [t.to_record() for t in list(self.tags.values())],
+        }
+
+    def _save_document(self, document: Document) -> None:
+        self.metadata.put("documents", document.to_record())
+
+    def _save_folder(self, folder: Folder) -> None:
+        self.metadata.put("folders", folder.to_record())
+
+    def _save_tag(self, tag: Tag) -> None:
+        self.metadata.put("tags", tag.to_record())
+
+    def close(self) -> None:
+        """Schließt das Änderungslog"""
+        self.metadata.close()
+
+    def _file_text(self, document: Document) -> str:
+        """Liest den Anfang einer Textdatei für die Volltextsuche"""
+        if not self.index_file_text or document.document_type != DocumentType.TEXT:
+            return ""
+        try:
+            with open(document.file_path, 'rb') as f:
+                return f.read(MAX_INDEXED_TEXT_BYTES).decode('utf-8', errors='replace')
+        except OSError:
+            return ""
+
+    def _document_texts(self, document: Document) -> List[str]:
+        return [document.name, document.description, self._file_text(document)]
+
+    def _text_search_index(self) -> DocumentSearchIndex:
+        """Gibt den Suchindex zurück und baut ihn beim ersten Aufruf auf"""
+        if self._search_index is None:
+            with self._search_index_lock:
+                if self._search_index is None:
+                    index = DocumentSearchIndex()
+                    with _gc_paused():
+                        index.rebuild(
+                            (self.ordinals.get(document.id), trigrams(self._document_texts(document)))
+                            for document in list(self.documents.values())
+                        )
+                    self._search_index = index
+        return self._search_index
+
+    def _index_document(self, document: Document, old_texts: Optional[List[str]] = None) -> None:
+        """Führt ein neues oder geändertes Dokument im Suchindex nach, sofern er schon aufgebaut ist"""
+        if self._search_index is None:
+            return
+        ordinal = self.ordinals.get(document.id)
+        new_grams = trigrams(self._document_texts(document))
+        if old_texts is None:
+            self._search_index.add(ordinal, new_grams)
+        else:
+            self._search_index.update(ordinal, trigrams(old_texts), new_grams)
+
+    def _tag_bitmap_index(self) -> TagBitmapIndex:
+        """Gibt den Tag-Index zurück und baut ihn beim ersten Aufruf auf"""
+        if self._tag_index is None:
+            with self._tag_index_lock:
+                if self._tag_index is None:
+                    index = TagBitmapIndex()
+                    with _gc_paused():
+                        for document in list(self.documents.values()):
+                            if document.tags:
+                                index.add(self.ordinals.get(document.id), document.tags)
+                    self._tag_index = index
+        return self._tag_index
+
+    def _index_document_tags(self, document: Document, old_tags: Set[str]) -> None:
+        """Führt geänderte Tags eines Dokuments im Tag-Index nach, sofern er schon aufgebaut ist"""
+        if self._tag_index is None or old_tags == document.tags:
+            return
+        ordinal = self.ordinals.get(document.id)
+        with self._tag_index.lock:
+            self._tag_index.remove(ordinal, old_tags - document.tags)
+            self._tag_index.add(ordinal, document.tags - old_tags)
+
+    def _matches_query(self, document: Document, query: str) -> bool:
+        return (query in document.name.lower() or query in document.description.lower()
+                or query in self._file_text(document).lower())
 
     def create_document(
         self,
@@ -73,7 +259,7 @@ class DocumentService:
         # Speichere die Datei in das Dokumentenverzeichnis
         file_name = os.path.basename(file_path)
         dest_path = os.path.join(document_dir, f"v1_{file_name}")
-        shutil.copy2(file_path, dest_path)
+        self.blobs.add(file_path, dest_path)
         
         # Aktualisiere den Dateipfad im Dokument
         document.file_path = dest_path
@@ -81,6 +267,11 @@ class DocumentService:
         
         # Speichere das Dokument
         self.documents[document.id] = document
+        self.ordinals.get(document.id)
+        self._save_document(document)
+        self._index_document(document)
+        self._index_document_tags(document, set())
+        self.folder_index.add_document(document.id, folder_id)
         
         # Füge das Dokument zum Ordner hinzu, falls angegeben
         if folder_id and folder_id in self.folders:
@@ -132,6 +323,9 @@ class DocumentService:
         document = self.documents.get(document_id)
         if not document:
             return None
+        old_texts = self._document_texts(document) if self._search_index is not None else None
+        old_tags = set(document.tags)
+        old_folder_id = document.folder_id
             
         # Wenn eine neue Datei hochgeladen wurde
         if file_path:
@@ -143,7 +337,7 @@ class DocumentService:
             file_name = os.path.basename(file_path)
             new_version = document.version + 1
             dest_path = os.path.join(document_dir, f"v{new_version}_{file_name}")
-            shutil.copy2(file_path, dest_path)
+            self.blobs.add(file_path, dest_path)
             file_path = dest_path
         
         # Aktualisiere das Dokument
@@ -155,29 +349,36 @@ class DocumentService:
             folder_id=folder_id
         )
         
-        # Aktualisiere Ordner-Zuordnung, falls geändert
-        if folder_id and folder_id != document.folder_id:
+        # Aktualisiere Ordner-Zuordnung, falls geändert (document.update hat folder_id bereits gesetzt)
+        if folder_id and folder_id != old_folder_id:
             # Entferne aus altem Ordner
-            if document.folder_id and document.folder_id in self.folders:
-                self.folders[document.folder_id].remove_document(document_id)
+            if old_folder_id and old_folder_id in self.folders:
+                self.folders[old_folder_id].remove_document(document_id)
             
             # Füge zu neuem Ordner hinzu
             if folder_id in self.folders:
                 self.folders[folder_id].add_document(document_id)
-                document.folder_id = folder_id
+            
+            if document.status != DocumentStatus.DELETED:
+                self.folder_index.remove_document(document_id, old_folder_id)
+                self.folder_index.add_document(document_id, folder_id)
         
         # Aktualisiere Tag-Zuordnungen, falls geändert
         if tags:
-            # Entferne das Dokument aus allen bisherigen Tags
-            for tag_id, tag in self.tags.items():
-                if document_id in tag.documents:
-                    tag.remove_document(document_id)
+            # Entferne das Dokument aus den bisherigen Tags
+            for tag_id in old_tags - document.tags:
+                if tag_id in self.tags:
+                    self.tags[tag_id].remove_document(document_id)
             
             # Füge das Dokument zu den neuen Tags hinzu
-            for tag_id in tags:
+            for tag_id in document.tags:
                 if tag_id in self.tags:
                     self.tags[tag_id].add_document(document_id)
         
+        self._save_document(document)
+        if old_texts is not None:
+            self._index_document(document, old_texts)
+        self._index_document_tags(document, old_tags)
         return document
 
     def delete_document(self, document_id: str) -> bool:
@@ -196,18 +397,69 @@ class DocumentService:
         
         # Setze Status auf "gelöscht" statt physisches Löschen (Soft Delete)
         document.change_status(DocumentStatus.DELETED)
+        self._save_document(document)
+        self.folder_index.remove_document(document_id, document.folder_id)
         
         # Entferne das Dokument aus seinem Ordner
         if document.folder_id and document.folder_id in self.folders:
             self.folders[document.folder_id].remove_document(document_id)
         
-        # Entferne das Dokument aus allen Tags
-        for tag_id, tag in self.tags.items():
-            if document_id in tag.documents:
-                tag.remove_document(document_id)
+        # Entferne das Dokument aus seinen Tags
+        for tag_id in document.tags:
+            if tag_id in self.tags:
+                self.tags[tag_id].remove_document(document_id)
         
         return True
 
+    def purge_document(self, document_id: str) -> bool:
+        """
+        Entfernt ein gelöschtes Dokument endgültig samt seinen Dateiversionen
+        
+        Inhalte, auf die danach keine Version mehr verweist, gibt erst
+        ``collect_garbage`` frei.
+        
+        Args:
+            document_id: ID des zu entfernenden Dokuments
+            
+        Returns:
+            True, wenn das Dokument entfernt wurde, False, wenn es nicht existiert oder nicht gelöscht ist
+            
+        Raises:
+            OSError: Wenn sich die Dateiversionen nicht löschen lassen
+        """
+        document = self.documents.get(document_id)
+        if not document or document.status != DocumentStatus.DELETED:
+            return False
+        
+        # Zuerst die Dateien: scheitert das Löschen, bleibt das Dokument für einen erneuten Versuch erhalten
+        remove_tree(os.path.join(self.storage_path, document_id))
+        
+        # Gelöschte Dokumente bleiben über den Status auffindbar und stehen daher noch in den Indizes
+        ordinal = self.ordinals.get(document_id)
+        if self._search_index is not None:
+            self._search_index.remove(ordinal, trigrams(self._document_texts(document)))
+        if self._tag_index is not None:
+            self._tag_index.remove(ordinal, document.tags)
+        for tag_id in document.tags:
+            if tag_id in self.tags:
+                self.tags[tag_id].remove_document(document_id)
+        
+        del self.documents[document_id]
+        self.metadata.delete("documents", document_id)
+        return True
+
+    def collect_garbage(self, min_age: float = GC_MIN_AGE) -> int:
+        """
+        Entfernt gespeicherte Inhalte, auf die keine Dokumentversion mehr verweist
+        
+        Args:
+            min_age: Mindestalter in Sekunden, jüngere Inhalte werden noch nicht entfernt
+            
+        Returns:
+            Anzahl der entfernten Dateien
+        """
+        return self.blobs.collect_garbage(min_age)
+
     def create_folder(
         self,
         name: str,
@@ -236,6 +488,8 @@ class DocumentService:
         
         # Speichere den Ordner
         self.folders[folder.id] = folder
+        self._save_folder(folder)
+        self.folder_index.add_folder(folder.id, parent_id)
         
         # Füge den Ordner zum übergeordneten Ordner hinzu, falls angegeben
         if parent_id and parent_id in self.folders:
@@ -273,33 +527,78 @@ class DocumentService:
             
         Returns:
             Der aktualisierte Ordner oder None, falls nicht gefunden
+            
+        Raises:
+            ValueError: Wenn der neue übergeordnete Ordner im Unterbaum des Ordners liegt
         """
         folder = self.folders.get(folder_id)
         if not folder:
             return None
         
+        # Aktualisiere übergeordneten Ordner, falls geändert
+        if parent_id and parent_id != folder.parent_id and parent_id in self.folders:
+            self._move_folder(folder, parent_id)
+        
         if name:
             folder.name = name
         if description:
             folder.description = description
         
-        # Aktualisiere übergeordneten Ordner, falls geändert
-        if parent_id and parent_id != folder.parent_id:
-            # Entferne aus altem übergeordneten Ordner
-            if folder.parent_id and folder.parent_id in self.folders:
-                self.folders[folder.parent_id].remove_subfolder(folder_id)
+        folder.updated_at = datetime.now()
+        self._save_folder(folder)
+        return folder
+
+    def move_folder(self, folder_id: str, parent_id: Optional[str] = None) -> Optional[Folder]:
+        """
+        Verschiebt einen Ordner samt Unterordnern und Dokumenten
+        
+        Unterordner und Dokumente verweisen nur auf ihren direkten Ordner und
+        wandern daher mit, ohne selbst geändert zu werden.
+        
+        Args:
+            folder_id: ID des zu verschiebenden Ordners
+            parent_id: ID des neuen übergeordneten Ordners oder None für das Stammverzeichnis
             
-            # Füge zu neuem übergeordneten Ordner hinzu
-            if parent_id in self.folders:
-                self.folders[parent_id].add_subfolder(folder_id)
-                folder.parent_id = parent_id
+        Returns:
+            Der verschobene Ordner oder None, falls Ordner oder Zielordner nicht gefunden
+            
+        Raises:
+            ValueError: Wenn der Zielordner im Unterbaum des Ordners liegt
+        """
+        folder = self.folders.get(folder_id)
+        if not folder or (parent_id is not None and parent_id not in self.folders):
+            return None
         
-        folder.updated_at = datetime.now()
+        if parent_id != folder.parent_id:
+            self._move_folder(folder, parent_id)
+            folder.updated_at = datetime.now()
+            self._save_folder(folder)
         return folder
 
+    def _move_folder(self, folder: Folder, parent_id: Optional[str]) -> None:
+        """Hängt einen Ordner um, nachdem ausgeschlossen ist, dass ein Zyklus entsteht"""
+        # Von Zielordner bis zur Wurzel aufsteigen: Aufwand nach Tiefe statt nach Unterbaumgröße
+        ancestor_id, seen = parent_id, set()
+        while ancestor_id in self.folders and ancestor_id not in seen:
+            if ancestor_id == folder.id:
+                raise ValueError(f"Ordner {folder.id} kann nicht in seinen eigenen Unterbaum verschoben werden")
+            seen.add(ancestor_id)
+            ancestor_id = self.folders[ancestor_id].parent_id
+        
+        # Entferne aus altem übergeordneten Ordner
+        if folder.parent_id and folder.parent_id in self.folders:
+            self.folders[folder.parent_id].remove_subfolder(folder.id)
+        
+        # Füge zu neuem übergeordneten Ordner hinzu
+        if parent_id in self.folders:
+            self.folders[parent_id].add_subfolder(folder.id)
+        
+        self.folder_index.move_folder(folder.id, folder.parent_id, parent_id)
+        folder.parent_id = parent_id
+
     def delete_folder(self, folder_id: str) -> bool:
         """
-        Löscht einen Ordner
+        Löscht einen Ordner samt Unterordnern
         
         Args:
             folder_id: ID des zu löschenden Ordners
@@ -315,17 +614,22 @@ class DocumentService:
         if folder.parent_id and folder.parent_id in self.folders:
             self.folders[folder.parent_id].remove_subfolder(folder_id)
         
-        # Setze den Status aller Dokumente im Ordner auf "gelöscht"
-        for document_id in folder.documents:
-            if document_id in self.documents:
-                self.documents[document_id].change_status(DocumentStatus.DELETED)
-        
-        # Lösche alle Unterordner rekursiv
-        for subfolder_id in folder.subfolders:
-            self.delete_folder(subfolder_id)
-        
-        # Entferne den Ordner aus der Sammlung
-        del self.folders[folder_id]
+        # Der Index liefert den Unterbaum, ohne alle Ordner zu durchlaufen
+        folder_ids = [subfolder_id for subfolder_id in self.folder_index.subtree(folder_id)
+                      if subfolder_id in self.folders]
+        for subfolder_id in folder_ids:
+            # Setze den Status aller Dokumente im Ordner auf "gelöscht"
+            for document_id in self.folder_index.documents(subfolder_id):
+                document = self.documents.get(document_id)
+                if document:
+                    document.change_status(DocumentStatus.DELETED)
+                    self._save_document(document)
+        
+        # Entferne die Ordner aus der Sammlung, Unterordner zuerst
+        for subfolder_id in reversed(folder_ids):
+            self.folder_index.remove_folder(subfolder_id, self.folders[subfolder_id].parent_id)
+            del self.folders[subfolder_id]
+            self.metadata.delete("folders", subfolder_id)
         
         return True
 
@@ -342,6 +646,7 @@ class DocumentService:
         """
         tag = Tag(name=name, color=color)
         self.tags[tag.id] = tag
+        self._save_tag(tag)
         return tag
 
     def get_tag(self, tag_id: str) -> Optional[Tag]:
@@ -382,6 +687,7 @@ class DocumentService:
         if color:
             tag.color = color
         
+        self._save_tag(tag)
         return tag
 
     def delete_tag(self, tag_id: str) -> bool:
@@ -399,11 +705,13 @@ class DocumentService:
         
         # Entferne den Tag aus der Sammlung
         del self.tags[tag_id]
+        self.metadata.delete("tags", tag_id)
         
-        # Entferne den Tag aus allen Dokumenten
-        for document_id, document in self.documents.items():
-            if tag_id in document.tags:
-                document.tags.remove(tag_id)
+        # Entferne den Tag aus seinen Dokumenten, die Bitmap liefert sie ohne Durchlauf aller Dokumente
+        for document_id in self.ordinals.ids(self._tag_bitmap_index().drop(tag_id)):
+            document = self.documents[document_id]
+            document.tags.discard(tag_id)
+            self._save_document(document)
         
         return True
 
@@ -414,33 +722,45 @@ class DocumentService:
         folder_id: Optional[str] = None,
         tags: Optional[List[str]] = None,
         owner_id: Optional[int] = None,
-        status: Optional[DocumentStatus] = None
+        status: Optional[DocumentStatus] = None,
+        match_all_tags: bool = True
     ) -> List[Document]:
         """
         Sucht nach Dokumenten basierend auf verschiedenen Kriterien
         
         Args:
-            query: Suchbegriff für Namen und Beschreibung
+            query: Suchbegriff (Teilstring) für Namen, Beschreibung und ggf. Dateitext
             document_type: Zu filternder Dokumenttyp
             folder_id: Zu filternde Ordner-ID
             tags: Liste von Tag-IDs für die Filterung
             owner_id: Zu filternde Besitzer-ID
             status: Zu filternder Status
+            match_all_tags: Dokumente mit allen Tags (True) oder mit mindestens einem (False)
             
         Returns:
             Liste der gefundenen Dokumente
         """
         results = []
         
-        for document_id, document in self.documents.items():
+        # Kandidaten aus Trigramm- und Tag-Index, geschnitten über die Ordinalzahlen
+        query = query.lower()
+        tagged = self._tag_bitmap_index().match(tags, match_all_tags) if tags else None
+        if query:
+            ordinals = self._text_search_index().candidates(query)
+            if tagged is not None:
+                ordinals = [ordinal for ordinal in ordinals if ordinal in tagged]
+        else:
+            ordinals = tagged
+        if ordinals is not None:
+            candidates = [self.documents[document_id] for document_id in self.ordinals.ids(ordinals)]
+        else:
+            candidates = self.documents.values()
+        
+        for document in candidates:
             # Überspringe gelöschte Dokumente, es sei denn, es wird explizit danach gesucht
             if document.status == DocumentStatus.DELETED and status != DocumentStatus.DELETED:
                 continue
                 
-            # Filtere nach Suchbegriff
-            if query and query.lower() not in document.name.lower() and query.lower() not in document.description.lower():
-                continue
-                
             # Filtere nach Dokumenttyp
             if document_type and document.document_type != document_type:
                 continue
@@ -449,10 +769,6 @@ class DocumentService:
             if folder_id and document.folder_id != folder_id:
                 continue
                 
-            # Filtere nach Tags
-            if tags and not all(tag_id in document.tags for tag_id in tags):
-                continue
-                
             # Filtere nach Besitzer
             if owner_id and document.owner_id != owner_id:
                 continue
@@ -461,6 +777,10 @@ class DocumentService:
             if status and document.status != status:
                 continue
                 
+            # Suchbegriff zuletzt bestätigen, der Dateitext muss dafür gelesen werden
+            if query and not self._matches_query(document, query):
+                continue
+                
             results.append(document)
         
         return results
@@ -475,17 +795,54 @@ class DocumentService:
         Returns:
             Tupel aus (Unterordner, Dokumente) im angegebenen Ordner
         """
-        subfolders = []
-        documents = []
-        
-        # Hole alle Unterordner des angegebenen Ordners
-        for subfolder_id, subfolder in self.folders.items():
-            if subfolder.parent_id == folder_id:
-                subfolders.append(subfolder)
+        folders = self.folders
+        subfolders = [folders[subfolder_id] for subfolder_id in self.folder_index.subfolders(folder_id)]
+        return subfolders, self._folder_documents([folder_id])
+
+    def _folder_documents(self, folder_ids: List[Optional[str]]) -> List[Document]:
+        """Gibt die nicht gelöschten Dokumente der Ordner in Anlagereihenfolge zurück"""
+        document_ids = [document_id for folder_id in folder_ids
+                        for document_id in self.folder_index.documents(folder_id)]
+        document_ids.sort(key=self.ordinals.get)
+        documents = self.documents
+        return [documents[document_id] for document_id in document_ids]
+
+    def get_folder_tree(self, folder_id: str) -> Tuple[List[Folder], List[Document]]:
+        """
+        Holt den gesamten Inhalt eines Ordners einschließlich aller Unterordner
         
-        # Hole alle Dokumente im angegebenen Ordner
-        for document_id, document in self.documents.items():
-            if document.folder_id == folder_id and document.status != DocumentStatus.DELETED:
-                documents.append(document)
+        Args:
+            folder_id: ID des Ordners
+            
+        Returns:
+            Tupel aus (alle Unterordner, alle Dokumente) unterhalb des Ordners,
+            übergeordnete Ordner vor ihren Unterordnern
+        """
+        if folder_id not in self.folders:
+            return [], []
+        folder_ids = self.folder_index.subtree(folder_id)
+        subfolders = [self.folders[subfolder_id] for subfolder_id in folder_ids[1:]]
+        return subfolders, self._folder_documents(folder_ids)
+
+    def get_folder_size(self, folder_id: str) -> Optional[Dict[str, int]]:
+        """
+        Ermittelt Umfang und Speicherbedarf eines Ordners einschließlich aller Unterordner
         
-        return subfolders, documents 
\ No newline at end of file
+        Args:
+            folder_id: ID des Ordners
+            
+        Returns:
+            Anzahl der Unterordner und Dokumente sowie Gesamtgröße in Bytes,
+            oder None, falls der Ordner nicht gefunden wurde
+        """
+        if folder_id not in self.folders:
+            return None
+        folder_ids = self.folder_index.subtree(folder_id)
+        documents = self.documents
+        document_count = 0
+        size = 0
+        for subfolder_id in folder_ids:
+            for document_id in self.folder_index.documents(subfolder_id):
+                document_count += 1
+                size += documents[document_id].size or 0
+        return {"folders": len(folder_ids) - 1, "documents": document_count, "size": size} 
\ No newline at end of file
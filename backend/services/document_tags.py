@@ -0,0 +1,126 @@
+"""
+Bitmap-Index der Tag-Zuordnungen für die Dokumentensuche
+
+Je Tag wird eine Bitmap über die Ordinalzahlen der Dokumente geführt. Die
+Bitmap ist in Blöcke zu 65536 Ordinalzahlen geteilt, jeder Block ist eine
+Python-Ganzzahl mit einem Bit je Dokument; leere Blöcke werden nicht
+gespeichert. Und- und Oder-Verknüpfungen mehrerer Tags laufen blockweise als
+Ganzzahl-Operationen statt Dokument für Dokument.
+"""
+
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Bits je Block (2^16), wie bei Roaring-Bitmaps
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+
+
+class Bitmap:
+    """Komprimierte Menge nicht negativer Ganzzahlen"""
+
+    __slots__ = ("_chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, int]] = None):
+        self._chunks: Dict[int, int] = chunks or {}
+
+    def add(self, value: int) -> None:
+        key = value >> _CHUNK_BITS
+        self._chunks[key] = self._chunks.get(key, 0) | (1 << (value & _CHUNK_MASK))
+
+    def discard(self, value: int) -> None:
+        key = value >> _CHUNK_BITS
+        bits = self._chunks.get(key)
+        if bits is None:
+            return
+        bits &= ~(1 << (value & _CHUNK_MASK))
+        if bits:
+            self._chunks[key] = bits
+        else:
+            del self._chunks[key]
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self._chunks.get(value >> _CHUNK_BITS, 0) >> (value & _CHUNK_MASK) & 1)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = sorted((self._chunks, other._chunks), key=len)
+        chunks = {}
+        for key, bits in small.items():
+            common = bits & large.get(key, 0)
+            if common:
+                chunks[key] = common
+        return Bitmap(chunks)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self._chunks)
+        for key, bits in other._chunks.items():
+            chunks[key] = chunks.get(key, 0) | bits
+        return Bitmap(chunks)
+
+    def __len__(self) -> int:
+        return sum(bits.bit_count() for bits in self._chunks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        """Liefert die enthaltenen Werte aufsteigend"""
+        for key in sorted(self._chunks):
+            base = key << _CHUNK_BITS
+            bits = self._chunks[key]
+            while bits:
+                lowest = bits & -bits
+                yield base + lowest.bit_length() - 1
+                bits ^= lowest
+
+
+class TagBitmapIndex:
+    """Tag-ID -> Bitmap der Ordinalzahlen aller Dokumente mit diesem Tag"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._bitmaps: Dict[str, Bitmap] = {}
+
+    def add(self, ordinal: int, tag_ids: Iterable[str]) -> None:
+        with self.lock:
+            for tag_id in tag_ids:
+                bitmap = self._bitmaps.get(tag_id)
+                if bitmap is None:
+                    bitmap = self._bitmaps[tag_id] = Bitmap()
+                bitmap.add(ordinal)
+
+    def remove(self, ordinal: int, tag_ids: Iterable[str]) -> None:
+        with self.lock:
+            for tag_id in tag_ids:
+                bitmap = self._bitmaps.get(tag_id)
+                if bitmap is not None:
+                    bitmap.discard(ordinal)
+                    if not bitmap:
+                        del self._bitmaps[tag_id]
+
+    def drop(self, tag_id: str) -> Bitmap:
+        """Entfernt einen Tag und gibt die Bitmap seiner Dokumente zurück"""
+        with self.lock:
+            return self._bitmaps.pop(tag_id, None) or Bitmap()
+
+    def match(self, tag_ids: List[str], match_all: bool = True) -> Bitmap:
+        """Dokumente mit allen (``match_all``) bzw. mindestens einem der Tags"""
+        with self.lock:
+            bitmaps = [self._bitmaps.get(tag_id) for tag_id in dict.fromkeys(tag_ids)]
+            if match_all:
+                if not bitmaps or any(bitmap is None for bitmap in bitmaps):
+                    return Bitmap()
+                # Kleinste Bitmap zuerst, dann schrumpft das Zwischenergebnis am schnellsten
+                bitmaps.sort(key=lambda bitmap: len(bitmap._chunks))
+                # Kopie, der Index ändert seine Bitmaps weiter
+                result = Bitmap(dict(bitmaps[0]._chunks))
+                for bitmap in bitmaps[1:]:
+                    result = result & bitmap
+                    if not result:
+                        break
+                return result
+            result = Bitmap()
+            for bitmap in bitmaps:
+                if bitmap is not None:
+                    result = result | bitmap
+            return result
@@ -0,0 +1,290 @@
+"""
+Asynchrone Variante des E-Commerce-Service für die FastAPI-Routen
+
+Die Datei- und Datenbankzugriffe des ECommerceService sind synchron. Damit sie
+den Event-Loop nicht blockieren, laufen sie hier in einem begrenzten
+Thread-Pool. Schreibende Aufrufe halten zusätzlich je betroffener Datei ein
+asyncio-Lock: Anfragen auf dieselbe Datei warten im Event-Loop statt einen
+Pool-Thread an der Dateisperre zu belegen, Anfragen auf andere Dateien
+laufen ungehindert weiter.
+"""
+
+import io
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from models.ecommerce import (
+    Product, ProductCategory, ShoppingCart,
+    Order, OrderItem, Address, Discount, Review, ReviewSummary, ProductImportResult, StockLevel
+)
+from services.ecommerce_service import IMPORT_BATCH_SIZE, ECommerceService
+
+logger = logging.getLogger(__name__)
+
+# Anzahl der Threads für blockierende Store-Zugriffe je Worker
+IO_THREADS = int(os.environ.get("ECOMMERCE_IO_THREADS", "8"))
+
+
+class _AsyncByteReader(io.RawIOBase):
+    """
+    Blockierende Leseschnittstelle über einen asynchronen Byte-Strom
+
+    Wird im Pool-Thread gelesen; jeder Teil des Stroms wird erst dann aus dem
+    Event-Loop geholt, wenn der Leser ihn braucht. Der Strom wird so weder
+    vollständig im Speicher gehalten noch zwischengespeichert.
+    """
+
+    def __init__(self, chunks: AsyncIterable[bytes], loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = memoryview(b"")
+        self._exhausted = False
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._exhausted:
+            chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            if chunk is None:
+                self._exhausted = True
+            else:
+                self._buffer = memoryview(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class AsyncECommerceService:
+    """
+    Async-Fassade über ECommerceService
+
+    Bietet die von den Routen genutzten Methoden des synchronen Service als
+    Koroutinen an. Der synchrone Service bleibt über ``service`` erreichbar.
+    """
+
+    def __init__(self, service: Optional[ECommerceService] = None, max_workers: int = IO_THREADS):
+        self.service = service or ECommerceService()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ecommerce-io")
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, path: str) -> asyncio.Lock:
+        lock = self._locks.get(path)
+        if lock is None:
+            lock = self._locks.setdefault(path, asyncio.Lock())
+        return lock
+
+    async def _run(self, func: Callable, *args, stores: Iterable[Any] = ()) -> Any:
+        """
+        Führt einen synchronen Service-Aufruf im Thread-Pool aus
+
+        Args:
+            func: Aufzurufende Service-Methode
+            stores: Stores, in die der Aufruf schreibt; ihre Locks werden in
+                fester Reihenfolge geholt, damit sich Aufrufe nicht gegenseitig blockieren
+        """
+        loop = asyncio.get_running_loop()
+        async with AsyncExitStack() as stack:
+            for path in sorted({store.file_path for store in stores}):
+                await stack.enter_async_context(self._lock(path))
+            return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def _cart_store(self, session_id: str):
+        return self.service.carts.shard_for(session_id)
+
+    def shutdown(self) -> None:
+        """Beendet den Thread-Pool nach Abschluss laufender Aufrufe"""
+        self._executor.shutdown(wait=True)
+
+    # Produkte
+    async def get_products(self, skip: int = 0, limit: int = 100, category_id: Optional[int] = None,
+                           active_only: bool = True, include_subcategories: bool = False,
+                           sort: Optional[str] = None) -> List[Product]:
+        return await self._run(self.service.get_products, skip, limit, category_id, active_only,
+                               include_subcategories, sort)
+
+    async def get_products_page_json(self, limit: int = 100, cursor: Optional[str] = None,
+                                     category_id: Optional[int] = None, active_only: bool = True,
+                                     include_subcategories: bool = False) -> Tuple[bytes, Optional[str]]:
+        return await self._run(self.service.get_products_page_json, limit, cursor, category_id, active_only,
+                               include_subcategories)
+
+    async def search_products_json(self, query: str, limit: int = 20, category_id: Optional[int] = None,
+                                   active_only: bool = True) -> bytes:
+        return await self._run(self.service.search_products_json, query, limit, category_id, active_only)
+
+    async def get_related_products(self, product_id: int, limit: int = 10,
+                                   active_only: bool = True) -> List[Product]:
+        return await self._run(self.service.get_related_products, product_id, limit, active_only)
+
+    async def get_product(self, product_id: int) -> Optional[Product]:
+        return await self._run(self.service.get_product, product_id)
+
+    async def get_stock(self, product_id: int) -> Optional[StockLevel]:
+        return await self._run(self.service.get_stock, product_id)
+
+    async def create_product(self, product: Product) -> Product:
+        return await self._run(self.service.create_product, product, stores=[self.service.products])
+
+    async def update_product(self, product_id: int, product: Product) -> Optional[Product]:
+        return await self._run(self.service.update_product, product_id, product,
+                               stores=[self.service.products])
+
+    async def delete_product(self, product_id: int) -> bool:
+        return await self._run(self.service.delete_product, product_id, stores=[self.service.products])
+
+    async def import_products_stream(self, chunks: AsyncIterable[bytes], import_format: str,
+                                     batch_size: int = IMPORT_BATCH_SIZE) -> ProductImportResult:
+        """Importiert Produkte direkt aus einem asynchronen Byte-Strom, z.B. dem Request-Body"""
+        stream = io.BufferedReader(_AsyncByteReader(chunks, asyncio.get_running_loop()))
+        return await self._run(self.service.import_products_file, stream, import_format, batch_size,
+                               stores=[self.service.products])
+
+    # Kategorien
+    async def get_categories(self, skip: int = 0, limit: int = 100,
+                             active_only: bool = True) -> List[ProductCategory]:
+        return await self._run(self.service.get_categories, skip, limit, active_only)
+
+    async def get_category(self, category_id: int) -> Optional[ProductCategory]:
+        return await self._run(self.service.get_category, category_id)
+
+    async def create_category(self, category: ProductCategory) -> ProductCategory:
+        return await self._run(self.service.create_category, category, stores=[self.service.categories])
+
+    async def update_category(self, category_id: int, category: ProductCategory) -> Optional[ProductCategory]:
+        return await self._run(self.service.update_category, category_id, category,
+                               stores=[self.service.categories])
+
+    async def delete_category(self, category_id: int) -> bool:
+        return await self._run(self.service.delete_category, category_id, stores=[self.service.categories])
+
+    # Warenkorb
+    async def get_cart(self, session_id: str) -> ShoppingCart:
+        return await self._run(self.service.get_cart, session_id, stores=[self._cart_store(session_id)])
+
+    async def add_to_cart(self, session_id: str, product_id: int, quantity: int = 1) -> ShoppingCart:
+        return await self._run(self.service.add_to_cart, session_id, product_id, quantity,
+                               stores=[self._cart_store(session_id)])
+
+    async def remove_from_cart(self, session_id: str, product_id: int,
+                               quantity: Optional[int] = None) -> ShoppingCart:
+        return await self._run(self.service.remove_from_cart, session_id, product_id, quantity,
+                               stores=[self._cart_store(session_id)])
+
+    async def clear_cart(self, session_id: str) -> ShoppingCart:
+        return await self._run(self.service.clear_cart, session_id, stores=[self._cart_store(session_id)])
+
+    async def apply_discount_to_cart(self, session_id: str, discount_code: str) -> ShoppingCart:
+        return await self._run(self.service.apply_discount_to_cart, session_id, discount_code,
+                               stores=[self._cart_store(session_id)])
+
+    async def remove_discount_from_cart(self, session_id: str) -> ShoppingCart:
+        return await self._run(self.service.remove_discount_from_cart, session_id,
+                               stores=[self._cart_store(session_id)])
+
+    # Bestellungen
+    async def create_order(self, cart: ShoppingCart, customer_id: int,
+                           shipping_address_id: int, billing_address_id: int,
+                           payment_method: str, shipping_method: str) -> Order:
+        service = self.service
+        return await self._run(
+            service.create_order, cart, customer_id, shipping_address_id, billing_address_id,
+            payment_method, shipping_method,
+            stores=[service.orders, service.order_items, service.discounts, service.product_sales,
+                    self._cart_store(cart.session_id)]
+        )
+
+    async def get_orders(self, customer_id: int, skip: int = 0, limit: int = 100) -> List[Order]:
+        return await self._run(self.service.get_orders, customer_id, skip, limit)
+
+    async def get_orders_page_json(self, customer_id: int, limit: int = 100,
+                                   cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        return await self._run(self.service.get_orders_page_json, customer_id, limit, cursor)
+
+    async def get_order(self, order_id: int) -> Optional[Order]:
+        return await self._run(self.service.get_order, order_id)
+
+    async def get_order_items(self, order_id: int) -> List[OrderItem]:
+        return await self._run(self.service.get_order_items, order_id)
+
+    async def update_order_status(self, order_id: int, status: str) -> Optional[Order]:
+        return await self._run(self.service.update_order_status, order_id, status,
+                               stores=[self.service.orders])
+
+    # Adressen
+    async def get_addresses(self, customer_id: int) -> List[Address]:
+        return await self._run(self.service.get_addresses, customer_id)
+
+    async def get_address(self, address_id: int) -> Optional[Address]:
+        return await self._run(self.service.get_address, address_id)
+
+    async def get_default_address(self, customer_id: int, address_type: str) -> Optional[Address]:
+        return await self._run(self.service.get_default_address, customer_id, address_type)
+
+    async def create_address(self, address: Address) -> Address:
+        return await self._run(self.service.create_address, address, stores=[self.service.addresses])
+
+    async def update_address(self, address_id: int, address: Address) -> Optional[Address]:
+        return await self._run(self.service.update_address, address_id, address,
+                               stores=[self.service.addresses])
+
+    async def delete_address(self, address_id: int) -> bool:
+        return await self._run(self.service.delete_address, address_id, stores=[self.service.addresses])
+
+    # Rabatte
+    async def get_discounts(self, active_only: bool = True) -> List[Discount]:
+        return await self._run(self.service.get_discounts, active_only)
+
+    async def get_discount(self, discount_id: int) -> Optional[Discount]:
+        return await self._run(self.service.get_discount, discount_id)
+
+    async def get_discount_by_code(self, code: str) -> Optional[Discount]:
+        return await self._run(self.service.get_discount_by_code, code)
+
+    async def create_discount(self, discount: Discount) -> Discount:
+        return await self._run(self.service.create_discount, discount, stores=[self.service.discounts])
+
+    async def update_discount(self, discount_id: int, discount: Discount) -> Optional[Discount]:
+        return await self._run(self.service.update_discount, discount_id, discount,
+                               stores=[self.service.discounts])
+
+    async def delete_discount(self, discount_id: int) -> bool:
+        return await self._run(self.service.delete_discount, discount_id, stores=[self.service.discounts])
+
+    # Bewertungen
+    async def get_product_reviews(self, product_id: int, skip: int = 0, limit: int = 100,
+                                  approved_only: bool = True) -> List[Review]:
+        return await self._run(self.service.get_product_reviews, product_id, skip, limit, approved_only)
+
+    async def get_product_reviews_page_json(self, product_id: int, limit: int = 100,
+                                            cursor: Optional[str] = None,
+                                            approved_only: bool = True) -> Tuple[bytes, Optional[str]]:
+        return await self._run(self.service.get_product_reviews_page_json, product_id, limit, cursor,
+                               approved_only)
+
+    async def get_review_summaries(self, product_ids: Iterable[int]) -> List[ReviewSummary]:
+        return await self._run(self.service.get_review_summaries, list(product_ids))
+
+    async def create_review(self, review: Review) -> Review:
+        return await self._run(self.service.create_review, review,
+                               stores=[self.service.reviews, self.service.review_stats])
+
+    async def approve_review(self, review_id: int) -> Optional[Review]:
+        return await self._run(self.service.approve_review, review_id,
+                               stores=[self.service.reviews, self.service.review_stats])
+
+    async def delete_review(self, review_id: int) -> bool:
+        return await self._run(self.service.delete_review, review_id,
+                               stores=[self.service.reviews, self.service.review_stats])
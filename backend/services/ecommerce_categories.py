@@ -0,0 +1,154 @@
+"""
+Kategoriebaum für den E-Commerce-Katalog
+
+Jede Kategorie erhält einen materialisierten Pfad aus den IDs ihrer Vorfahren
+("/1/4/9/"). Die Pfade werden sortiert gehalten; alle Nachfahren einer
+Kategorie liegen damit in einem zusammenhängenden Bereich, den eine
+Binärsuche findet, statt den Baum Ebene für Ebene abzufragen.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Größer als jedes Zeichen eines Pfads (Ziffern und "/"), begrenzt den Präfixbereich
+_PATH_END = "~"
+
+
+class CategoryTree:
+    """
+    Materialisierte Pfade aller Kategorien
+
+    Kategorien mit unbekannter übergeordneter Kategorie (oder in einem Zyklus
+    aus Altdaten) werden als Wurzel geführt. Änderungen werden über ``add``
+    inkrementell nachgeführt. Deaktivierte Kategorien bleiben im Baum, damit
+    ihr Unterbaum beim Reaktivieren erhalten bleibt.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._parents: Dict[int, Optional[int]] = {}
+        self._paths: Dict[int, str] = {}
+        self._ids_by_path: Dict[str, int] = {}
+        self._ordered: List[str] = []
+        self._inactive: Set[int] = set()
+
+    def rebuild(self, categories: Iterable[Dict[str, Any]]) -> None:
+        """Baut den Baum vollständig aus den Kategoriedatensätzen neu auf"""
+        with self.lock:
+            categories = list(categories)
+            self._parents = {c['id']: c.get('parent_id') for c in categories}
+            self._inactive = {c['id'] for c in categories if not c.get('active', True)}
+            self._paths = {}
+            for category_id in self._parents:
+                self._resolve(category_id)
+            self._ids_by_path = {path: category_id for category_id, path in self._paths.items()}
+            self._ordered = sorted(self._ids_by_path)
+
+    def _resolve(self, category_id: int) -> str:
+        # Iterativ, damit tiefe Bäume nicht an die Rekursionsgrenze stoßen
+        chain = []
+        seen = set()
+        current = category_id
+        while current not in self._paths:
+            chain.append(current)
+            seen.add(current)
+            parent_id = self._parents.get(current)
+            if parent_id is None or parent_id not in self._parents or parent_id in seen:
+                prefix = "/"
+                break
+            current = parent_id
+        else:
+            prefix = self._paths[current]
+        for node in reversed(chain):
+            prefix = f"{prefix}{node}/"
+            self._paths[node] = prefix
+        return self._paths[category_id]
+
+    def check_parent(self, category_id: int, parent_id: Optional[int]) -> None:
+        """
+        Prüft, ob eine Kategorie unter ``parent_id`` gehängt werden darf
+
+        Raises:
+            ValueError: Wenn die Kategorie dadurch unter sich selbst oder einem
+                ihrer Nachfahren hinge
+        """
+        with self.lock:
+            if parent_id is None or category_id not in self._paths or parent_id not in self._paths:
+                return
+            if parent_id in self.descendants(category_id):
+                raise ValueError(
+                    f"Kategorie {parent_id} liegt unterhalb von Kategorie {category_id} "
+                    f"und kann nicht übergeordnet werden"
+                )
+
+    def add(self, category: Dict[str, Any]) -> None:
+        """Nimmt eine Kategorie auf oder hängt sie samt Unterbaum um"""
+        with self.lock:
+            category_id = category['id']
+            parent_id = category.get('parent_id')
+            if category.get('active', True):
+                self._inactive.discard(category_id)
+            else:
+                self._inactive.add(category_id)
+            old_path = self._paths.get(category_id)
+            self._parents[category_id] = parent_id
+            if parent_id is not None and parent_id in self._paths and category_id not in self.ancestors(parent_id):
+                new_path = f"{self._paths[parent_id]}{category_id}/"
+            else:
+                new_path = f"/{category_id}/"
+            if old_path == new_path:
+                return
+            if old_path is None:
+                self._store_path(category_id, new_path)
+                return
+            # Der gesamte Unterbaum wandert mit: gemeinsames Präfix austauschen
+            start, end = self._range(old_path)
+            moved = [self._ids_by_path.pop(path) for path in self._ordered[start:end]]
+            del self._ordered[start:end]
+            for node in moved:
+                self._store_path(node, new_path + self._paths[node][len(old_path):])
+
+    def _store_path(self, category_id: int, path: str) -> None:
+        self._paths[category_id] = path
+        self._ids_by_path[path] = category_id
+        insort(self._ordered, path)
+
+    def _range(self, path: str):
+        return (bisect_left(self._ordered, path),
+                bisect_left(self._ordered, path + _PATH_END))
+
+    def descendants(self, category_id: int, active_only: bool = False) -> List[int]:
+        """
+        Gibt die Kategorie und alle Nachfahren zurück (leer, wenn unbekannt)
+
+        Mit ``active_only`` fehlen deaktivierte Nachfahren samt ihrem Unterbaum;
+        die Kategorie selbst ist immer enthalten.
+        """
+        with self.lock:
+            path = self._paths.get(category_id)
+            if path is None:
+                return []
+            start, end = self._range(path)
+            if not active_only:
+                return [self._ids_by_path[p] for p in self._ordered[start:end]]
+            result = [category_id]
+            position = start + 1
+            while position < end:
+                node_path = self._ordered[position]
+                node = self._ids_by_path[node_path]
+                if node in self._inactive:
+                    # Unterbaum liegt zusammenhängend dahinter und wird übersprungen
+                    position = self._range(node_path)[1]
+                    continue
+                result.append(node)
+                position += 1
+            return result
+
+    def ancestors(self, category_id: int) -> List[int]:
+        """Gibt die Vorfahren von der Wurzel abwärts zurück, die Kategorie selbst zuletzt"""
+        with self.lock:
+            path = self._paths.get(category_id)
+            if path is None:
+                return []
+            return [int(part) for part in path.strip("/").split("/")]
@@ -0,0 +1,169 @@
+"""
+Rabatt-Engine für den E-Commerce-Service
+
+Die Rabatte werden einmal vorübersetzt: Gültigkeitszeiträume liegen als
+Zeitstempel in einem Intervallindex, Codes in einer Hash-Tabelle ohne
+Beachtung der Groß-/Kleinschreibung. Preisberechnungen im Warenkorb und an
+der Kasse kommen damit ohne Datumsparsing und lineare Suche aus.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Rabatttypen, die als Prozentwert verstanden werden; alle anderen sind Festbeträge
+PERCENT_TYPES = {"prozentual", "prozent", "percent", "percentage"}
+
+
+def _timestamp(value: Any, default: float) -> float:
+    """Wandelt ein Datum (ISO-String oder datetime) in einen Zeitstempel um"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class CompiledDiscount(NamedTuple):
+    """Vorübersetzter Rabatt, Gültigkeit als Zeitstempel [valid_from, valid_to]"""
+    id: int
+    code: str
+    percent: bool
+    value: float
+    minimum_order_value: Optional[float]
+    valid_from: float
+    valid_to: float
+    usage_limit: Optional[int]
+    used_count: int
+    active: bool
+    record: Dict[str, Any]
+
+    def is_valid_at(self, when: float) -> bool:
+        return self.active and self.valid_from <= when <= self.valid_to
+
+    def is_exhausted(self) -> bool:
+        return self.usage_limit is not None and self.used_count >= self.usage_limit
+
+    def amount_for(self, subtotal: float) -> float:
+        """Gibt den Rabattbetrag für eine Zwischensumme zurück (0, wenn der Mindestwert fehlt)"""
+        if self.minimum_order_value is not None and subtotal < self.minimum_order_value:
+            return 0.0
+        amount = subtotal * self.value / 100 if self.percent else self.value
+        return round(max(0.0, min(amount, subtotal)), 2)
+
+
+def compile_discount(record: Dict[str, Any]) -> CompiledDiscount:
+    """Übersetzt einen Rabatt-Datensatz für die Engine"""
+    return CompiledDiscount(
+        id=record['id'],
+        code=record['code'],
+        percent=str(record.get('discount_type', '')).lower() in PERCENT_TYPES,
+        value=float(record.get('discount_value') or 0.0),
+        minimum_order_value=record.get('minimum_order_value'),
+        valid_from=_timestamp(record.get('valid_from'), -math.inf),
+        valid_to=_timestamp(record.get('valid_to'), math.inf),
+        usage_limit=record.get('usage_limit'),
+        used_count=record.get('used_count') or 0,
+        active=record.get('active', True),
+        record=record,
+    )
+
+
+def _finite_bounds(discount: CompiledDiscount) -> List[float]:
+    return [point for point in (discount.valid_from, discount.valid_to) if math.isfinite(point)]
+
+
+class DiscountIndex:
+    """
+    Nachschlagestrukturen über alle Rabatte
+
+    Die Rabatte liegen nach dem Beginn ihres Gültigkeitszeitraums sortiert vor,
+    die Grenzen aller Zeiträume in einer zweiten sortierten Liste. Zwischen zwei
+    Grenzen ändert sich nicht, welche Rabatte gültig sein können; ein Durchlauf
+    über die begonnenen Rabatte bestimmt sie einmal je Abschnitt, danach wird
+    das Ergebnis bis zur nächsten Grenze wiederverwendet. Einzelne Rabatte
+    werden über ``put`` nachgeführt, ohne den Index neu aufzubauen.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]]):
+        self.lock = threading.RLock()
+        self._discounts: Dict[int, CompiledDiscount] = {}
+        # Code (klein geschrieben) -> aufsteigende IDs; bei doppelten Codes gewinnt die kleinste
+        self._ids_by_code: Dict[str, List[int]] = {}
+        self._starts: List[Tuple[float, int]] = []
+        self._boundaries: List[float] = []
+        # (Abschnittsbeginn, Abschnittsende, Kandidaten nach ID)
+        self._cached: Optional[Tuple[float, float, Tuple[CompiledDiscount, ...]]] = None
+        for discount in sorted(map(compile_discount, records), key=lambda d: d.id):
+            self._discounts[discount.id] = discount
+            self._ids_by_code.setdefault(discount.code.lower(), []).append(discount.id)
+            self._starts.append((discount.valid_from, discount.id))
+            self._boundaries.extend(_finite_bounds(discount))
+        self._starts.sort()
+        self._boundaries.sort()
+
+    def _add(self, discount: CompiledDiscount) -> None:
+        self._discounts[discount.id] = discount
+        insort(self._ids_by_code.setdefault(discount.code.lower(), []), discount.id)
+        insort(self._starts, (discount.valid_from, discount.id))
+        for point in _finite_bounds(discount):
+            insort(self._boundaries, point)
+
+    def _remove(self, discount: CompiledDiscount) -> None:
+        del self._discounts[discount.id]
+        ids = self._ids_by_code[discount.code.lower()]
+        ids.remove(discount.id)
+        if not ids:
+            del self._ids_by_code[discount.code.lower()]
+        del self._starts[bisect_left(self._starts, (discount.valid_from, discount.id))]
+        for point in _finite_bounds(discount):
+            del self._boundaries[bisect_left(self._boundaries, point)]
+
+    def put(self, record: Dict[str, Any]) -> None:
+        """Nimmt einen neuen oder geänderten Rabatt auf"""
+        discount = compile_discount(record)
+        with self.lock:
+            existing = self._discounts.get(discount.id)
+            if existing is not None and (existing.code, existing.valid_from, existing.valid_to) == (
+                    discount.code, discount.valid_from, discount.valid_to):
+                # Z.B. nur used_count geändert: Eintrag austauschen, Sortierung bleibt
+                self._discounts[discount.id] = discount
+            else:
+                if existing is not None:
+                    self._remove(existing)
+                self._add(discount)
+            self._cached = None
+
+    def lookup(self, code: str) -> Optional[CompiledDiscount]:
+        """Gibt den Rabatt zu einem Code zurück (Groß-/Kleinschreibung egal)"""
+        with self.lock:
+            ids = self._ids_by_code.get(code.strip().lower())
+            return self._discounts[ids[0]] if ids else None
+
+    def _candidates(self, timestamp: float) -> Tuple[CompiledDiscount, ...]:
+        """Gibt die aktiven Rabatte zurück, die im Abschnitt von ``timestamp`` gültig sein können"""
+        cached = self._cached
+        if cached is not None and cached[0] <= timestamp < cached[1]:
+            return cached[2]
+        position = bisect_right(self._boundaries, timestamp)
+        start = self._boundaries[position - 1] if position else -math.inf
+        end = self._boundaries[position] if position < len(self._boundaries) else math.inf
+        # Beginnt ein Rabatt vor timestamp, dann spätestens an der Abschnittsgrenze
+        started = self._starts[:bisect_right(self._starts, (start, math.inf))]
+        candidates = tuple(sorted(
+            (discount for discount in (self._discounts[discount_id] for _, discount_id in started)
+             if discount.active and discount.valid_to >= start),
+            key=lambda d: d.id
+        ))
+        self._cached = (start, end, candidates)
+        return candidates
+
+    def valid_at(self, when: Optional[datetime] = None) -> List[CompiledDiscount]:
+        """Gibt die zum Zeitpunkt gültigen, aktiven Rabatte zurück"""
+        timestamp = (when or datetime.now()).timestamp()
+        with self.lock:
+            candidates = self._candidates(timestamp)
+        # Kandidaten enthalten auch Rabatte, die genau an der Abschnittsgrenze enden
+        return [discount for discount in candidates if discount.is_valid_at(timestamp)]
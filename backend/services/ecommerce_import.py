@@ -0,0 +1,92 @@
+"""
+Zeilenweises Einlesen von Produktimporten (NDJSON oder CSV)
+
+Die Parser lesen aus einer Textdatei Zeile für Zeile und liefern je
+Datensatz ``(zeilennummer, daten, fehler)``; genau eines von ``daten`` und
+``fehler`` ist gesetzt. Eine fehlerhafte Zeile bricht den Import nicht ab.
+"""
+
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+ImportRow = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+# Felder, die in CSV-Dateien mehrere Werte getrennt durch "|" enthalten
+CSV_LIST_FIELDS = ("tags", "image_urls")
+CSV_LIST_SEPARATOR = "|"
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+def iter_ndjson(stream: TextIO) -> Iterator[ImportRow]:
+    """Liest ein JSON-Objekt pro Zeile, Leerzeilen werden übersprungen"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Ungültiges JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Zeile ist kein JSON-Objekt"
+            continue
+        yield line_number, row, None
+
+
+def iter_csv(stream: TextIO, delimiter: Optional[str] = None) -> Iterator[ImportRow]:
+    """
+    Liest eine CSV-Datei mit Kopfzeile
+
+    Leere Zellen entfallen, damit Standardwerte bzw. bestehende Werte greifen.
+    Listenfelder (Tags, Bild-URLs) werden an "|" getrennt. Ohne ``delimiter``
+    wird zwischen Komma und Semikolon anhand der Kopfzeile unterschieden.
+    """
+    header_line = stream.readline()
+    if not header_line:
+        return
+    if delimiter is None:
+        delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    header = [name.strip().lstrip("\ufeff") for name in header]
+    reader = csv.reader(stream, delimiter=delimiter)
+    for values in reader:
+        # Kopfzeile ist Zeile 1, Zeilennummern beziehen sich auf die Datei
+        line_number = reader.line_num + 1
+        if not any(value.strip() for value in values):
+            continue
+        if len(values) > len(header):
+            yield line_number, None, f"{len(values)} Spalten, Kopfzeile hat {len(header)}"
+            continue
+        row = {}
+        for name, value in zip(header, values):
+            value = value.strip()
+            if not value:
+                continue
+            if name in CSV_LIST_FIELDS:
+                row[name] = [part.strip() for part in value.split(CSV_LIST_SEPARATOR) if part.strip()]
+            else:
+                row[name] = value
+        yield line_number, row, None
+
+
+def iter_rows(stream: TextIO, import_format: str) -> Iterator[ImportRow]:
+    """Wählt den Parser für das Importformat"""
+    if import_format == "csv":
+        return iter_csv(stream)
+    if import_format == "ndjson":
+        return iter_ndjson(stream)
+    raise ValueError(f"Unbekanntes Importformat: {import_format}")
+
+
+def chunked(rows: Iterable[ImportRow], size: int) -> Iterator[List[ImportRow]]:
+    """Teilt die Zeilen in Blöcke fester Größe"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
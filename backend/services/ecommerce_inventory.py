@@ -0,0 +1,215 @@
+"""
+Bestandsführung mit Reservierungen je Artikelnummer
+
+Für jede Artikelnummer gibt es eine kleine Ledger-Datei mit dem Lagerbestand
+(``on_hand``) und den Reservierungen der Warenkörbe (``holds``, je Session mit
+Ablaufzeit). Reservieren, Buchen und Freigeben laufen unter einer Sperre je
+Artikelnummer: innerhalb des Prozesses ein Thread-Lock, zwischen Prozessen
+ein Byte-Bereich einer gemeinsamen Lock-Datei. Gleichzeitige Bestellungen
+anderer Artikel warten damit nicht aufeinander.
+"""
+
+import os
+import zlib
+import logging
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from services.ecommerce_storage import _read_json, _write_json
+
+try:
+    import fcntl
+except ImportError:  # Windows: keine prozessübergreifenden Sperren
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Anzahl der Sperrbereiche; verschiedene Artikel teilen sich nur selten einen Bereich
+LOCK_SLOTS = 1 << 16
+
+
+class InsufficientStockError(ValueError):
+    """Der verfügbare Bestand eines Artikels reicht nicht aus"""
+
+    def __init__(self, sku: str, requested: int, available: int):
+        super().__init__(f"Nicht genügend Bestand für {sku}: {requested} angefragt, {available} verfügbar")
+        self.sku = sku
+        self.requested = requested
+        self.available = available
+
+
+class _SkuLocks:
+    """Sperren je Artikelnummer, prozessübergreifend über Byte-Bereiche einer Datei"""
+
+    def __init__(self, lock_path: str, slots: int = LOCK_SLOTS):
+        self.slots = slots
+        self._guard = threading.Lock()
+        self._thread_locks: Dict[int, threading.Lock] = {}
+        # POSIX-Satzsperren gehören dem Prozess und fallen beim Schließen
+        # irgendeines Deskriptors der Datei weg: die Datei bleibt daher offen
+        self._fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644) if fcntl else None
+
+    def _slot(self, sku: str) -> int:
+        return zlib.crc32(sku.encode('utf-8')) % self.slots
+
+    @contextmanager
+    def _locked(self, slot: int) -> Iterator[None]:
+        with self._guard:
+            lock = self._thread_locks.setdefault(slot, threading.Lock())
+        with lock:
+            if self._fd is None:
+                yield
+                return
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, slot)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, slot)
+
+    @contextmanager
+    def hold(self, skus: Iterable[str]) -> Iterator[None]:
+        """Sperrt mehrere Artikel, immer in derselben Reihenfolge, damit sich Aufrufe nicht blockieren"""
+        with ExitStack() as stack:
+            for slot in sorted({self._slot(sku) for sku in skus}):
+                stack.enter_context(self._locked(slot))
+            yield
+
+
+class StockLedger:
+    """
+    Lagerbestand und Reservierungen je Artikelnummer
+
+    Ein Artikel ohne Ledger-Datei übernimmt beim ersten Zugriff den
+    übergebenen Startbestand (``seed``, der Lagerbestand aus dem Katalog).
+    Abgelaufene Reservierungen werden bei jedem Schreibzugriff entfernt.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._locks = _SkuLocks(os.path.join(directory, "skus.lock"))
+
+    def _path(self, sku: str) -> str:
+        return os.path.join(self.directory, f"{quote(sku, safe='-_.')}.json")
+
+    def _read(self, sku: str, seed: Optional[int]) -> Optional[Dict[str, Any]]:
+        entry = _read_json(self._path(sku), default={})
+        if entry:
+            return entry
+        if seed is None:
+            return None
+        return {'sku': sku, 'on_hand': seed, 'holds': {}}
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        if not _write_json(self._path(entry['sku']), entry):
+            raise IOError(f"Bestand für {entry['sku']} konnte nicht gespeichert werden")
+
+    @staticmethod
+    def _active_holds(entry: Dict[str, Any], now: datetime) -> Dict[str, Dict[str, Any]]:
+        timestamp = now.isoformat()
+        return {holder: hold for holder, hold in entry.get('holds', {}).items()
+                if hold.get('expires_at', '') > timestamp}
+
+    def level(self, sku: str, seed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Gibt Lagerbestand, Reservierungen und verfügbaren Bestand zurück (ohne Sperre)"""
+        entry = self._read(sku, seed)
+        if entry is None:
+            return None
+        reserved = sum(hold['quantity'] for hold in self._active_holds(entry, datetime.now()).values())
+        return {'sku': sku, 'on_hand': entry['on_hand'], 'reserved': reserved,
+                'available': entry['on_hand'] - reserved}
+
+    def hold(self, sku: str, holder: str, quantity: int, seed: int, ttl: timedelta) -> None:
+        """
+        Setzt die Reservierung eines Warenkorbs auf ``quantity`` (0 gibt sie frei)
+
+        Die Ablaufzeit beginnt mit jedem Aufruf neu.
+
+        Raises:
+            InsufficientStockError: Wenn der nicht von anderen reservierte Bestand nicht reicht
+        """
+        with self._locks.hold([sku]):
+            now = datetime.now()
+            entry = self._read(sku, seed)
+            holds = self._active_holds(entry, now)
+            current = holds.pop(holder, None)
+            if quantity > 0:
+                available = entry['on_hand'] - sum(h['quantity'] for h in holds.values())
+                # Verringern einer bestehenden Reservierung ist immer erlaubt
+                if quantity > available and (current is None or quantity > current['quantity']):
+                    raise InsufficientStockError(sku, quantity, max(available, 0))
+                holds[holder] = {'quantity': quantity, 'expires_at': (now + ttl).isoformat()}
+            entry['holds'] = holds
+            self._write(entry)
+
+    def release(self, skus: Iterable[str], holder: str) -> None:
+        """Gibt die Reservierungen eines Warenkorbs für mehrere Artikel frei"""
+        skus = list(skus)
+        with self._locks.hold(skus):
+            now = datetime.now()
+            for sku in skus:
+                entry = self._read(sku, None)
+                if entry is None or holder not in entry.get('holds', {}):
+                    continue
+                entry['holds'] = self._active_holds(entry, now)
+                entry['holds'].pop(holder, None)
+                self._write(entry)
+
+    def commit(self, lines: List[Tuple[str, int, int]], holder: str) -> Dict[str, int]:
+        """
+        Bucht die Mengen einer Bestellung ab, alles oder nichts
+
+        Die eigene Reservierung des Warenkorbs zählt als verfügbar und wird
+        dabei aufgelöst.
+
+        Args:
+            lines: (Artikelnummer, Menge, Startbestand) je Position
+            holder: Session des Warenkorbs
+
+        Returns:
+            Neuer Lagerbestand je Artikelnummer
+
+        Raises:
+            InsufficientStockError: Wenn ein Artikel nicht ausreicht; es wird nichts gebucht
+        """
+        quantities: Dict[str, int] = {}
+        seeds: Dict[str, int] = {}
+        for sku, quantity, seed in lines:
+            quantities[sku] = quantities.get(sku, 0) + quantity
+            seeds[sku] = seed
+        with self._locks.hold(quantities):
+            now = datetime.now()
+            entries = {}
+            for sku, quantity in quantities.items():
+                entry = self._read(sku, seeds[sku])
+                holds = self._active_holds(entry, now)
+                holds.pop(holder, None)
+                available = entry['on_hand'] - sum(h['quantity'] for h in holds.values())
+                if quantity > available:
+                    raise InsufficientStockError(sku, quantity, max(available, 0))
+                entry['on_hand'] -= quantity
+                entry['holds'] = holds
+                entries[sku] = entry
+            for entry in entries.values():
+                self._write(entry)
+            return {sku: entry['on_hand'] for sku, entry in entries.items()}
+
+    def restock(self, quantities: Dict[str, int]) -> None:
+        """Bucht Mengen zurück, z.B. wenn eine Bestellung nach dem Abbuchen scheitert"""
+        with self._locks.hold(quantities):
+            for sku, quantity in quantities.items():
+                entry = self._read(sku, None)
+                if entry is not None:
+                    entry['on_hand'] += quantity
+                    self._write(entry)
+
+    def set_on_hand(self, sku: str, on_hand: int) -> None:
+        """Übernimmt einen neuen Lagerbestand aus dem Katalog, sofern der Artikel schon geführt wird"""
+        with self._locks.hold([sku]):
+            entry = self._read(sku, None)
+            if entry is not None and entry['on_hand'] != on_hand:
+                entry['on_hand'] = on_hand
+                self._write(entry)
@@ -0,0 +1,65 @@
+"""
+Migration der E-Commerce-Daten von den JSON-Dateien nach SQLite
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m services.ecommerce_migration [--data-dir PFAD] [--source-mode json|journal]
+"""
+
+import argparse
+import logging
+from typing import Dict
+
+from services.ecommerce_service import DATA_DIR, ECommerceService
+
+logger = logging.getLogger(__name__)
+
+ENTITY_STORES = (
+    "products", "categories", "carts", "orders",
+    "order_items", "addresses", "discounts", "reviews", "review_stats", "product_sales",
+)
+
+
+def migrate_to_sqlite(data_dir: str = DATA_DIR, source_mode: str = "json") -> Dict[str, int]:
+    """
+    Übernimmt alle Datensätze aus den JSON-Stores in die SQLite-Datenbank
+
+    Die Quelldaten werden über die JSON-Stores gelesen, damit geteilte
+    Warenkörbe und noch nicht kompaktierte Journale mit übernommen werden.
+    IDs bleiben erhalten; ein erneuter Lauf überschreibt vorhandene Zeilen.
+
+    Args:
+        data_dir: Verzeichnis mit den JSON-Dateien
+        source_mode: Speichermodus der Quelldaten ("json" oder "journal")
+
+    Returns:
+        Anzahl der übernommenen Datensätze je Entität
+    """
+    source = ECommerceService(data_dir, storage_mode=source_mode)
+    target = ECommerceService(data_dir, storage_mode="sqlite")
+    counts = {}
+    try:
+        for name in ENTITY_STORES:
+            records = getattr(source, name).all()
+            counts[name] = getattr(target, name).import_records(records)
+            logger.info(f"{counts[name]} Datensätze aus {name} übernommen")
+    finally:
+        target.database.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="E-Commerce-Daten von JSON nach SQLite migrieren")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Verzeichnis mit den JSON-Dateien")
+    parser.add_argument("--source-mode", default="json", choices=("json", "journal"),
+                        help="Speichermodus der Quelldaten")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    counts = migrate_to_sqlite(args.data_dir, args.source_mode)
+    for name, count in counts.items():
+        print(f"{name}: {count}")
+    print("Migration abgeschlossen. Zum Umschalten ECOMMERCE_STORAGE=sqlite setzen.")
+
+
+if __name__ == "__main__":
+    main()
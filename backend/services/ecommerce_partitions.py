@@ -0,0 +1,492 @@
+"""
+Monatlich partitionierter Datensatz-Speicher mit Archiv
+
+Bestellungen und Bestellpositionen werden nach dem Monat ihres Anlegens auf
+eigene Dateien verteilt (``orders/orders_2024-05.json``). Schreibzugriffe
+betreffen damit nur die Datei des laufenden Monats. Abgeschlossene Monate
+werden nach einer Karenzzeit in schreibgeschützte, gzip-komprimierte
+Abschnitte (``orders_2024-05.json.gz``) überführt. Ein Manifest hält je
+Abschnitt den ID-Bereich und die Werte der indizierten Felder; ein Abschnitt
+wird erst geladen, wenn eine Abfrage ihn tatsächlich betreffen kann.
+"""
+
+import os
+import re
+import gzip
+import json
+import heapq
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.ecommerce_serialization import dumps
+from services.ecommerce_storage import (
+    IdSequences, JsonFileStore, JournalStore, _file_lock, _legacy_exists, _read_json, _stat_signature,
+    _write_json
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".json.gz"
+
+# Bis zu dieser Anzahl verschiedener Werte je Feld stehen die Werte im Manifest,
+# darüber nur der Wertebereich (bei Zahlen)
+SEGMENT_KEY_LIMIT = 5000
+
+
+def month_of(value: Any) -> Optional[str]:
+    """Gibt den Monat ("JJJJ-MM") eines ISO-Zeitstempels oder datetime zurück"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m")
+    if isinstance(value, str) and re.match(r"\d{4}-\d{2}", value):
+        return value[:7]
+    return None
+
+
+def _shift_month(month: str, delta: int) -> str:
+    year, number = int(month[:4]), int(month[5:7])
+    index = year * 12 + number - 1 + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _read_segment(path: str) -> List[Dict[str, Any]]:
+    with gzip.open(path, 'rb') as f:
+        return json.loads(f.read())
+
+
+def _write_segment(path: str, records: List[Dict[str, Any]]) -> None:
+    """Schreibt einen Abschnitt atomar und schreibgeschützt"""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path), suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            f.write(dumps(records))
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _describe_segment(month: str, file_name: str, records: List[Dict[str, Any]],
+                      fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """Erstellt den Manifest-Eintrag eines Abschnitts"""
+    ids = [record['id'] for record in records]
+    entry = {
+        'month': month, 'file': file_name, 'count': len(records),
+        'min_id': min(ids), 'max_id': max(ids), 'keys': {}, 'ranges': {},
+    }
+    for field in fields:
+        values = {record.get(field) for record in records}
+        if len(values) <= SEGMENT_KEY_LIMIT:
+            entry['keys'][field] = list(values)
+        elif all(isinstance(value, (int, float)) for value in values):
+            entry['ranges'][field] = [min(values), max(values)]
+    return entry
+
+
+class SegmentStore(JsonFileStore):
+    """Schreibgeschützter, komprimierter Abschnitt; wird beim ersten Zugriff geladen"""
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        if self._records is None:
+            self._reset(_read_segment(self.file_path))
+        return self._records
+
+    @contextmanager
+    def batch(self) -> Iterator["SegmentStore"]:
+        # Alle ändernden Methoden laufen über batch()
+        raise ValueError(f"{os.path.basename(self.file_path)} ist archiviert und schreibgeschützt")
+        yield self  # pragma: no cover
+
+
+class _SharedSequence:
+    """Vergibt IDs aller Partitionen aus einer gemeinsamen Sequenz"""
+
+    def __init__(self, sequences: Optional[IdSequences], name: str, floor: Callable[[], int]):
+        self.sequences = sequences
+        self.name = name
+        self.floor = floor
+
+    def next_id(self, name: str, floor: int = 0) -> int:
+        floor = max(floor, self.floor())
+        if self.sequences is not None:
+            return self.sequences.next_id(self.name, floor)
+        return floor + 1
+
+
+class PartitionedStore:
+    """
+    Nach Monaten partitionierter Datensatz-Speicher
+
+    Neue Datensätze landen in der Partition des Monats aus ``partition_field``
+    (ohne Wert: laufender Monat; ist der Monat schon archiviert, ebenfalls der
+    laufende Monat). Offene Partitionen sind gewöhnliche Stores der Klasse
+    ``store_class``. Partitionen, die älter als ``archive_after_months`` volle
+    Monate sind, werden im Hintergrund archiviert; archivierte Datensätze
+    können gelesen, aber nicht mehr geändert werden (ValueError).
+
+    Höchstens ``cache_segments`` archivierte Abschnitte bleiben gleichzeitig
+    geladen. Eine vorhandene, nicht partitionierte Datei (``legacy_path``)
+    wird beim ersten Start auf die Monate verteilt. Die höchste übernommene ID
+    steht im Manifest (``imported_max_id``), damit jeder Prozess neue IDs
+    darüber vergibt, auch bevor er die Partitionen geladen hat.
+    """
+
+    def __init__(self, directory: str, partition_field: str = 'created_at',
+                 store_class=JsonFileStore, indexes: Tuple[str, ...] = (),
+                 sequences: Optional[IdSequences] = None, legacy_path: Optional[str] = None,
+                 archive_after_months: int = 2, cache_segments: int = 4):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        # Schlüssel für Sperrreihenfolge (transaction, Async-Fassade)
+        self.file_path = directory
+        self.name = os.path.basename(directory)
+        self.partition_field = partition_field
+        self.store_class = store_class
+        self.indexed_fields = tuple(indexes)
+        self.archive_after_months = archive_after_months
+        self.cache_segments = cache_segments
+        self.manifest_path = os.path.join(directory, "partitions.json")
+        self.lock = threading.RLock()
+        self._file_pattern = re.compile(rf"{re.escape(self.name)}_(\d{{4}}-\d{{2}})\.json$")
+        self._sequence = _SharedSequence(sequences, self.name, self._max_known_id)
+        self._hot: Dict[str, JsonFileStore] = {}
+        self._segments: List[Dict[str, Any]] = []
+        self._segment_keys: Dict[str, Dict[str, set]] = {}
+        # Höchste mit import_records übernommene ID; solche IDs kommen nicht aus der Sequenz
+        self._imported_max_id = 0
+        self._loaded: "OrderedDict[str, SegmentStore]" = OrderedDict()
+        self._signature = None
+        self._generation = 0
+        self._archiving = False
+        if legacy_path and _legacy_exists(legacy_path):
+            self._migrate_legacy(legacy_path)
+        if legacy_path and os.path.exists(f"{legacy_path}.migrated"):
+            self._recover_imported_max_id()
+
+    def _migrate_legacy(self, legacy_path: str) -> None:
+        with _file_lock(f"{legacy_path}.lock"):
+            if not _legacy_exists(legacy_path):
+                return
+            # Als Journal-Store gelesen, damit ein nicht kompaktiertes Journal mitkommt
+            legacy = JournalStore(legacy_path)
+            # Erst nach vollständiger Verteilung archivieren
+            self._archiving = True
+            try:
+                count = self.import_records(legacy.all())
+            finally:
+                self._archiving = False
+            for path in (legacy_path, legacy.journal_path):
+                if os.path.exists(path):
+                    os.replace(path, f"{path}.migrated")
+            logger.info(f"{count} Datensätze aus {legacy_path} auf Monatspartitionen verteilt")
+        if self._closed_months():
+            self.schedule_archive()
+
+    def _recover_imported_max_id(self) -> None:
+        """Bestimmt die Untergrenze einmalig für Migrationen, die sie noch nicht im Manifest vermerkt haben"""
+        if 'imported_max_id' in _read_json(self.manifest_path, default={}):
+            return
+        ids = [records[-1]['id'] for records in (store.all() for store in self._hot_stores()) if records]
+        self._record_imported_max_id(max(ids, default=0))
+
+    def _record_imported_max_id(self, record_id: int) -> None:
+        """Vermerkt übernommene IDs im Manifest, damit jeder Prozess neue IDs darüber vergibt"""
+        with _file_lock(f"{self.manifest_path}.lock"):
+            manifest = _read_json(self.manifest_path, default={})
+            if record_id > manifest.get('imported_max_id', -1):
+                manifest['imported_max_id'] = record_id
+                if not _write_json(self.manifest_path, manifest):
+                    raise IOError(f"Manifest {self.manifest_path} konnte nicht gespeichert werden")
+        with self.lock:
+            self._imported_max_id = max(self._imported_max_id, record_id)
+
+    # Verwaltung der Partitionen
+    def _partition_path(self, month: str) -> str:
+        return os.path.join(self.directory, f"{self.name}_{month}.json")
+
+    def _open_partition(self, month: str) -> JsonFileStore:
+        return self.store_class(self._partition_path(month), indexes=self.indexed_fields,
+                                sequences=self._sequence)
+
+    def _refresh(self) -> None:
+        """Gleicht offene Partitionen und Manifest mit dem Verzeichnis ab"""
+        with self.lock:
+            signature = (_stat_signature(self.directory), _stat_signature(self.manifest_path))
+            if signature == self._signature:
+                return
+            first = self._signature is None
+            manifest = _read_json(self.manifest_path, default={})
+            segments = sorted(manifest.get('segments', []), key=lambda segment: segment['month'])
+            self._imported_max_id = max(self._imported_max_id, manifest.get('imported_max_id', 0))
+            archived = {segment['month'] for segment in segments}
+            months = sorted(
+                match.group(1) for match in map(self._file_pattern.match, os.listdir(self.directory))
+                if match and match.group(1) not in archived
+            )
+            changed = months != list(self._hot) or segments != self._segments
+            self._hot = {month: self._hot.get(month) or self._open_partition(month) for month in months}
+            if segments != self._segments:
+                self._segments = segments
+                self._segment_keys = {
+                    segment['month']: {field: set(values) for field, values in segment.get('keys', {}).items()}
+                    for segment in segments
+                }
+                for month in list(self._loaded):
+                    if month not in archived:
+                        del self._loaded[month]
+            if changed and not first:
+                self._generation += 1
+            self._signature = signature
+            if first and self._closed_months():
+                self.schedule_archive()
+
+    def _hot_stores(self) -> List[JsonFileStore]:
+        self._refresh()
+        with self.lock:
+            return list(self._hot.values())
+
+    def _segment_store(self, segment: Dict[str, Any]) -> SegmentStore:
+        """Gibt den Store eines Abschnitts zurück, lädt ihn bei Bedarf und verdrängt alte Abschnitte"""
+        with self.lock:
+            month = segment['month']
+            store = self._loaded.get(month)
+            if store is None:
+                store = SegmentStore(os.path.join(self.directory, segment['file']),
+                                     indexes=self.indexed_fields)
+                self._loaded[month] = store
+                while len(self._loaded) > self.cache_segments:
+                    self._loaded.popitem(last=False)
+            else:
+                self._loaded.move_to_end(month)
+            return store
+
+    def _candidate_segments(self, field: Optional[str] = None, value: Any = None,
+                            after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Gibt die Abschnitte zurück, die passende Datensätze enthalten können (nach ID sortiert)"""
+        self._refresh()
+        with self.lock:
+            candidates = []
+            for segment in self._segments:
+                if after_id is not None and segment['max_id'] <= after_id:
+                    continue
+                if field == 'id' and not segment['min_id'] <= value <= segment['max_id']:
+                    continue
+                if field is not None and field != 'id':
+                    keys = self._segment_keys[segment['month']].get(field)
+                    bounds = segment.get('ranges', {}).get(field)
+                    if keys is not None and value not in keys:
+                        continue
+                    if keys is None and bounds is not None and not (
+                            isinstance(value, (int, float)) and bounds[0] <= value <= bounds[1]):
+                        continue
+                candidates.append(segment)
+            return sorted(candidates, key=lambda segment: segment['min_id'])
+
+    def _max_known_id(self) -> int:
+        """Höchste ID aus Manifest und geladenen Partitionen; nicht geladene Partitionen melden 0"""
+        with self.lock:
+            ids = [segment['max_id'] for segment in self._segments]
+            ids.append(self._imported_max_id)
+            ids.extend(store._max_id for store in self._hot.values())
+            return max(ids, default=0)
+
+    def _target_partition(self, record: Dict[str, Any]) -> JsonFileStore:
+        """Gibt die offene Partition für einen neuen Datensatz zurück und legt sie bei Bedarf an"""
+        self._refresh()
+        current = datetime.now().strftime("%Y-%m")
+        month = month_of(record.get(self.partition_field)) or current
+        with self.lock:
+            if any(segment['month'] == month for segment in self._segments):
+                month = current
+            store = self._hot.get(month)
+            if store is not None:
+                return store
+            store = self._hot[month] = self._open_partition(month)
+            self._hot = dict(sorted(self._hot.items()))
+        with _file_lock(store.lock_path):
+            if not os.path.exists(store.file_path):
+                # Sofort anlegen, damit andere Prozesse die Partition im Verzeichnis finden
+                _write_json(store.file_path, [])
+        if self._closed_months():
+            self.schedule_archive()
+        return store
+
+    def _current_partition(self) -> JsonFileStore:
+        return self._target_partition({})
+
+    # Archivierung
+    def _closed_months(self) -> List[str]:
+        cutoff = _shift_month(datetime.now().strftime("%Y-%m"), -self.archive_after_months)
+        with self.lock:
+            return [month for month in self._hot if month < cutoff]
+
+    def schedule_archive(self) -> None:
+        """Startet die Archivierung abgeschlossener Monate in einem Hintergrund-Thread"""
+        with self.lock:
+            if self._archiving:
+                return
+            self._archiving = True
+        threading.Thread(target=self.archive, name=f"archive-{self.name}", daemon=True).start()
+
+    def archive(self) -> int:
+        """
+        Überführt alle abgeschlossenen Monate in komprimierte Abschnitte
+
+        Reihenfolge: Abschnitt schreiben, Manifest schreiben, Partition löschen.
+        Bricht der Vorgang dazwischen ab, gilt der Abschnitt aus dem Manifest;
+        eine übrig gebliebene Partitionsdatei wird beim nächsten Lauf entfernt.
+
+        Returns:
+            Anzahl der archivierten Monate
+        """
+        archived = 0
+        try:
+            with _file_lock(f"{self.manifest_path}.lock"):
+                self._refresh()
+                for month in self._closed_months():
+                    with self.lock:
+                        store = self._hot[month]
+                    with store.batch():
+                        records = store.all()
+                        manifest = _read_json(self.manifest_path, default={})
+                        segments = manifest.setdefault('segments', [])
+                        if records and not any(segment['month'] == month for segment in segments):
+                            file_name = f"{self.name}_{month}{ARCHIVE_SUFFIX}"
+                            _write_segment(os.path.join(self.directory, file_name), records)
+                            segments.append(_describe_segment(month, file_name, records, self.indexed_fields))
+                            if not _write_json(self.manifest_path, manifest):
+                                raise IOError(f"Manifest {self.manifest_path} konnte nicht gespeichert werden")
+                        for path in (store.file_path, getattr(store, 'journal_path', None)):
+                            if path and os.path.exists(path):
+                                os.remove(path)
+                        store.invalidate()
+                    with self.lock:
+                        del self._hot[month]
+                    archived += 1
+                    logger.info(f"{self.name} {month}: {len(records)} Datensätze archiviert")
+                # Eigene Änderung: neu einlesen, ohne den Generationszähler zu erhöhen
+                self._signature = None
+                self._refresh()
+        except Exception as e:
+            logger.error(f"Fehler bei der Archivierung von {self.directory}: {str(e)}")
+        finally:
+            self._archiving = False
+        return archived
+
+    # Store-Schnittstelle
+    def invalidate(self) -> None:
+        with self.lock:
+            for store in self._hot.values():
+                store.invalidate()
+            self._loaded.clear()
+            self._signature = None
+
+    def generation(self) -> int:
+        """Wie JsonFileStore.generation; archivierte Abschnitte ändern sich nicht"""
+        stores = self._hot_stores()
+        return self._generation + sum(store.generation() for store in stores)
+
+    @contextmanager
+    def batch(self) -> Iterator["PartitionedStore"]:
+        """Hält die Sperre der laufenden Partition, in die neue Datensätze geschrieben werden"""
+        with self._current_partition().batch():
+            yield self
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Gibt alle Datensätze aufsteigend nach ID zurück (lädt alle Abschnitte)"""
+        parts = [self._segment_store(segment).all() for segment in self._candidate_segments()]
+        parts.extend(store.all() for store in self._hot_stores())
+        return list(heapq.merge(*parts, key=lambda record: record['id']))
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        for store in self._hot_stores():
+            record = store.get(record_id)
+            if record is not None:
+                return record
+        for segment in self._candidate_segments('id', record_id):
+            record = self._segment_store(segment).get(record_id)
+            if record is not None:
+                return record
+        return None
+
+    def get_many(self, record_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        records = {}
+        for record_id in record_ids:
+            record = self.get(record_id)
+            if record is not None:
+                records[record_id] = record
+        return records
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        parts = [self._segment_store(segment).find(field, value)
+                 for segment in self._candidate_segments(field, value)]
+        parts.extend(store.find(field, value) for store in self._hot_stores())
+        return list(heapq.merge(*parts, key=lambda record: record['id']))
+
+    def page(self, after_id: Optional[int], limit: int, field: Optional[str] = None, value: Any = None,
+             predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Keyset-Paginierung über alle Partitionen
+
+        Abschnitte werden in ID-Reihenfolge nur so lange geladen, bis die Seite
+        voll ist und der nächste Abschnitt erst hinter ihrem Ende beginnt.
+        """
+        result: List[Dict[str, Any]] = []
+        for segment in self._candidate_segments(field, value, after_id):
+            if len(result) >= limit and segment['min_id'] > result[-1]['id']:
+                break
+            part = self._segment_store(segment).page(after_id, limit, field, value, predicate)
+            result = list(islice(heapq.merge(result, part, key=lambda record: record['id']), limit))
+        for store in self._hot_stores():
+            part = store.page(after_id, limit, field, value, predicate)
+            result = list(islice(heapq.merge(result, part, key=lambda record: record['id']), limit))
+        return result
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self._target_partition(record).insert(record)
+
+    def _writable_partition(self, record_id: int) -> Optional[JsonFileStore]:
+        """Gibt die offene Partition eines Datensatzes zurück; archivierte Datensätze sind schreibgeschützt"""
+        for store in self._hot_stores():
+            if store.get(record_id) is not None:
+                return store
+        for segment in self._candidate_segments('id', record_id):
+            if self._segment_store(segment).get(record_id) is not None:
+                raise ValueError(f"Datensatz {record_id} ist archiviert ({segment['month']}) "
+                                 f"und kann nicht geändert werden")
+        return None
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        store = self._writable_partition(record_id)
+        return store.update(record_id, changes) if store else None
+
+    def delete(self, record_id: int) -> bool:
+        store = self._writable_partition(record_id)
+        return store.delete(record_id) if store else False
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Wie JsonFileStore.delete_where, wirkt nur auf offene Partitionen"""
+        return sum(store.delete_where(predicate) for store in self._hot_stores())
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Übernimmt Datensätze mit ihren IDs in die offenen Partitionen ihres Monats"""
+        by_partition: Dict[str, List[Dict[str, Any]]] = {}
+        stores: Dict[str, JsonFileStore] = {}
+        max_id = 0
+        for record in records:
+            store = self._target_partition(record)
+            by_partition.setdefault(store.file_path, []).append(record)
+            stores[store.file_path] = store
+            max_id = max(max_id, record['id'])
+        count = sum(stores[path].import_records(batch) for path, batch in by_partition.items())
+        if count:
+            self._record_imported_max_id(max_id)
+        return count
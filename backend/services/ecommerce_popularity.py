@@ -0,0 +1,104 @@
+"""
+Verkaufsränge und "Zusammen gekauft" für den E-Commerce-Katalog
+
+Je Produkt werden ein zeitlich abklingender Verkaufswert und eine dünn
+besetzte Zeile der Kaufgemeinsamkeiten (Produkt -> Gewicht) geführt. Alle
+Werte sind als log2 eines auf ``EPOCH`` hochgerechneten Gewichts gespeichert:
+Eine Bestellung zum Zeitpunkt t zählt mit 2^((t - EPOCH) / Halbwertszeit).
+Da alle Werte gleich schnell abklingen, bleibt die Rangfolge ohne
+Nachrechnen gültig und eine neue Bestellung ändert nur die Sätze ihrer
+eigenen Produkte.
+"""
+
+import math
+import heapq
+import threading
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EPOCH = datetime(2024, 1, 1)
+
+# Anzahl der Kaufgemeinsamkeiten, die je Produkt behalten werden
+MAX_RELATED = 50
+
+
+def log_weight(quantity: float, when: datetime, half_life_days: float) -> float:
+    """Gibt log2 des Gewichts einer Menge zum Zeitpunkt ``when`` zurück"""
+    return math.log2(quantity) + (when - EPOCH).total_seconds() / (half_life_days * 86400)
+
+
+def log_add(a: Optional[float], b: float) -> float:
+    """Addiert zwei Gewichte in log2-Darstellung ohne Überlauf"""
+    if a is None:
+        return b
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def current_value(log_score: Optional[float], now: datetime, half_life_days: float) -> float:
+    """Rechnet einen gespeicherten Wert auf den heutigen, abgeklungenen Stand um"""
+    if log_score is None:
+        return 0.0
+    return 2 ** (log_score - log_weight(1, now, half_life_days))
+
+
+def count_order(stats: Dict[int, Dict[str, Any]], lines: List[Tuple[int, int]], when: datetime,
+                half_life_days: float, max_related: int = MAX_RELATED) -> None:
+    """
+    Rechnet eine Bestellung in die Statistiksätze ihrer Produkte ein
+
+    Args:
+        stats: Produkt-ID -> Statistiksatz; fehlende Sätze werden angelegt
+        lines: (Produkt-ID, Menge) je Position der Bestellung
+    """
+    quantities: Dict[int, int] = {}
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + max(quantity, 1)
+    pair_weight = log_weight(1, when, half_life_days)
+    for product_id, quantity in quantities.items():
+        record = stats.setdefault(product_id, {
+            'product_id': product_id, 'sales_score': None, 'units_sold': 0, 'related': {},
+        })
+        record['sales_score'] = log_add(record['sales_score'], log_weight(quantity, when, half_life_days))
+        record['units_sold'] += quantity
+        # JSON-Schlüssel sind Texte
+        related = dict(record['related'])
+        for other_id in quantities:
+            if other_id != product_id:
+                related[str(other_id)] = log_add(related.get(str(other_id)), pair_weight)
+        if len(related) > 2 * max_related:
+            related = dict(heapq.nlargest(max_related, related.items(), key=itemgetter(1)))
+        record['related'] = related
+
+
+def top_related(record: Optional[Dict[str, Any]], limit: int) -> List[int]:
+    """Gibt die am häufigsten zusammen gekauften Produkt-IDs absteigend zurück"""
+    if not record:
+        return []
+    return [int(product_id) for product_id, _ in
+            heapq.nlargest(limit, record.get('related', {}).items(), key=itemgetter(1))]
+
+
+class PopularityIndex:
+    """Verkaufswerte aller Produkte im Speicher, für die Sortierung nach Beliebtheit"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._scores: Dict[int, float] = {}
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        with self.lock:
+            self._scores = {
+                record['product_id']: record['sales_score']
+                for record in records if record.get('sales_score') is not None
+            }
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self.lock:
+            if record.get('sales_score') is not None:
+                self._scores[record['product_id']] = record['sales_score']
+
+    def sort_key(self, product: Dict[str, Any]) -> Tuple[float, int]:
+        """Schlüssel für aufsteigende Sortierung: meistverkauft zuerst, ohne Verkäufe nach ID"""
+        return (-self._scores.get(product['id'], -math.inf), product['id'])
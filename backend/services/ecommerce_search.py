@@ -0,0 +1,192 @@
+"""
+Volltext-Suchindex für den E-Commerce-Katalog
+
+Invertierter Index über Name, Beschreibung, Artikelnummer und Tags der Produkte
+mit deutscher Normalisierung (Umlaute, ß), Präfixsuche und gewichteter Rangfolge.
+"""
+
+import re
+import heapq
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Gewichtung der Felder: Treffer in der Artikelnummer zählen am meisten
+FIELD_WEIGHTS = {
+    'sku': 8.0,
+    'name': 4.0,
+    'tags': 2.0,
+    'description': 1.0,
+}
+
+# Ein Präfixtreffer zählt weniger als ein vollständiges Wort
+PREFIX_FACTOR = 0.5
+
+# Kürzere Suchbegriffe werden nur als ganze Wörter gesucht
+MIN_PREFIX_LENGTH = 2
+
+_UMLAUTS = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss', 'ẞ': 'ss'})
+# Umschreibungen wie "Groesse" auf dieselbe Form bringen wie "Größe"
+_TRANSCRIPTIONS = re.compile(r"ae|oe|(?<!q)ue")
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Normalisiert Text für die Suche
+    
+    Kleinschreibung, Umlaute und ihre Umschreibungen auf den Grundvokal
+    (ä, ae -> a), ß -> ss und Akzente entfernen. "Größe", "Groesse" und
+    "grosse" ergeben damit denselben Suchbegriff.
+    """
+    text = text.lower().translate(_UMLAUTS)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _TRANSCRIPTIONS.sub(lambda match: match.group(0)[0], text)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Zerlegt einen Text in normalisierte Suchbegriffe"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+def _product_terms(product: Dict[str, Any]) -> Dict[str, float]:
+    """Gibt die Suchbegriffe eines Produkts mit ihrem höchsten Feldgewicht zurück"""
+    terms: Dict[str, float] = {}
+
+    def add(tokens: Iterable[str], weight: float) -> None:
+        for token in tokens:
+            if weight > terms.get(token, 0.0):
+                terms[token] = weight
+
+    sku_tokens = tokenize(product.get('sku'))
+    add(sku_tokens, FIELD_WEIGHTS['sku'])
+    # "AB-1234" soll auch als "ab1234" gefunden werden
+    if len(sku_tokens) > 1:
+        add([''.join(sku_tokens)], FIELD_WEIGHTS['sku'])
+    add(tokenize(product.get('name')), FIELD_WEIGHTS['name'])
+    for tag in product.get('tags') or []:
+        add(tokenize(tag), FIELD_WEIGHTS['tags'])
+    add(tokenize(product.get('description')), FIELD_WEIGHTS['description'])
+    return terms
+
+
+class ProductSearchIndex:
+    """
+    Invertierter Index Begriff -> Produkt-ID -> Gewicht
+
+    Die Begriffe werden zusätzlich sortiert gehalten, damit Präfixsuchen per
+    Binärsuche nur den passenden Ausschnitt des Vokabulars durchlaufen.
+    Änderungen werden über ``add``/``remove`` inkrementell nachgeführt.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._terms: List[str] = []
+        self._product_terms: Dict[int, Dict[str, float]] = {}
+        # Für Filter vor dem Abschneiden der Trefferliste
+        self._active: Dict[int, bool] = {}
+        self._categories: Dict[int, Optional[int]] = {}
+
+    def rebuild(self, products: Iterable[Dict[str, Any]]) -> None:
+        """Baut den Index vollständig aus den Produktdatensätzen neu auf"""
+        with self.lock:
+            self._postings = {}
+            self._product_terms = {}
+            self._active = {}
+            self._categories = {}
+            for product in products:
+                self._add(product)
+            self._terms = sorted(self._postings)
+
+    def add(self, product: Dict[str, Any]) -> None:
+        """Nimmt ein Produkt auf oder ersetzt dessen bisherige Einträge"""
+        with self.lock:
+            self._remove(product['id'])
+            for term in self._add(product):
+                if len(self._postings[term]) == 1:
+                    insort(self._terms, term)
+
+    def remove(self, product_id: int) -> None:
+        """Entfernt ein Produkt aus dem Index"""
+        with self.lock:
+            self._remove(product_id)
+
+    def _add(self, product: Dict[str, Any]) -> Dict[str, float]:
+        product_id = product['id']
+        terms = _product_terms(product)
+        for term, weight in terms.items():
+            self._postings.setdefault(term, {})[product_id] = weight
+        self._product_terms[product_id] = terms
+        self._active[product_id] = product.get('active', True)
+        self._categories[product_id] = product.get('category_id')
+        return terms
+
+    def _remove(self, product_id: int) -> None:
+        terms = self._product_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._terms, term)
+                if position < len(self._terms) and self._terms[position] == term:
+                    del self._terms[position]
+        self._active.pop(product_id, None)
+        self._categories.pop(product_id, None)
+
+    def _match(self, token: str) -> Dict[int, float]:
+        """Gibt die Treffer eines Suchbegriffs zurück (ganzes Wort oder Präfix)"""
+        scores = dict(self._postings.get(token, {}))
+        if len(token) < MIN_PREFIX_LENGTH:
+            return scores
+        position = bisect_left(self._terms, token)
+        while position < len(self._terms) and self._terms[position].startswith(token):
+            term = self._terms[position]
+            position += 1
+            if term == token:
+                continue
+            for product_id, weight in self._postings[term].items():
+                score = weight * PREFIX_FACTOR
+                if score > scores.get(product_id, 0.0):
+                    scores[product_id] = score
+        return scores
+
+    def search(self, query: str, limit: int = 20, active_only: bool = True,
+               category_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Sucht Produkte, die alle Begriffe der Anfrage enthalten
+
+        Args:
+            query: Suchtext, jeder Begriff passt auch als Wortanfang
+            limit: Maximale Anzahl Treffer
+            active_only: Nur aktive Produkte
+            category_id: Optional nur Produkte dieser Kategorie
+
+        Returns:
+            Liste von (Produkt-ID, Relevanz), absteigend nach Relevanz
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        with self.lock:
+            matches = sorted((self._match(token) for token in tokens), key=len)
+            # Mit der kleinsten Treffermenge beginnen, alle Begriffe müssen passen
+            scores = matches[0]
+            for other in matches[1:]:
+                scores = {pid: score + other[pid] for pid, score in scores.items() if pid in other}
+                if not scores:
+                    return []
+            if active_only:
+                scores = {pid: score for pid, score in scores.items() if self._active.get(pid, True)}
+            if category_id is not None:
+                scores = {pid: score for pid, score in scores.items()
+                          if self._categories.get(pid) == category_id}
+        # Bei gleicher Relevanz zuerst das ältere Produkt
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,68 @@
+"""
+Schneller Serialisierungspfad für E-Commerce-Listen
+
+Datensätze aus den eigenen Stores sind bereits validiert und JSON-fähig
+gespeichert. Für Listenantworten werden sie deshalb nicht erneut als
+Pydantic-Modelle aufgebaut, sondern nur auf die Felder des Modells
+projiziert (fehlende Felder mit Standardwerten) und direkt zu JSON-Bytes
+kodiert, mit orjson falls installiert.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Type
+
+from pydantic import BaseModel
+
+from services.ecommerce_storage import _to_jsonable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ist optional
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Kodiert JSON-fähige Daten zu UTF-8-Bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class RecordProjector:
+    """
+    Bringt gespeicherte Datensätze ohne Validierung in die Form eines Modells
+
+    Feldnamen und statische Standardwerte werden einmal je Modell ermittelt;
+    ``default_factory`` wird nur für tatsächlich fehlende Felder aufgerufen.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self._defaults: Dict[str, Callable[[], Any]] = {}
+        for name, field in model.__fields__.items():
+            if field.default_factory is not None:
+                factory = field.default_factory
+                self._defaults[name] = lambda factory=factory: _to_jsonable(factory())
+            else:
+                default = _to_jsonable(field.default)
+                self._defaults[name] = lambda default=default: default
+
+    def project(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            name: record[name] if name in record else default()
+            for name, default in self._defaults.items()
+        }
+
+    def project_all(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.project(record) for record in records]
+
+
+_projectors: Dict[Type[BaseModel], RecordProjector] = {}
+
+
+def projector(model: Type[BaseModel]) -> RecordProjector:
+    """Gibt den (gecachten) Projektor für ein Modell zurück"""
+    instance = _projectors.get(model)
+    if instance is None:
+        instance = _projectors.setdefault(model, RecordProjector(model))
+    return instance
@@ -1,14 +1,32 @@
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
+import base64
+import heapq
+import io
 import json
+import os
+import threading
 import uuid
-from typing import List, Optional, Dict, Any
+from itertools import islice
+from typing import List, Optional, Dict, Any, BinaryIO, Iterable, Tuple
 import logging
 
 from models.ecommerce import (
     Product, ProductCategory, CartItem, ShoppingCart, 
-    Order, OrderItem, Address, Discount, Review
+    Order, OrderItem, Address, Discount, Review, ReviewSummary,
+    ProductImportError, ProductImportResult, StockLevel
+)
+from services.ecommerce_storage import (
+    IdSequences, JsonFileStore, JournalStore, ShardedStore, transaction, _to_jsonable
 )
+from services.ecommerce_sqlite import SqliteDatabase, SqliteStore
+from services.ecommerce_partitions import PartitionedStore
+from services.ecommerce_categories import CategoryTree
+from services.ecommerce_inventory import StockLedger
+from services.ecommerce_search import ProductSearchIndex
+from services.ecommerce_popularity import MAX_RELATED, PopularityIndex, count_order, top_related
+from services.ecommerce_discounts import CompiledDiscount, DiscountIndex
+from services.ecommerce_serialization import dumps, projector
+from services.ecommerce_import import ImportRow, chunked, iter_rows
 
 logger = logging.getLogger(__name__)
 
@@ -16,109 +34,436 @@ logger = logging.getLogger(__name__)
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ecommerce")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-PRODUCTS_FILE = os.path.join(DATA_DIR, "products.json")
-CATEGORIES_FILE = os.path.join(DATA_DIR, "categories.json")
-CARTS_FILE = os.path.join(DATA_DIR, "carts.json")
-ORDERS_FILE = os.path.join(DATA_DIR, "orders.json")
-ORDER_ITEMS_FILE = os.path.join(DATA_DIR, "order_items.json")
-ADDRESSES_FILE = os.path.join(DATA_DIR, "addresses.json")
-DISCOUNTS_FILE = os.path.join(DATA_DIR, "discounts.json")
-REVIEWS_FILE = os.path.join(DATA_DIR, "reviews.json")
+# Speichermodus: "json" schreibt bei jeder Änderung die ganze Datei neu,
+# "journal" hängt Änderungen an Warenkörben und Bestellungen an ein Journal an,
+# "sqlite" legt alle Entitäten in data/ecommerce/ecommerce.db ab
+STORAGE_MODE = os.environ.get("ECOMMERCE_STORAGE", "json")
+STORAGE_MODES = ("json", "journal", "sqlite")
+
+# Anzahl der Dateien, auf die Warenkörbe nach Session-ID verteilt werden
+CART_SHARDS = int(os.environ.get("ECOMMERCE_CART_SHARDS", "16"))
+
+# Warenkörbe ohne Aktivität werden nach CART_TTL_HOURS Stunden entfernt,
+# der Aufräum-Thread läuft alle CART_SWEEP_MINUTES Minuten
+CART_TTL_HOURS = float(os.environ.get("ECOMMERCE_CART_TTL_HOURS", "72"))
+CART_SWEEP_MINUTES = float(os.environ.get("ECOMMERCE_CART_SWEEP_MINUTES", "15"))
+# Warenkörbe neuer Sessions erst beim ersten Artikel speichern (Bots, Crawler)
+LAZY_CARTS = os.environ.get("ECOMMERCE_LAZY_CARTS", "1").lower() not in ("0", "false", "no")
+
+# Bestellungen werden monatsweise gespeichert; Monate, die länger als
+# ORDER_ARCHIVE_MONTHS volle Monate zurückliegen, werden komprimiert archiviert
+ORDER_ARCHIVE_MONTHS = int(os.environ.get("ECOMMERCE_ORDER_ARCHIVE_MONTHS", "2"))
+
+# Lagerbestand je Artikelnummer führen: Warenkörbe reservieren ihre Mengen für
+# CART_HOLD_MINUTES Minuten ab der letzten Änderung, Bestellungen buchen ab.
+# Der neue Bestand wird nach STOCK_SYNC_SECONDS gesammelt in den Katalog übernommen.
+# Nur einschalten, wenn alle Produkte einen gepflegten Lagerbestand haben:
+# ``inventory_level`` ist standardmäßig 0, solche Artikel wären nicht bestellbar
+STOCK_RESERVATION = os.environ.get("ECOMMERCE_STOCK_RESERVATION", "0").lower() in ("1", "true", "yes")
+CART_HOLD_MINUTES = float(os.environ.get("ECOMMERCE_CART_HOLD_MINUTES", "15"))
+STOCK_SYNC_SECONDS = float(os.environ.get("ECOMMERCE_STOCK_SYNC_SECONDS", "2"))
+
+# Halbwertszeit der Verkaufszahlen für Bestseller und "Zusammen gekauft"
+POPULARITY_HALF_LIFE_DAYS = float(os.environ.get("ECOMMERCE_POPULARITY_HALF_LIFE_DAYS", "30"))
+
+# Produktimport: Zeilen pro Schreibvorgang und maximal gemeldete Zeilenfehler
+IMPORT_BATCH_SIZE = int(os.environ.get("ECOMMERCE_IMPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_IMPORT_ERRORS = 1000
 
-# Hilfsfunktionen für die Dateioperationen
-def _load_data(file_path: str, default=None):
-    if default is None:
-        default = []
-    if not os.path.exists(file_path):
-        return default
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Fehler beim Laden der Daten aus {file_path}: {str(e)}")
-        return default
 
-def _save_data(file_path: str, data):
+def encode_cursor(last_id: int) -> str:
+    """Kodiert die letzte ID einer Seite als undurchsichtigen Cursor"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Gibt die letzte ID aus einem Cursor zurück, None steht für die erste Seite"""
+    if not cursor:
+        return None
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return True
-    except Exception as e:
-        logger.error(f"Fehler beim Speichern der Daten in {file_path}: {str(e)}")
-        return False
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw.decode("utf-8"))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Ungültiger Cursor")
+    if not isinstance(last_id, int):
+        raise ValueError("Ungültiger Cursor")
+    return last_id
+
 
-def _get_next_id(data: List[Dict[str, Any]]) -> int:
-    if not data:
-        return 1
-    return max(item.get('id', 0) for item in data) + 1
+def _next_page(records: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Schneidet eine mit limit + 1 gelesene Seite zu und bestimmt den Folge-Cursor"""
+    if len(records) > limit:
+        records = records[:limit]
+        return records, encode_cursor(records[-1]['id'])
+    return records, None
 
 
 class ECommerceService:
     """Service-Klasse für E-Commerce-Funktionalitäten"""
+
+    def __init__(self, data_dir: str = DATA_DIR, storage_mode: Optional[str] = None,
+                 lazy_carts: bool = LAZY_CARTS, stock_reservation: bool = STOCK_RESERVATION):
+        """Initialisiert die Stores, die Daten werden erst beim ersten Zugriff geladen"""
+        storage_mode = storage_mode or STORAGE_MODE
+        if storage_mode not in STORAGE_MODES:
+            raise ValueError(f"Unbekannter Speichermodus: {storage_mode}")
+        
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        self.storage_mode = storage_mode
+        self.lazy_carts = lazy_carts
+        self._cart_sweeper: Optional[threading.Thread] = None
+        self._cart_sweeper_stop = threading.Event()
+        self.sequences = IdSequences(os.path.join(data_dir, "sequences.json"))
+        self.database = None
+        if storage_mode == "sqlite":
+            self.database = SqliteDatabase(os.path.join(data_dir, "ecommerce.db"))
+        
+        self.products = self._open_store("products", ("category_id", "sku"))
+        self.categories = self._open_store("categories")
+        # Warenkörbe und Bestellungen ändern sich bei fast jeder Anfrage
+        if self.database is not None:
+            self.carts = self._open_store("carts", ("session_id",))
+        else:
+            self.carts = ShardedStore(
+                os.path.join(data_dir, "carts"), "session_id", num_shards=CART_SHARDS,
+                store_class=JournalStore if storage_mode == "journal" else JsonFileStore,
+                indexes=("session_id",), sequences=self.sequences,
+                legacy_path=os.path.join(data_dir, "carts.json")
+            )
+        self.orders = self._open_partitioned("orders", ("customer_id",))
+        self.order_items = self._open_partitioned("order_items", ("order_id",))
+        self.addresses = self._open_store("addresses", ("customer_id",))
+        self.discounts = self._open_store("discounts")
+        self.reviews = self._open_store("reviews", ("product_id",))
+        # Laufende Bewertungssummen je Produkt, werden mit jeder Bewertung fortgeschrieben
+        self.review_stats = self._open_store("review_stats", ("product_id",))
+        self._review_stats_checked = False
+        # Abklingende Verkaufswerte und Kaufgemeinsamkeiten je Produkt, mit jeder Bestellung fortgeschrieben
+        self.product_sales = self._open_store("product_sales", ("product_id",))
+        self._product_sales_checked = False
+        self.popularity = PopularityIndex()
+        self._popularity_generation = None
+        # Wird beim ersten Suchaufruf aufgebaut und danach inkrementell nachgeführt
+        self.search_index = ProductSearchIndex()
+        self._search_generation = None
+        # (Kunde, Adresstyp) -> ID der Standardadresse, Aufbau beim ersten Zugriff
+        self._address_defaults: Dict[Tuple[int, str], int] = {}
+        self._address_defaults_generation = None
+        self.category_tree = CategoryTree()
+        self._category_generation = None
+        self._discount_index: Optional[DiscountIndex] = None
+        self._discount_generation = None
+        # Bestand und Reservierungen je Artikelnummer, gesperrt wird je Artikel statt je Datei
+        self.inventory = StockLedger(os.path.join(data_dir, "inventory")) if stock_reservation else None
+        self._stock_sync_lock = threading.Lock()
+        self._stock_sync_pending: set = set()
+        self._stock_sync_timer: Optional[threading.Timer] = None
+
+    def _open_store(self, name: str, indexes: tuple = ()):
+        """Öffnet den Store einer Entität im konfigurierten Speichermodus"""
+        if self.database is not None:
+            return SqliteStore(self.database, name, indexes)
+        return JsonFileStore(os.path.join(self.data_dir, f"{name}.json"), indexes=indexes, sequences=self.sequences)
+    
+    def _open_partitioned(self, name: str, indexes: tuple = ()):
+        """Öffnet einen nach Monaten partitionierten Store (in SQLite eine Tabelle)"""
+        if self.database is not None:
+            return SqliteStore(self.database, name, indexes)
+        return PartitionedStore(
+            os.path.join(self.data_dir, name), indexes=indexes,
+            store_class=JournalStore if self.storage_mode == "journal" else JsonFileStore,
+            sequences=self.sequences, legacy_path=os.path.join(self.data_dir, f"{name}.json"),
+            archive_after_months=ORDER_ARCHIVE_MONTHS
+        )
     
     # Produkt-Operationen
     def get_products(self, skip: int = 0, limit: int = 100, category_id: Optional[int] = None, 
-                    active_only: bool = True) -> List[Product]:
-        """Gibt eine Liste von Produkten zurück, optional gefiltert nach Kategorie"""
-        products = _load_data(PRODUCTS_FILE)
+                    active_only: bool = True, include_subcategories: bool = False,
+                    sort: Optional[str] = None) -> List[Product]:
+        """
+        Gibt eine Liste von Produkten zurück, optional gefiltert nach Kategorie
+        
+        Mit ``sort="popular"`` stehen die meistverkauften Produkte (abklingend
+        gewichtet) vorne, Produkte ohne Verkäufe folgen nach ID.
+        
+        Raises:
+            ValueError: Bei unbekannter Sortierung
+        """
+        if sort not in (None, "popular"):
+            raise ValueError(f"Unbekannte Sortierung: {sort}")
+        if category_id is not None and include_subcategories:
+            products = list(heapq.merge(
+                *(self.products.find('category_id', c) for c in self._subcategory_ids(category_id, active_only)),
+                key=lambda p: p['id']
+            ))
+        elif category_id is not None:
+            products = self.products.find('category_id', category_id)
+        else:
+            products = self.products.all()
         
         # Filtern
         if active_only:
             products = [p for p in products if p.get('active', True)]
-        if category_id is not None:
-            products = [p for p in products if p.get('category_id') == category_id]
             
         # Paginierung
-        paginated = products[skip:skip + limit]
+        if sort == "popular":
+            popularity = self._popularity_index()
+            paginated = heapq.nsmallest(skip + limit, products, key=popularity.sort_key)[skip:]
+        else:
+            paginated = products[skip:skip + limit]
         return [Product(**p) for p in paginated]
     
+    def _products_page_records(self, limit: int, cursor: Optional[str], category_id: Optional[int],
+                               active_only: bool,
+                               include_subcategories: bool) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        predicate = (lambda p: p.get('active', True)) if active_only else None
+        after_id = decode_cursor(cursor)
+        if category_id is not None and include_subcategories:
+            # Je Kategorie eine Seite über den Index, zusammengeführt nach ID
+            pages = [self.products.page(after_id, limit + 1, 'category_id', c, predicate)
+                     for c in self._subcategory_ids(category_id, active_only)]
+            records = list(islice(heapq.merge(*pages, key=lambda p: p['id']), limit + 1))
+        else:
+            field = 'category_id' if category_id is not None else None
+            records = self.products.page(after_id, limit + 1, field, category_id, predicate)
+        return _next_page(records, limit)
+    
+    def get_products_page(self, limit: int = 100, cursor: Optional[str] = None,
+                          category_id: Optional[int] = None, active_only: bool = True,
+                          include_subcategories: bool = False) -> Tuple[List[Product], Optional[str]]:
+        """
+        Gibt eine Seite von Produkten nach ID-Reihenfolge zurück
+        
+        Args:
+            limit: Maximale Anzahl Produkte der Seite
+            cursor: Cursor der vorherigen Seite, None für die erste Seite
+            category_id: Optional nur Produkte dieser Kategorie
+            active_only: Nur aktive Produkte
+            include_subcategories: Auch Produkte aller Unterkategorien von category_id (mit active_only
+                nur aktiver Unterkategorien)
+            
+        Returns:
+            Produkte der Seite und Cursor der nächsten Seite (None am Ende)
+        """
+        records, next_cursor = self._products_page_records(limit, cursor, category_id, active_only,
+                                                           include_subcategories)
+        return [Product(**p) for p in records], next_cursor
+    
+    def get_products_page_json(self, limit: int = 100, cursor: Optional[str] = None,
+                               category_id: Optional[int] = None, active_only: bool = True,
+                               include_subcategories: bool = False) -> Tuple[bytes, Optional[str]]:
+        """Wie get_products_page, liefert die Seite aber ohne Modellvalidierung als JSON-Bytes"""
+        records, next_cursor = self._products_page_records(limit, cursor, category_id, active_only,
+                                                           include_subcategories)
+        return dumps(projector(Product).project_all(records)), next_cursor
+    
+    def _product_search_index(self) -> ProductSearchIndex:
+        """Gibt den Suchindex zurück und baut ihn neu auf, wenn ein anderer Prozess Produkte geändert hat"""
+        with self.search_index.lock:
+            generation = self.products.generation()
+            if generation != self._search_generation:
+                self.search_index.rebuild(self.products.all())
+                self._search_generation = generation
+            return self.search_index
+    
+    def _index_product(self, product: Dict[str, Any]) -> None:
+        """Führt eine eigene Produktänderung im Suchindex nach, sofern er schon aufgebaut ist"""
+        with self.search_index.lock:
+            if self._search_generation is not None:
+                self.search_index.add(product)
+    
+    def search_products(self, query: str, limit: int = 20, category_id: Optional[int] = None,
+                        active_only: bool = True) -> List[Product]:
+        """
+        Volltextsuche über Name, Beschreibung, Artikelnummer und Tags
+        
+        Args:
+            query: Suchtext, Begriffe passen auch als Wortanfang ("schrau" findet "Schraube")
+            limit: Maximale Anzahl Treffer
+            category_id: Optional nur Produkte dieser Kategorie
+            active_only: Nur aktive Produkte
+            
+        Returns:
+            Produkte absteigend nach Relevanz
+        """
+        return [Product(**p) for p in self._search_product_records(query, limit, category_id, active_only)]
+    
+    def search_products_json(self, query: str, limit: int = 20, category_id: Optional[int] = None,
+                             active_only: bool = True) -> bytes:
+        """Wie search_products, liefert die Treffer aber ohne Modellvalidierung als JSON-Bytes"""
+        records = self._search_product_records(query, limit, category_id, active_only)
+        return dumps(projector(Product).project_all(records))
+    
+    def _search_product_records(self, query: str, limit: int, category_id: Optional[int],
+                                active_only: bool) -> List[Dict[str, Any]]:
+        hits = self._product_search_index().search(query, limit, active_only, category_id)
+        records = self.products.get_many(product_id for product_id, _ in hits)
+        return [records[product_id] for product_id, _ in hits if product_id in records]
+    
+    def _popularity_index(self) -> PopularityIndex:
+        """Gibt die Verkaufswerte zurück und lädt sie neu, wenn ein anderer Prozess sie geändert hat"""
+        self._ensure_product_sales()
+        with self.popularity.lock:
+            generation = self.product_sales.generation()
+            if generation != self._popularity_generation:
+                self.popularity.rebuild(self.product_sales.all())
+                self._popularity_generation = generation
+            return self.popularity
+    
+    def get_related_products(self, product_id: int, limit: int = 10,
+                             active_only: bool = True) -> List[Product]:
+        """Gibt die Produkte zurück, die am häufigsten zusammen mit einem Produkt gekauft wurden"""
+        self._ensure_product_sales()
+        matches = self.product_sales.find('product_id', product_id)
+        related_ids = top_related(matches[0] if matches else None, MAX_RELATED)
+        records = self.products.get_many(related_ids)
+        related = [records[i] for i in related_ids if i in records]
+        if active_only:
+            related = [p for p in related if p.get('active', True)]
+        return [Product(**p) for p in related[:limit]]
+    
     def get_product(self, product_id: int) -> Optional[Product]:
         """Gibt ein einzelnes Produkt nach ID zurück"""
-        products = _load_data(PRODUCTS_FILE)
-        for product in products:
-            if product.get('id') == product_id:
-                return Product(**product)
-        return None
+        product = self.products.get(product_id)
+        if product is None:
+            return None
+        return Product(**product)
     
     def create_product(self, product: Product) -> Product:
         """Erstellt ein neues Produkt"""
-        products = _load_data(PRODUCTS_FILE)
         product_dict = product.dict()
-        product_dict['id'] = _get_next_id(products)
         product_dict['created_at'] = datetime.now().isoformat()
-        products.append(product_dict)
-        _save_data(PRODUCTS_FILE, products)
-        return Product(**product_dict)
+        created = self.products.insert(product_dict)
+        self._index_product(created)
+        return Product(**created)
     
     def update_product(self, product_id: int, product: Product) -> Optional[Product]:
         """Aktualisiert ein bestehendes Produkt"""
-        products = _load_data(PRODUCTS_FILE)
-        for i, p in enumerate(products):
-            if p.get('id') == product_id:
-                product_dict = product.dict(exclude_unset=True)
-                product_dict['id'] = product_id
-                product_dict['updated_at'] = datetime.now().isoformat()
-                products[i].update(product_dict)
-                _save_data(PRODUCTS_FILE, products)
-                return Product(**products[i])
-        return None
+        product_dict = product.dict(exclude_unset=True)
+        product_dict['updated_at'] = datetime.now().isoformat()
+        updated = self.products.update(product_id, product_dict)
+        if updated is None:
+            return None
+        self._index_product(updated)
+        if 'inventory_level' in product_dict:
+            self._set_stock(updated)
+        return Product(**updated)
     
     def delete_product(self, product_id: int) -> bool:
         """Löscht ein Produkt (oder deaktiviert es)"""
-        products = _load_data(PRODUCTS_FILE)
-        for i, p in enumerate(products):
-            if p.get('id') == product_id:
-                # Statt zu löschen, deaktivieren
-                products[i]['active'] = False
-                products[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(PRODUCTS_FILE, products)
-                return True
-        return False
+        # Statt zu löschen, deaktivieren
+        updated = self.products.update(product_id, {
+            'active': False,
+            'updated_at': datetime.now().isoformat()
+        })
+        if updated is None:
+            return False
+        self._index_product(updated)
+        return True
+    
+    def import_products(self, rows: Iterable[ImportRow],
+                        batch_size: int = IMPORT_BATCH_SIZE) -> ProductImportResult:
+        """
+        Legt Produkte an oder aktualisiert sie anhand der Artikelnummer
+        
+        Die Zeilen werden blockweise verarbeitet; jeder Block wird unter der
+        Sperre des Produkt-Stores validiert und mit einem Schreibvorgang
+        gespeichert. Fehlerhafte Zeilen werden gemeldet und übersprungen.
+        Bei bestehenden Produkten werden nur die angegebenen Felder geändert;
+        Zeilen ohne tatsächliche Änderung lösen keinen Schreibvorgang aus.
+        
+        Args:
+            rows: (Zeilennummer, Daten, Fehler) aus services.ecommerce_import
+            batch_size: Zeilen pro Block
+            
+        Returns:
+            Anzahl angelegter, aktualisierter und fehlerhafter Zeilen
+        """
+        result = ProductImportResult()
+        for chunk in chunked(rows, max(batch_size, 1)):
+            self._import_product_chunk(chunk, result)
+        return result
+    
+    def import_products_file(self, stream: BinaryIO, import_format: str,
+                             batch_size: int = IMPORT_BATCH_SIZE) -> ProductImportResult:
+        """Importiert Produkte zeilenweise aus einer UTF-8-Datei (Format "ndjson" oder "csv")"""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        try:
+            return self.import_products(iter_rows(text, import_format), batch_size)
+        finally:
+            text.detach()
+    
+    def _import_product_chunk(self, chunk: List[ImportRow], result: ProductImportResult) -> None:
+        def fail(row_number: int, sku: Optional[str], error: str) -> None:
+            result.failed += 1
+            if len(result.errors) < MAX_REPORTED_IMPORT_ERRORS:
+                result.errors.append(ProductImportError(row=row_number, sku=sku, error=error))
+        
+        now = datetime.now().isoformat()
+        written = []
+        restocked = []
+        with self.products.batch():
+            for row_number, row, error in chunk:
+                if error is not None:
+                    fail(row_number, None, error)
+                    continue
+                sku = row.get('sku')
+                if not sku:
+                    fail(row_number, None, "Artikelnummer (sku) fehlt")
+                    continue
+                sku = str(sku)
+                changes = {k: v for k, v in row.items() if k not in ('id', 'created_at', 'updated_at')}
+                try:
+                    matches = self.products.find('sku', sku)
+                    if matches:
+                        existing = matches[0]
+                        product = Product(**{**existing, **changes})
+                        updates = {
+                            field: value
+                            for field, value in _to_jsonable(product.dict(include=set(changes))).items()
+                            if existing.get(field) != value
+                        }
+                        if not updates:
+                            result.unchanged += 1
+                            continue
+                        updates['updated_at'] = now
+                        written.append(self.products.update(existing['id'], updates))
+                        if 'inventory_level' in updates:
+                            restocked.append(written[-1])
+                        result.updated += 1
+                    else:
+                        product_dict = Product(**changes).dict()
+                        product_dict['created_at'] = now
+                        written.append(self.products.insert(product_dict))
+                        result.created += 1
+                except (ValueError, TypeError) as e:
+                    fail(row_number, sku, " ".join(str(e).split()))
+        for record in written:
+            self._index_product(record)
+        for record in restocked:
+            self._set_stock(record)
     
     # Kategorie-Operationen
+    def _category_tree_index(self) -> CategoryTree:
+        """Gibt den Kategoriebaum zurück und baut ihn neu auf, wenn ein anderer Prozess Kategorien geändert hat"""
+        # Sperrreihenfolge wie beim Schreiben (Store, dann Baum), sonst blockieren sich
+        # Schreiber im Batch und Leser gegenseitig
+        with self.categories.lock, self.category_tree.lock:
+            generation = self.categories.generation()
+            if generation != self._category_generation:
+                self.category_tree.rebuild(self.categories.all())
+                self._category_generation = generation
+            return self.category_tree
+    
+    def _subcategory_ids(self, category_id: int, active_only: bool = True) -> List[int]:
+        """Gibt die Kategorie und ihre Unterkategorien zurück, mit ``active_only`` ohne deaktivierte Unterbäume"""
+        return self._category_tree_index().descendants(category_id, active_only) or [category_id]
+    
     def get_categories(self, skip: int = 0, limit: int = 100, active_only: bool = True) -> List[ProductCategory]:
         """Gibt eine Liste von Produktkategorien zurück"""
-        categories = _load_data(CATEGORIES_FILE)
+        categories = self.categories.all()
         
         # Filtern
         if active_only:
@@ -130,71 +475,119 @@ class ECommerceService:
     
     def get_category(self, category_id: int) -> Optional[ProductCategory]:
         """Gibt eine einzelne Kategorie nach ID zurück"""
-        categories = _load_data(CATEGORIES_FILE)
-        for category in categories:
-            if category.get('id') == category_id:
-                return ProductCategory(**category)
-        return None
+        category = self.categories.get(category_id)
+        if category is None:
+            return None
+        return ProductCategory(**category)
     
     def create_category(self, category: ProductCategory) -> ProductCategory:
         """Erstellt eine neue Produktkategorie"""
-        categories = _load_data(CATEGORIES_FILE)
         category_dict = category.dict()
-        category_dict['id'] = _get_next_id(categories)
         category_dict['created_at'] = datetime.now().isoformat()
-        categories.append(category_dict)
-        _save_data(CATEGORIES_FILE, categories)
-        return ProductCategory(**category_dict)
+        with self.categories.batch():
+            tree = self._category_tree_index()
+            created = self.categories.insert(category_dict)
+            tree.add(created)
+        return ProductCategory(**created)
     
     def update_category(self, category_id: int, category: ProductCategory) -> Optional[ProductCategory]:
-        """Aktualisiert eine bestehende Kategorie"""
-        categories = _load_data(CATEGORIES_FILE)
-        for i, c in enumerate(categories):
-            if c.get('id') == category_id:
-                category_dict = category.dict(exclude_unset=True)
-                category_dict['id'] = category_id
-                category_dict['updated_at'] = datetime.now().isoformat()
-                categories[i].update(category_dict)
-                _save_data(CATEGORIES_FILE, categories)
-                return ProductCategory(**categories[i])
-        return None
+        """
+        Aktualisiert eine bestehende Kategorie
+        
+        Raises:
+            ValueError: Wenn die neue übergeordnete Kategorie unterhalb dieser Kategorie liegt
+        """
+        category_dict = category.dict(exclude_unset=True)
+        category_dict['updated_at'] = datetime.now().isoformat()
+        with self.categories.batch():
+            tree = self._category_tree_index()
+            if 'parent_id' in category_dict:
+                if category_dict['parent_id'] == category_id:
+                    raise ValueError(f"Kategorie {category_id} kann sich nicht selbst übergeordnet sein")
+                tree.check_parent(category_id, category_dict['parent_id'])
+            updated = self.categories.update(category_id, category_dict)
+            if updated is None:
+                return None
+            tree.add(updated)
+        return ProductCategory(**updated)
     
     def delete_category(self, category_id: int) -> bool:
         """Löscht eine Kategorie (oder deaktiviert sie)"""
-        categories = _load_data(CATEGORIES_FILE)
-        for i, c in enumerate(categories):
-            if c.get('id') == category_id:
-                # Statt zu löschen, deaktivieren
-                categories[i]['active'] = False
-                categories[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(CATEGORIES_FILE, categories)
-                return True
-        return False
+        # Statt zu löschen, deaktivieren
+        with self.categories.batch():
+            tree = self._category_tree_index()
+            updated = self.categories.update(category_id, {
+                'active': False,
+                'updated_at': datetime.now().isoformat()
+            })
+            if updated is None:
+                return False
+            tree.add(updated)
+        return True
     
     # Warenkorb-Operationen
+    def _find_cart(self, session_id: str) -> Optional[Dict[str, Any]]:
+        carts = self.carts.find('session_id', session_id)
+        return carts[0] if carts else None
+
+    def _price_cart(self, cart: ShoppingCart) -> None:
+        """Berechnet den Rabattbetrag eines Warenkorbs in einem Durchgang über die Positionen"""
+        cart.discount_amount = 0.0
+        if not cart.discount_code:
+            return
+        discount = self._discount_index_snapshot().lookup(cart.discount_code)
+        if discount is None or not discount.is_valid_at(datetime.now().timestamp()):
+            return
+        subtotal = sum(item.price * item.quantity for item in cart.items)
+        cart.discount_amount = discount.amount_for(subtotal)
+
+    def _save_cart_items(self, cart: ShoppingCart) -> None:
+        self._price_cart(cart)
+        if cart.id is None:
+            # Noch nicht gespeicherter Warenkorb: erst anlegen, wenn er Inhalt hat
+            if cart.items or cart.discount_code:
+                persisted = self._create_cart(cart.session_id)
+                cart.id = persisted.id
+                for item in cart.items:
+                    item.cart_id = cart.id
+            else:
+                return
+        updated = self.carts.shard_for(cart.session_id).update(cart.id, {
+            'items': [item.dict() for item in cart.items],
+            'discount_code': cart.discount_code,
+            'discount_amount': cart.discount_amount,
+            'updated_at': datetime.now().isoformat()
+        })
+        if updated is None:
+            raise ValueError(f"Warenkorb für Session {cart.session_id} konnte nicht gefunden werden")
+
     def get_cart(self, session_id: str) -> ShoppingCart:
-        """Gibt den Warenkorb für eine Session zurück oder erstellt einen neuen"""
-        carts = _load_data(CARTS_FILE)
-        for cart in carts:
-            if cart.get('session_id') == session_id:
-                # Lade Warenkorb-Items
-                cart_items = []
-                for item in cart.get('items', []):
-                    cart_items.append(CartItem(**item))
-                cart['items'] = cart_items
-                return ShoppingCart(**cart)
+        """
+        Gibt den Warenkorb für eine Session zurück oder erstellt einen neuen
         
-        # Erstelle neuen Warenkorb, wenn nicht gefunden
-        new_cart = ShoppingCart(
-            id=_get_next_id(carts),
-            session_id=session_id,
-            items=[]
-        )
-        cart_dict = new_cart.dict()
-        cart_dict['created_at'] = datetime.now().isoformat()
-        carts.append(cart_dict)
-        _save_data(CARTS_FILE, carts)
-        return new_cart
+        Mit ``lazy_carts`` wird ein neuer Warenkorb nur im Speicher angelegt
+        (``id`` ist None) und erst gespeichert, sobald er Inhalt bekommt.
+        """
+        cart = self._find_cart(session_id)
+        if cart is not None:
+            return ShoppingCart(**cart)
+        if self.lazy_carts:
+            return ShoppingCart(session_id=session_id, items=[])
+        return self._create_cart(session_id)
+
+    def _create_cart(self, session_id: str) -> ShoppingCart:
+        """Gibt den gespeicherten Warenkorb einer Session zurück und legt ihn bei Bedarf an"""
+        with self.carts.shard_for(session_id).batch() as cart_store:
+            # Ein anderer Worker könnte den Warenkorb inzwischen angelegt haben
+            cart = self._find_cart(session_id)
+            if cart is not None:
+                return ShoppingCart(**cart)
+            
+            # Erstelle neuen Warenkorb, wenn nicht gefunden
+            new_cart = ShoppingCart(session_id=session_id, items=[])
+            cart_dict = new_cart.dict()
+            cart_dict['created_at'] = datetime.now().isoformat()
+            return ShoppingCart(**cart_store.insert(cart_dict))
     
     def add_to_cart(self, session_id: str, product_id: int, quantity: int = 1) -> ShoppingCart:
         """Fügt ein Produkt zum Warenkorb hinzu"""
@@ -203,112 +596,188 @@ class ECommerceService:
         if not product:
             raise ValueError(f"Produkt mit ID {product_id} nicht gefunden")
         
-        # Hole oder erstelle Warenkorb
-        cart = self.get_cart(session_id)
-        carts = _load_data(CARTS_FILE)
-        
-        # Finde den Warenkorb in der Liste
-        cart_index = -1
-        for i, c in enumerate(carts):
-            if c.get('session_id') == session_id:
-                cart_index = i
-                break
-        
-        if cart_index == -1:
-            # Warenkorb existiert nicht, was seltsam ist, da get_cart einen erstellen sollte
-            raise ValueError(f"Warenkorb für Session {session_id} konnte nicht gefunden werden")
-        
-        # Prüfe, ob das Produkt bereits im Warenkorb ist
-        item_found = False
-        for i, item in enumerate(cart.items):
-            if item.product_id == product_id:
-                # Update Menge
-                item.quantity += quantity
-                item.updated_at = datetime.now()
-                item_found = True
-                # Update in der JSON-Datei
-                carts[cart_index]['items'][i] = item.dict()
-                break
-        
-        if not item_found:
-            # Neues Item erstellen
-            new_item = CartItem(
-                cart_id=cart.id,
-                product_id=product_id,
-                quantity=quantity,
-                price=product.price
-            )
-            if 'items' not in carts[cart_index]:
-                carts[cart_index]['items'] = []
-            carts[cart_index]['items'].append(new_item.dict())
-            cart.items.append(new_item)
+        # Lesen und Schreiben unter der Sperre der Shard, damit parallele Anfragen
+        # derselben Session keine Änderungen verlieren
+        with self.carts.shard_for(session_id).batch():
+            # Hole oder erstelle Warenkorb, die Positionen brauchen seine ID
+            cart = self._create_cart(session_id)
         
-        # Aktualisiere das Update-Datum
-        carts[cart_index]['updated_at'] = datetime.now().isoformat()
-        _save_data(CARTS_FILE, carts)
+            # Prüfe, ob das Produkt bereits im Warenkorb ist
+            cart_item = None
+            for item in cart.items:
+                if item.product_id == product_id:
+                    # Update Menge
+                    item.quantity += quantity
+                    item.updated_at = datetime.now()
+                    cart_item = item
+                    break
+        
+            if cart_item is None:
+                # Neues Item erstellen
+                cart_item = CartItem(
+                    cart_id=cart.id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    price=product.price
+                )
+                cart.items.append(cart_item)
         
-        return cart
+            # Erst reservieren, dann speichern: bei zu wenig Bestand bleibt der Warenkorb unverändert
+            self._hold_stock(session_id, product, cart_item.quantity)
+            self._save_cart_items(cart)
+            return cart
     
     def remove_from_cart(self, session_id: str, product_id: int, quantity: Optional[int] = None) -> ShoppingCart:
         """Entfernt ein Produkt aus dem Warenkorb oder reduziert die Menge"""
-        # Hole Warenkorb
-        cart = self.get_cart(session_id)
-        carts = _load_data(CARTS_FILE)
-        
-        # Finde den Warenkorb in der Liste
-        cart_index = -1
-        for i, c in enumerate(carts):
-            if c.get('session_id') == session_id:
-                cart_index = i
-                break
-        
-        if cart_index == -1:
-            raise ValueError(f"Warenkorb für Session {session_id} konnte nicht gefunden werden")
-        
-        # Finde das Produkt im Warenkorb
-        items_to_remove = []
-        for i, item in enumerate(cart.items):
-            if item.product_id == product_id:
-                if quantity is None or item.quantity <= quantity:
-                    # Entferne das Item komplett
-                    items_to_remove.append(i)
-                else:
-                    # Reduziere die Menge
-                    item.quantity -= quantity
-                    item.updated_at = datetime.now()
-                    # Update in der JSON-Datei
-                    carts[cart_index]['items'][i] = item.dict()
-                break
+        with self.carts.shard_for(session_id).batch():
+            # Hole Warenkorb
+            cart = self.get_cart(session_id)
         
-        # Entferne Items
-        for i in sorted(items_to_remove, reverse=True):
-            del cart.items[i]
-            if 'items' in carts[cart_index] and i < len(carts[cart_index]['items']):
-                del carts[cart_index]['items'][i]
+            # Finde das Produkt im Warenkorb
+            remaining = None
+            for i, item in enumerate(cart.items):
+                if item.product_id == product_id:
+                    if quantity is None or item.quantity <= quantity:
+                        # Entferne das Item komplett
+                        del cart.items[i]
+                        remaining = 0
+                    else:
+                        # Reduziere die Menge
+                        item.quantity -= quantity
+                        item.updated_at = datetime.now()
+                        remaining = item.quantity
+                    break
         
-        # Aktualisiere das Update-Datum
-        carts[cart_index]['updated_at'] = datetime.now().isoformat()
-        _save_data(CARTS_FILE, carts)
-        
-        return cart
+            self._save_cart_items(cart)
+            if remaining is not None:
+                product = self.get_product(product_id)
+                if product is not None:
+                    self._hold_stock(session_id, product, remaining)
+            return cart
     
     def clear_cart(self, session_id: str) -> ShoppingCart:
         """Leert den Warenkorb komplett"""
-        cart = self.get_cart(session_id)
-        carts = _load_data(CARTS_FILE)
+        with self.carts.shard_for(session_id).batch():
+            cart = self.get_cart(session_id)
+            held = [item.product_id for item in cart.items]
+            cart.items = []
+            self._save_cart_items(cart)
+            if held and self.inventory is not None:
+                products = self._resolve_products(held)
+                self.inventory.release((product.sku for product in products.values()), session_id)
+            return cart
+    
+    def expire_carts(self, max_idle: Optional[timedelta] = None) -> int:
+        """
+        Löscht Warenkörbe, die länger als ``max_idle`` nicht geändert wurden
+        
+        Maßgeblich ist die letzte Änderung (``updated_at``, sonst ``created_at``).
+        Gibt die Anzahl der gelöschten Warenkörbe zurück.
+        """
+        if max_idle is None:
+            max_idle = timedelta(hours=CART_TTL_HOURS)
+        cutoff = (datetime.now() - max_idle).isoformat()
+        
+        def idle(cart: Dict) -> bool:
+            last_activity = cart.get('updated_at') or cart.get('created_at')
+            # ISO-Zeitstempel gleicher Form lassen sich als Text vergleichen
+            return isinstance(last_activity, str) and last_activity < cutoff
+        
+        return self.carts.delete_where(idle)
+    
+    def start_cart_sweeper(self, interval: Optional[timedelta] = None,
+                           max_idle: Optional[timedelta] = None) -> None:
+        """Startet einen Hintergrund-Thread, der regelmäßig abgelaufene Warenkörbe löscht"""
+        if self._cart_sweeper is not None and self._cart_sweeper.is_alive():
+            return
+        if interval is None:
+            interval = timedelta(minutes=CART_SWEEP_MINUTES)
+        self._cart_sweeper_stop.clear()
         
-        # Finde den Warenkorb in der Liste
-        for i, c in enumerate(carts):
-            if c.get('session_id') == session_id:
-                carts[i]['items'] = []
-                carts[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(CARTS_FILE, carts)
-                break
+        def sweep() -> None:
+            while not self._cart_sweeper_stop.wait(interval.total_seconds()):
+                try:
+                    removed = self.expire_carts(max_idle)
+                    if removed:
+                        logger.info(f"{removed} abgelaufene Warenkörbe gelöscht")
+                except Exception as e:
+                    logger.error(f"Fehler beim Löschen abgelaufener Warenkörbe: {e}")
         
-        cart.items = []
-        return cart
+        self._cart_sweeper = threading.Thread(target=sweep, name="ecommerce-cart-sweeper", daemon=True)
+        self._cart_sweeper.start()
+    
+    def stop_cart_sweeper(self) -> None:
+        """Beendet den Aufräum-Thread für Warenkörbe"""
+        self._cart_sweeper_stop.set()
+        if self._cart_sweeper is not None:
+            self._cart_sweeper.join()
+            self._cart_sweeper = None
+    
+    # Lagerbestand
+    def _hold_stock(self, session_id: str, product: Product, quantity: int) -> None:
+        """Setzt die Reservierung eines Warenkorbs für ein Produkt auf die Menge im Warenkorb"""
+        if self.inventory is not None:
+            self.inventory.hold(product.sku, session_id, quantity, product.inventory_level,
+                                timedelta(minutes=CART_HOLD_MINUTES))
+    
+    def _set_stock(self, product: Dict[str, Any]) -> None:
+        """Übernimmt einen im Katalog gesetzten Lagerbestand in die Bestandsführung"""
+        if self.inventory is not None:
+            self.inventory.set_on_hand(product['sku'], product.get('inventory_level', 0))
+    
+    def get_stock(self, product_id: int) -> Optional[StockLevel]:
+        """Gibt Lagerbestand, Reservierungen und verfügbaren Bestand eines Produkts zurück"""
+        product = self.get_product(product_id)
+        if product is None:
+            return None
+        level = None
+        if self.inventory is not None:
+            level = self.inventory.level(product.sku, product.inventory_level)
+        if level is None:
+            level = {'on_hand': product.inventory_level, 'reserved': 0, 'available': product.inventory_level}
+        return StockLevel(product_id=product_id, sku=product.sku, on_hand=level['on_hand'],
+                          reserved=level['reserved'], available=level['available'])
+    
+    def _schedule_stock_sync(self, product_ids: Iterable[int]) -> None:
+        """Merkt Produkte für die Übernahme des Bestands in den Katalog vor"""
+        with self._stock_sync_lock:
+            self._stock_sync_pending.update(product_ids)
+            if self._stock_sync_timer is None:
+                self._stock_sync_timer = threading.Timer(STOCK_SYNC_SECONDS, self.flush_stock_levels)
+                self._stock_sync_timer.daemon = True
+                self._stock_sync_timer.start()
+    
+    def flush_stock_levels(self) -> int:
+        """
+        Schreibt den abgebuchten Bestand vorgemerkter Produkte in den Katalog (``inventory_level``)
+        
+        Mehrere Bestellungen werden so mit einem Schreibvorgang des
+        Produkt-Stores übernommen. Gibt die Anzahl geänderter Produkte zurück.
+        """
+        with self._stock_sync_lock:
+            product_ids, self._stock_sync_pending = self._stock_sync_pending, set()
+            if self._stock_sync_timer is not None:
+                self._stock_sync_timer.cancel()
+                self._stock_sync_timer = None
+        if not product_ids or self.inventory is None:
+            return 0
+        changed = 0
+        with self.products.batch():
+            for product_id, product in self.products.get_many(product_ids).items():
+                level = self.inventory.level(product['sku'])
+                if level is not None and product.get('inventory_level') != level['on_hand']:
+                    self.products.update(product_id, {'inventory_level': level['on_hand']})
+                    changed += 1
+        return changed
     
     # Bestelloperationen
+    def _resolve_products(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        """Lädt mehrere Produkte mit einem einzigen Store-Zugriff"""
+        return {
+            product_id: Product(**product)
+            for product_id, product in self.products.get_many(set(product_ids)).items()
+        }
+    
     def create_order(self, cart: ShoppingCart, customer_id: int, 
                     shipping_address_id: int, billing_address_id: int,
                     payment_method: str, shipping_method: str) -> Order:
@@ -325,30 +794,40 @@ class ECommerceService:
         tax_amount = 0.0
         shipping_cost = 10.0  # Standardversandkosten
         
-        # Lade aktuelle Produkte für Preise und Steuern
-        order_items = []
+        # Lade alle Produkte des Warenkorbs in einem Durchgang für Preise und Steuern
+        products = self._resolve_products(item.product_id for item in cart.items)
+        priced_lines = []
         for cart_item in cart.items:
-            product = self.get_product(cart_item.product_id)
+            product = products.get(cart_item.product_id)
             if not product:
                 raise ValueError(f"Produkt mit ID {cart_item.product_id} nicht gefunden")
             
             item_price = product.price * cart_item.quantity
-            item_tax = item_price * (product.tax_rate / 100)
-            
             subtotal += item_price
+            priced_lines.append((product, cart_item.quantity, item_price))
+        
+        # Rabatt auf die Zwischensumme, anteilig auf die Positionen verteilt
+        discount = self._checkout_discount(cart.discount_code)
+        discount_amount = discount.amount_for(subtotal) if discount else 0.0
+        
+        order_lines = []
+        sold = [(product.id, quantity) for product, quantity, _ in priced_lines]
+        for product, quantity, item_price in priced_lines:
+            item_discount = discount_amount * item_price / subtotal if subtotal else 0.0
+            item_tax = (item_price - item_discount) * (product.tax_rate / 100)
             tax_amount += item_tax
             
-            order_item = OrderItem(
+            order_lines.append(dict(
                 product_id=product.id,
                 product_name=product.name,
-                quantity=cart_item.quantity,
+                quantity=quantity,
                 unit_price=product.price,
                 tax_rate=product.tax_rate,
-                total_price=item_price + item_tax
-            )
-            order_items.append(order_item)
+                discount_amount=round(item_discount, 2),
+                total_price=item_price - item_discount + item_tax
+            ))
         
-        total_amount = subtotal + tax_amount + shipping_cost
+        total_amount = subtotal - discount_amount + tax_amount + shipping_cost
         
         # Erstelle die Bestellung
         order = Order(
@@ -361,226 +840,386 @@ class ECommerceService:
             subtotal=subtotal,
             tax_amount=tax_amount,
             shipping_cost=shipping_cost,
+            discount_amount=discount_amount,
             total_amount=total_amount
         )
         
-        # Speichere die Bestellung
-        orders = _load_data(ORDERS_FILE)
-        order_dict = order.dict()
-        order_dict['id'] = _get_next_id(orders)
-        order_dict['created_at'] = datetime.now().isoformat()
-        orders.append(order_dict)
-        _save_data(ORDERS_FILE, orders)
-        
-        # Speichere die Bestellpositionen
-        order_items_data = _load_data(ORDER_ITEMS_FILE)
-        for item in order_items:
-            item_dict = item.dict()
-            item_dict['id'] = _get_next_id(order_items_data)
-            item_dict['order_id'] = order_dict['id']
-            item_dict['created_at'] = datetime.now().isoformat()
-            order_items_data.append(item_dict)
-        _save_data(ORDER_ITEMS_FILE, order_items_data)
-        
-        # Leere den Warenkorb
-        self.clear_cart(cart.session_id)
+        # Bestand zuerst abbuchen, nur unter den Sperren der bestellten Artikel;
+        # scheitert danach das Speichern der Bestellung, wird er zurückgebucht
+        booked: Dict[str, int] = {}
+        if self.inventory is not None:
+            self.inventory.commit(
+                [(product.sku, quantity, product.inventory_level) for product, quantity, _ in priced_lines],
+                cart.session_id
+            )
+            for product, quantity, _ in priced_lines:
+                booked[product.sku] = booked.get(product.sku, 0) + quantity
+        
+        # Bestellung, Positionen, Rabattnutzung und geleerter Warenkorb werden gemeinsam gespeichert
+        ordered_at = datetime.now()
+        now = ordered_at.isoformat()
+        cart_store = self.carts.shard_for(cart.session_id)
+        self._ensure_product_sales()
+        used_discount = None
+        try:
+            with transaction(self.orders, self.order_items, self.discounts, self.product_sales, cart_store):
+                if discount is not None:
+                    used_discount = self._count_discount_use(discount.id, now)
+                
+                order_dict = order.dict()
+                order_dict['created_at'] = now
+                order_dict = self.orders.insert(order_dict)
+                
+                for line in order_lines:
+                    item_dict = OrderItem(order_id=order_dict['id'], **line).dict()
+                    item_dict['created_at'] = now
+                    self.order_items.insert(item_dict)
+                
+                # Leere den Warenkorb
+                cleared = {'items': [], 'discount_code': None, 'discount_amount': 0.0, 'updated_at': now}
+                if cart_store.update(cart.id, cleared) is None:
+                    raise ValueError(f"Warenkorb für Session {cart.session_id} konnte nicht gefunden werden")
+                
+                sales = self._count_sales(sold, ordered_at)
+        except Exception:
+            if booked:
+                self.inventory.restock(booked)
+            raise
         
+        # Erst nach erfolgreicher Transaktion, ein Abbruch soll den Index nicht verändern
+        self._track_discount(used_discount)
+        if booked:
+            self._schedule_stock_sync(product.id for product, _, _ in priced_lines)
+        with self.popularity.lock:
+            if self._popularity_generation is not None:
+                for record in sales:
+                    self.popularity.add(record)
         return Order(**order_dict)
     
     def get_orders(self, customer_id: int, skip: int = 0, limit: int = 100) -> List[Order]:
         """Gibt die Bestellungen eines Kunden zurück"""
-        orders = _load_data(ORDERS_FILE)
-        customer_orders = [o for o in orders if o.get('customer_id') == customer_id]
+        customer_orders = self.orders.find('customer_id', customer_id)
         
         # Paginierung
         paginated = customer_orders[skip:skip + limit]
         return [Order(**o) for o in paginated]
     
+    def get_orders_page(self, customer_id: int, limit: int = 100,
+                        cursor: Optional[str] = None) -> Tuple[List[Order], Optional[str]]:
+        """Gibt eine Seite der Bestellungen eines Kunden und den Folge-Cursor zurück"""
+        records = self.orders.page(decode_cursor(cursor), limit + 1, 'customer_id', customer_id)
+        records, next_cursor = _next_page(records, limit)
+        return [Order(**o) for o in records], next_cursor
+    
+    def get_orders_page_json(self, customer_id: int, limit: int = 100,
+                             cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """Wie get_orders_page, liefert die Seite aber ohne Modellvalidierung als JSON-Bytes"""
+        records = self.orders.page(decode_cursor(cursor), limit + 1, 'customer_id', customer_id)
+        records, next_cursor = _next_page(records, limit)
+        return dumps(projector(Order).project_all(records)), next_cursor
+    
     def get_order(self, order_id: int) -> Optional[Order]:
         """Gibt eine einzelne Bestellung nach ID zurück"""
-        orders = _load_data(ORDERS_FILE)
-        for order in orders:
-            if order.get('id') == order_id:
-                return Order(**order)
-        return None
+        order = self.orders.get(order_id)
+        if order is None:
+            return None
+        return Order(**order)
     
     def get_order_items(self, order_id: int) -> List[OrderItem]:
         """Gibt die Positionen einer Bestellung zurück"""
-        order_items = _load_data(ORDER_ITEMS_FILE)
-        items = [i for i in order_items if i.get('order_id') == order_id]
+        items = self.order_items.find('order_id', order_id)
         return [OrderItem(**i) for i in items]
     
     def update_order_status(self, order_id: int, status: str) -> Optional[Order]:
-        """Aktualisiert den Status einer Bestellung"""
-        orders = _load_data(ORDERS_FILE)
-        for i, o in enumerate(orders):
-            if o.get('id') == order_id:
-                orders[i]['status'] = status
-                orders[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(ORDERS_FILE, orders)
-                return Order(**orders[i])
-        return None
+        """
+        Aktualisiert den Status einer Bestellung
+        
+        Raises:
+            ValueError: Wenn die Bestellung bereits archiviert ist
+        """
+        updated = self.orders.update(order_id, {
+            'status': status,
+            'updated_at': datetime.now().isoformat()
+        })
+        if updated is None:
+            return None
+        return Order(**updated)
+    
+    def _ensure_product_sales(self) -> None:
+        """Baut die Verkaufsstatistik einmalig auf, falls Bestellungen aus der Zeit davor existieren"""
+        if self._product_sales_checked:
+            return
+        with transaction(self.order_items, self.product_sales):
+            if not self.product_sales.page(None, 1) and self.order_items.page(None, 1):
+                self.rebuild_product_sales()
+        self._product_sales_checked = True
+    
+    def rebuild_product_sales(self) -> None:
+        """Berechnet Verkaufswerte und Kaufgemeinsamkeiten aus allen Bestellpositionen neu"""
+        orders: Dict[int, Tuple[datetime, List[Tuple[int, int]]]] = {}
+        for item in self.order_items.all():
+            if item['order_id'] not in orders:
+                try:
+                    ordered_at = datetime.fromisoformat(item['created_at'])
+                except (KeyError, TypeError, ValueError):
+                    ordered_at = datetime.now()
+                orders[item['order_id']] = (ordered_at, [])
+            orders[item['order_id']][1].append((item['product_id'], item.get('quantity') or 1))
+        stats: Dict[int, Dict[str, Any]] = {}
+        for ordered_at, lines in orders.values():
+            count_order(stats, lines, ordered_at, POPULARITY_HALF_LIFE_DAYS)
+        with self.product_sales.batch():
+            self.product_sales.delete_where(lambda record: True)
+            for record in stats.values():
+                self.product_sales.insert(record)
+    
+    def _count_sales(self, lines: List[Tuple[int, int]], ordered_at: datetime) -> List[Dict[str, Any]]:
+        """Schreibt Verkaufswerte und Kaufgemeinsamkeiten der Produkte einer Bestellung fort"""
+        stats = {}
+        for product_id, _ in lines:
+            matches = self.product_sales.find('product_id', product_id)
+            if matches:
+                stats[product_id] = dict(matches[0])
+        count_order(stats, lines, ordered_at, POPULARITY_HALF_LIFE_DAYS)
+        written = []
+        for record in stats.values():
+            if record.get('id') is not None:
+                written.append(self.product_sales.update(record['id'], record))
+            else:
+                written.append(self.product_sales.insert(record))
+        return written
+    
+    def archive_orders(self) -> int:
+        """Archiviert abgeschlossene Monate von Bestellungen und Positionen, gibt die Anzahl zurück"""
+        return sum(store.archive() for store in (self.orders, self.order_items)
+                   if isinstance(store, PartitionedStore))
     
     # Adressverwaltung
     def get_addresses(self, customer_id: int) -> List[Address]:
         """Gibt die Adressen eines Kunden zurück"""
-        addresses = _load_data(ADDRESSES_FILE)
-        customer_addresses = [a for a in addresses if a.get('customer_id') == customer_id]
+        customer_addresses = self.addresses.find('customer_id', customer_id)
         return [Address(**a) for a in customer_addresses]
     
     def get_address(self, address_id: int) -> Optional[Address]:
         """Gibt eine einzelne Adresse nach ID zurück"""
-        addresses = _load_data(ADDRESSES_FILE)
-        for address in addresses:
-            if address.get('id') == address_id:
-                return Address(**address)
-        return None
+        address = self.addresses.get(address_id)
+        if address is None:
+            return None
+        return Address(**address)
+
+    def _default_addresses(self) -> Dict[Tuple[int, str], int]:
+        """Gibt die Zeiger auf die Standardadressen zurück und baut sie nach fremden Änderungen neu auf"""
+        with self.addresses.lock:
+            generation = self.addresses.generation()
+            if generation != self._address_defaults_generation:
+                defaults = {}
+                for a in self.addresses.all():
+                    if a.get('is_default'):
+                        defaults[(a['customer_id'], a.get('address_type'))] = a['id']
+                self._address_defaults = defaults
+                self._address_defaults_generation = generation
+            return self._address_defaults
+    
+    def _track_default_address(self, defaults: Dict[Tuple[int, str], int], address: Dict[str, Any],
+                               previous: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Führt die Standardadress-Zeiger nach einer Änderung nach
+        
+        Wird die Adresse Standard, verliert nur die bisherige Standardadresse
+        desselben Kunden und Typs ihr Kennzeichen; andere Adressen werden
+        nicht durchsucht. Muss im Batch des Adress-Stores laufen, ``defaults``
+        muss vor der Änderung geholt worden sein.
+        """
+        if previous is not None:
+            old_key = (previous['customer_id'], previous.get('address_type'))
+            if defaults.get(old_key) == address['id']:
+                del defaults[old_key]
+        if not address.get('is_default'):
+            return
+        key = (address['customer_id'], address.get('address_type'))
+        current = defaults.get(key)
+        if current is not None and current != address['id']:
+            self.addresses.update(current, {'is_default': False})
+        defaults[key] = address['id']
+    
+    def get_default_address(self, customer_id: int, address_type: str) -> Optional[Address]:
+        """Gibt die Standardadresse eines Kunden für einen Adresstyp zurück"""
+        address_id = self._default_addresses().get((customer_id, address_type))
+        address = self.addresses.get(address_id) if address_id is not None else None
+        if address is None or not address.get('is_default'):
+            return None
+        return Address(**address)
     
     def create_address(self, address: Address) -> Address:
         """Erstellt eine neue Adresse"""
-        addresses = _load_data(ADDRESSES_FILE)
-        
-        # Prüfe, ob es eine Default-Adresse werden soll
-        if address.is_default:
-            # Setze alle anderen Adressen des Kunden auf nicht-default
-            for i, a in enumerate(addresses):
-                if a.get('customer_id') == address.customer_id and a.get('address_type') == address.address_type:
-                    addresses[i]['is_default'] = False
-        
-        address_dict = address.dict()
-        address_dict['id'] = _get_next_id(addresses)
-        address_dict['created_at'] = datetime.now().isoformat()
-        addresses.append(address_dict)
-        _save_data(ADDRESSES_FILE, addresses)
-        return Address(**address_dict)
+        with self.addresses.batch():
+            defaults = self._default_addresses()
+            address_dict = address.dict()
+            address_dict['created_at'] = datetime.now().isoformat()
+            created = self.addresses.insert(address_dict)
+            # Eine neue Standardadresse löst die bisherige ab
+            self._track_default_address(defaults, created)
+            return Address(**created)
     
     def update_address(self, address_id: int, address: Address) -> Optional[Address]:
         """Aktualisiert eine bestehende Adresse"""
-        addresses = _load_data(ADDRESSES_FILE)
-        
-        # Finde die Adresse
-        address_index = -1
-        customer_id = None
-        address_type = None
-        
-        for i, a in enumerate(addresses):
-            if a.get('id') == address_id:
-                address_index = i
-                customer_id = a.get('customer_id')
-                address_type = a.get('address_type')
-                break
-        
-        if address_index == -1:
-            return None
-        
-        # Aktualisiere die Adresse
-        address_dict = address.dict(exclude_unset=True)
-        address_dict['id'] = address_id
-        address_dict['updated_at'] = datetime.now().isoformat()
-        
-        # Prüfe, ob es eine Default-Adresse werden soll
-        if address_dict.get('is_default', False):
-            # Setze alle anderen Adressen des Kunden auf nicht-default
-            for i, a in enumerate(addresses):
-                if i != address_index and a.get('customer_id') == customer_id and a.get('address_type') == address_type:
-                    addresses[i]['is_default'] = False
-        
-        addresses[address_index].update(address_dict)
-        _save_data(ADDRESSES_FILE, addresses)
-        return Address(**addresses[address_index])
+        with self.addresses.batch():
+            defaults = self._default_addresses()
+            existing = self.addresses.get(address_id)
+            if existing is None:
+                return None
+            previous = dict(existing)
+            
+            # Aktualisiere die Adresse
+            address_dict = address.dict(exclude_unset=True)
+            address_dict['updated_at'] = datetime.now().isoformat()
+            updated = self.addresses.update(address_id, address_dict)
+            self._track_default_address(defaults, updated, previous)
+            return Address(**updated)
     
     def delete_address(self, address_id: int) -> bool:
         """Löscht eine Adresse"""
-        addresses = _load_data(ADDRESSES_FILE)
-        for i, a in enumerate(addresses):
-            if a.get('id') == address_id:
-                del addresses[i]
-                _save_data(ADDRESSES_FILE, addresses)
-                return True
-        return False
+        with self.addresses.batch():
+            defaults = self._default_addresses()
+            existing = self.addresses.get(address_id)
+            if existing is None or not self.addresses.delete(address_id):
+                return False
+            self._track_default_address(defaults, {**existing, 'is_default': False}, existing)
+            return True
     
     # Rabattverwaltung
+    def _discount_index_snapshot(self) -> DiscountIndex:
+        """Gibt den Rabattindex zurück und übersetzt ihn neu, sobald ein anderer Prozess Rabatte geändert hat"""
+        # Unter der Store-Sperre, damit kein Neuaufbau eine gleichzeitige eigene Änderung verliert
+        with self.discounts.lock:
+            generation = self.discounts.generation()
+            index = self._discount_index
+            if index is None or generation != self._discount_generation:
+                index = DiscountIndex(self.discounts.all())
+                self._discount_index = index
+                self._discount_generation = generation
+            return index
+    
+    def _track_discount(self, record: Optional[Dict[str, Any]]) -> None:
+        """Führt eine eigene Änderung im Rabattindex nach, statt ihn neu zu übersetzen"""
+        index = self._discount_index
+        if record is not None and index is not None:
+            index.put(record)
+    
+    def _checkout_discount(self, code: Optional[str]) -> Optional[CompiledDiscount]:
+        """Prüft den Rabattcode eines Warenkorbs beim Bestellen, None ohne Code"""
+        if not code:
+            return None
+        discount = self._discount_index_snapshot().lookup(code)
+        if discount is None or not discount.is_valid_at(datetime.now().timestamp()):
+            raise ValueError(f"Rabattcode {code} ist nicht mehr gültig")
+        if discount.is_exhausted():
+            raise ValueError(f"Rabattcode {code} wurde bereits zu oft eingelöst")
+        return discount
+    
+    def _count_discount_use(self, discount_id: int, now: str) -> Dict[str, Any]:
+        """Zählt eine Einlösung; läuft innerhalb der Bestelltransaktion auf dem aktuellen Stand"""
+        record = self.discounts.get(discount_id)
+        if record is None:
+            raise ValueError("Rabatt nicht gefunden")
+        used_count = (record.get('used_count') or 0) + 1
+        usage_limit = record.get('usage_limit')
+        if usage_limit is not None and used_count > usage_limit:
+            raise ValueError(f"Rabattcode {record['code']} wurde bereits zu oft eingelöst")
+        return self.discounts.update(discount_id, {'used_count': used_count, 'updated_at': now})
+    
     def get_discounts(self, active_only: bool = True) -> List[Discount]:
         """Gibt eine Liste von Rabatten zurück"""
-        discounts = _load_data(DISCOUNTS_FILE)
-        
-        # Filtern
         if active_only:
-            now = datetime.now()
-            discounts = [
-                d for d in discounts 
-                if d.get('active', True) and 
-                datetime.fromisoformat(d.get('valid_from')) <= now and
-                (d.get('valid_to') is None or datetime.fromisoformat(d.get('valid_to')) >= now)
-            ]
-            
-        return [Discount(**d) for d in discounts]
+            return [Discount(**d.record) for d in self._discount_index_snapshot().valid_at()]
+        return [Discount(**d) for d in self.discounts.all()]
     
     def get_discount(self, discount_id: int) -> Optional[Discount]:
         """Gibt einen einzelnen Rabatt nach ID zurück"""
-        discounts = _load_data(DISCOUNTS_FILE)
-        for discount in discounts:
-            if discount.get('id') == discount_id:
-                return Discount(**discount)
-        return None
+        discount = self.discounts.get(discount_id)
+        if discount is None:
+            return None
+        return Discount(**discount)
     
     def get_discount_by_code(self, code: str) -> Optional[Discount]:
-        """Gibt einen Rabatt nach Code zurück"""
-        discounts = _load_data(DISCOUNTS_FILE)
-        for discount in discounts:
-            if discount.get('code').lower() == code.lower():
-                return Discount(**discount)
-        return None
+        """Gibt einen Rabatt nach Code zurück (Groß-/Kleinschreibung egal)"""
+        discount = self._discount_index_snapshot().lookup(code)
+        if discount is None:
+            return None
+        return Discount(**discount.record)
     
     def create_discount(self, discount: Discount) -> Discount:
         """Erstellt einen neuen Rabatt"""
-        discounts = _load_data(DISCOUNTS_FILE)
         discount_dict = discount.dict()
-        discount_dict['id'] = _get_next_id(discounts)
         discount_dict['created_at'] = datetime.now().isoformat()
-        discounts.append(discount_dict)
-        _save_data(DISCOUNTS_FILE, discounts)
-        return Discount(**discount_dict)
+        created = self.discounts.insert(discount_dict)
+        self._track_discount(created)
+        return Discount(**created)
     
     def update_discount(self, discount_id: int, discount: Discount) -> Optional[Discount]:
         """Aktualisiert einen bestehenden Rabatt"""
-        discounts = _load_data(DISCOUNTS_FILE)
-        for i, d in enumerate(discounts):
-            if d.get('id') == discount_id:
-                discount_dict = discount.dict(exclude_unset=True)
-                discount_dict['id'] = discount_id
-                discount_dict['updated_at'] = datetime.now().isoformat()
-                discounts[i].update(discount_dict)
-                _save_data(DISCOUNTS_FILE, discounts)
-                return Discount(**discounts[i])
-        return None
+        discount_dict = discount.dict(exclude_unset=True)
+        discount_dict['updated_at'] = datetime.now().isoformat()
+        updated = self.discounts.update(discount_id, discount_dict)
+        self._track_discount(updated)
+        if updated is None:
+            return None
+        return Discount(**updated)
     
     def delete_discount(self, discount_id: int) -> bool:
         """Löscht einen Rabatt (oder deaktiviert ihn)"""
-        discounts = _load_data(DISCOUNTS_FILE)
-        for i, d in enumerate(discounts):
-            if d.get('id') == discount_id:
-                # Statt zu löschen, deaktivieren
-                discounts[i]['active'] = False
-                discounts[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(DISCOUNTS_FILE, discounts)
-                return True
-        return False
+        # Statt zu löschen, deaktivieren
+        updated = self.discounts.update(discount_id, {
+            'active': False,
+            'updated_at': datetime.now().isoformat()
+        })
+        self._track_discount(updated)
+        return updated is not None
     
     def apply_discount_to_cart(self, session_id: str, discount_code: str) -> ShoppingCart:
-        """Wendet einen Rabattcode auf einen Warenkorb an"""
-        # Hier würde die Implementierung folgen, abhängig von der Integration
-        # mit dem Warenkorb-System
-        pass
+        """
+        Wendet einen Rabattcode auf einen Warenkorb an
+        
+        Der Code bleibt am Warenkorb, der Rabattbetrag wird bei jeder Änderung
+        der Positionen neu berechnet und beim Bestellen erneut geprüft.
+        
+        Raises:
+            ValueError: Wenn der Code unbekannt, abgelaufen, ausgeschöpft ist
+                oder der Mindestbestellwert nicht erreicht wird
+        """
+        discount = self._discount_index_snapshot().lookup(discount_code)
+        if discount is None:
+            raise ValueError(f"Rabattcode {discount_code} nicht gefunden")
+        if not discount.is_valid_at(datetime.now().timestamp()):
+            raise ValueError(f"Rabattcode {discount_code} ist nicht gültig")
+        if discount.is_exhausted():
+            raise ValueError(f"Rabattcode {discount_code} wurde bereits zu oft eingelöst")
+        
+        with self.carts.shard_for(session_id).batch():
+            cart = self.get_cart(session_id)
+            subtotal = sum(item.price * item.quantity for item in cart.items)
+            if discount.minimum_order_value is not None and subtotal < discount.minimum_order_value:
+                raise ValueError(
+                    f"Mindestbestellwert von {discount.minimum_order_value:.2f} nicht erreicht"
+                )
+            cart.discount_code = discount.code
+            self._save_cart_items(cart)
+            return cart
+    
+    def remove_discount_from_cart(self, session_id: str) -> ShoppingCart:
+        """Entfernt den Rabattcode aus einem Warenkorb"""
+        with self.carts.shard_for(session_id).batch():
+            cart = self.get_cart(session_id)
+            cart.discount_code = None
+            self._save_cart_items(cart)
+            return cart
     
     # Bewertungen
     def get_product_reviews(self, product_id: int, skip: int = 0, limit: int = 100,
                           approved_only: bool = True) -> List[Review]:
         """Gibt die Bewertungen für ein Produkt zurück"""
-        reviews = _load_data(REVIEWS_FILE)
-        
         # Filtern
-        product_reviews = [r for r in reviews if r.get('product_id') == product_id]
+        product_reviews = self.reviews.find('product_id', product_id)
         if approved_only:
             product_reviews = [r for r in product_reviews if r.get('is_approved', False)]
             
@@ -588,33 +1227,137 @@ class ECommerceService:
         paginated = product_reviews[skip:skip + limit]
         return [Review(**r) for r in paginated]
     
+    def get_product_reviews_page(self, product_id: int, limit: int = 100, cursor: Optional[str] = None,
+                                 approved_only: bool = True) -> Tuple[List[Review], Optional[str]]:
+        """Gibt eine Seite der Bewertungen eines Produkts und den Folge-Cursor zurück"""
+        records, next_cursor = self._reviews_page_records(product_id, limit, cursor, approved_only)
+        return [Review(**r) for r in records], next_cursor
+    
+    def get_product_reviews_page_json(self, product_id: int, limit: int = 100, cursor: Optional[str] = None,
+                                      approved_only: bool = True) -> Tuple[bytes, Optional[str]]:
+        """Wie get_product_reviews_page, liefert die Seite aber ohne Modellvalidierung als JSON-Bytes"""
+        records, next_cursor = self._reviews_page_records(product_id, limit, cursor, approved_only)
+        return dumps(projector(Review).project_all(records)), next_cursor
+    
+    def _reviews_page_records(self, product_id: int, limit: int, cursor: Optional[str],
+                              approved_only: bool) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        predicate = (lambda r: r.get('is_approved', False)) if approved_only else None
+        records = self.reviews.page(decode_cursor(cursor), limit + 1, 'product_id', product_id, predicate)
+        return _next_page(records, limit)
+    
+    def _ensure_review_stats(self) -> None:
+        """Baut die Bewertungssummen einmalig auf, falls Bewertungen aus der Zeit davor existieren"""
+        if self._review_stats_checked:
+            return
+        with transaction(self.reviews, self.review_stats):
+            if not self.review_stats.all() and self.reviews.all():
+                self.rebuild_review_stats()
+        self._review_stats_checked = True
+    
+    def rebuild_review_stats(self) -> None:
+        """Berechnet alle Bewertungssummen aus den Bewertungen neu"""
+        with transaction(self.reviews, self.review_stats):
+            for stats in self.review_stats.all():
+                self.review_stats.delete(stats['id'])
+            for review in self.reviews.all():
+                self._count_review(review, 1)
+    
+    def _count_review(self, review: Dict[str, Any], delta: int, approved_only: bool = False) -> None:
+        """Schreibt die Summen eines Produkts um eine Bewertung fort (delta +1 oder -1)"""
+        matches = self.review_stats.find('product_id', review['product_id'])
+        stats = dict(matches[0]) if matches else {
+            'product_id': review['product_id'],
+            'review_count': 0, 'rating_sum': 0, 'histogram': [0] * 5,
+            'approved_count': 0, 'approved_rating_sum': 0, 'approved_histogram': [0] * 5,
+        }
+        rating = review.get('rating') or 0
+        # Werte außerhalb von 1-5 zählen im Durchschnitt, im Histogramm am Rand
+        bucket = min(max(rating, 1), 5) - 1
+        prefixes = ('approved_',) if approved_only else ('',)
+        if not approved_only and review.get('is_approved', False):
+            prefixes += ('approved_',)
+        for prefix in prefixes:
+            stats[f'{prefix}count' if prefix else 'review_count'] += delta
+            stats[f'{prefix}rating_sum'] += delta * rating
+            histogram = list(stats[f'{prefix}histogram'])
+            histogram[bucket] += delta
+            stats[f'{prefix}histogram'] = histogram
+        if matches:
+            self.review_stats.update(stats['id'], stats)
+        else:
+            self.review_stats.insert(stats)
+    
+    @staticmethod
+    def _review_summary(product_id: int, stats: Optional[Dict[str, Any]]) -> ReviewSummary:
+        empty = {stars: 0 for stars in range(1, 6)}
+        if stats is None:
+            return ReviewSummary(product_id=product_id, rating_histogram=empty, approved_histogram=dict(empty))
+        
+        def average(count: int, total: int) -> Optional[float]:
+            return round(total / count, 2) if count else None
+        
+        return ReviewSummary(
+            product_id=product_id,
+            review_count=stats['review_count'],
+            average_rating=average(stats['review_count'], stats['rating_sum']),
+            rating_histogram={stars: n for stars, n in enumerate(stats['histogram'], 1)},
+            approved_count=stats['approved_count'],
+            approved_average_rating=average(stats['approved_count'], stats['approved_rating_sum']),
+            approved_histogram={stars: n for stars, n in enumerate(stats['approved_histogram'], 1)},
+        )
+    
+    def get_review_summaries(self, product_ids: Iterable[int]) -> List[ReviewSummary]:
+        """
+        Gibt die Bewertungszusammenfassungen mehrerer Produkte zurück
+        
+        Die Summen werden bei jeder Bewertungsänderung fortgeschrieben, hier
+        wird also nur je Produkt ein Indexeintrag gelesen.
+        
+        Args:
+            product_ids: Produkt-IDs, Reihenfolge bleibt erhalten
+            
+        Returns:
+            Eine Zusammenfassung je Produkt, auch für Produkte ohne Bewertungen
+        """
+        self._ensure_review_stats()
+        summaries = []
+        for product_id in dict.fromkeys(product_ids):
+            matches = self.review_stats.find('product_id', product_id)
+            summaries.append(self._review_summary(product_id, matches[0] if matches else None))
+        return summaries
+    
     def create_review(self, review: Review) -> Review:
         """Erstellt eine neue Produktbewertung"""
-        reviews = _load_data(REVIEWS_FILE)
         review_dict = review.dict()
-        review_dict['id'] = _get_next_id(reviews)
         review_dict['created_at'] = datetime.now().isoformat()
-        reviews.append(review_dict)
-        _save_data(REVIEWS_FILE, reviews)
-        return Review(**review_dict)
+        self._ensure_review_stats()
+        with transaction(self.reviews, self.review_stats):
+            created = self.reviews.insert(review_dict)
+            self._count_review(created, 1)
+        return Review(**created)
     
     def approve_review(self, review_id: int) -> Optional[Review]:
         """Genehmigt eine Bewertung"""
-        reviews = _load_data(REVIEWS_FILE)
-        for i, r in enumerate(reviews):
-            if r.get('id') == review_id:
-                reviews[i]['is_approved'] = True
-                reviews[i]['updated_at'] = datetime.now().isoformat()
-                _save_data(REVIEWS_FILE, reviews)
-                return Review(**reviews[i])
-        return None
+        self._ensure_review_stats()
+        with transaction(self.reviews, self.review_stats):
+            review = self.reviews.get(review_id)
+            if review is None:
+                return None
+            was_approved = review.get('is_approved', False)
+            updated = self.reviews.update(review_id, {
+                'is_approved': True,
+                'updated_at': datetime.now().isoformat()
+            })
+            if not was_approved:
+                self._count_review(updated, 1, approved_only=True)
+        return Review(**updated)
     
     def delete_review(self, review_id: int) -> bool:
         """Löscht eine Bewertung"""
-        reviews = _load_data(REVIEWS_FILE)
-        for i, r in enumerate(reviews):
-            if r.get('id') == review_id:
-                del reviews[i]
-                _save_data(REVIEWS_FILE, reviews)
-                return True
-        return False 
\ No newline at end of file
+        self._ensure_review_stats()
+        with transaction(self.reviews, self.review_stats):
+            review = self.reviews.get(review_id)
+            if review is None:
+                return False
+            self._count_review(review, -1)
+            return self.reviews.delete(review_id)
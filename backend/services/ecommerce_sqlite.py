@@ -0,0 +1,257 @@
+"""
+SQLite-Speicher-Backend für den E-Commerce-Service
+Bietet dieselbe Store-Schnittstelle wie die JSON-Stores, aber mit Transaktionen und Indizes
+"""
+
+import json
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.ecommerce_storage import _to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteDatabase:
+    """
+    Gemeinsame SQLite-Verbindung für alle E-Commerce-Stores
+
+    Die Datenbank läuft im WAL-Modus, Leser blockieren also keine Schreiber.
+    Schreibende Transaktionen beginnen mit ``BEGIN IMMEDIATE`` und sind damit
+    auch zwischen mehreren Worker-Prozessen serialisiert.
+    """
+
+    def __init__(self, db_path: str, timeout: float = 30.0):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Öffnet eine (verschachtelbare) Schreibtransaktion"""
+        with self.lock:
+            if not self._depth:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self.connection
+            except BaseException:
+                self._depth -= 1
+                if not self._depth:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if not self._depth:
+                self.connection.execute("COMMIT")
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> List[tuple]:
+        with self.lock:
+            return self.connection.execute(sql, tuple(params)).fetchall()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class SqliteStore:
+    """
+    Datensatz-Speicher für eine Entität in einer SQLite-Tabelle
+
+    Jeder Datensatz liegt als JSON in der Spalte ``data``; die Felder aus
+    ``indexes`` werden zusätzlich als indizierte Spalten geführt, damit
+    ``find`` sie über den Index beantworten kann.
+    """
+
+    def __init__(self, database: SqliteDatabase, name: str, indexes: Tuple[str, ...] = ()):
+        self.database = database
+        self.name = name
+        self.indexed_fields = tuple(indexes)
+        # Für transaction(): alle Stores einer Datenbank teilen sich Sperre und Pfad
+        self.file_path = database.db_path
+        self.lock = database.lock
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = "".join(f', "{field}"' for field in self.indexed_fields)
+        with self.database.transaction() as connection:
+            # AUTOINCREMENT: IDs gelöschter Datensätze werden nie neu vergeben, wie bei IdSequences
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.name}" '
+                f'(id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL{columns})'
+            )
+            self._upgrade_autoincrement(connection)
+            # Neu hinzugekommene Indexfelder an bestehende Tabellen anfügen und befüllen
+            existing = {row[1] for row in connection.execute(f'PRAGMA table_info("{self.name}")')}
+            for field in self.indexed_fields:
+                if field not in existing:
+                    connection.execute(f'ALTER TABLE "{self.name}" ADD COLUMN "{field}"')
+                    connection.execute(
+                        f'UPDATE "{self.name}" SET "{field}" = json_extract(data, ?)', (f'$.{field}',)
+                    )
+            for field in self.indexed_fields:
+                connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{self.name}_{field}" ON "{self.name}" ("{field}", id)'
+                )
+
+    def _upgrade_autoincrement(self, connection: sqlite3.Connection) -> None:
+        """Baut Tabellen älterer Versionen ohne AUTOINCREMENT einmalig um"""
+        sql = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (self.name,)
+        ).fetchone()[0]
+        if "AUTOINCREMENT" in sql.upper():
+            return
+        existing = [row[1] for row in connection.execute(f'PRAGMA table_info("{self.name}")')]
+        columns = "".join(f', "{column}"' for column in existing if column not in ("id", "data"))
+        column_list = ", ".join(f'"{column}"' for column in existing)
+        connection.execute(
+            f'CREATE TABLE "{self.name}_upgrade" '
+            f'(id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL{columns})'
+        )
+        connection.execute(
+            f'INSERT INTO "{self.name}_upgrade" ({column_list}) SELECT {column_list} FROM "{self.name}"'
+        )
+        # Indizes verschwinden mit der alten Tabelle und werden anschließend neu angelegt
+        connection.execute(f'DROP TABLE "{self.name}"')
+        connection.execute(f'ALTER TABLE "{self.name}_upgrade" RENAME TO "{self.name}"')
+        logger.info(f"Tabelle {self.name} auf AUTOINCREMENT umgestellt")
+
+    @staticmethod
+    def _decode(row: tuple) -> Dict[str, Any]:
+        record = json.loads(row[1])
+        record['id'] = row[0]
+        return record
+
+    def _write(self, connection: sqlite3.Connection, record: Dict[str, Any]) -> int:
+        data = {k: v for k, v in record.items() if k != 'id'}
+        columns = ["id", "data"] + [f'"{field}"' for field in self.indexed_fields]
+        values = [record.get('id'), json.dumps(data, ensure_ascii=False)]
+        values += [record.get(field) for field in self.indexed_fields]
+        cursor = connection.execute(
+            f'INSERT OR REPLACE INTO "{self.name}" ({", ".join(columns)}) '
+            f'VALUES ({", ".join("?" for _ in columns)})',
+            values
+        )
+        return cursor.lastrowid
+
+    def shard_for(self, key: Any) -> "SqliteStore":
+        """Die Tabelle ist nicht aufgeteilt, jede Session nutzt denselben Store"""
+        return self
+
+    def invalidate(self) -> None:
+        """Kein Cache vorhanden, nichts zu verwerfen"""
+
+    def generation(self) -> int:
+        """Ändert sich, sobald eine andere Verbindung in die Datenbank geschrieben hat"""
+        return self.database.query("PRAGMA data_version")[0][0]
+
+    @contextmanager
+    def batch(self) -> Iterator["SqliteStore"]:
+        """Fasst mehrere Änderungen in einer Datenbanktransaktion zusammen"""
+        with self.database.transaction():
+            yield self
+
+    def all(self) -> List[Dict[str, Any]]:
+        rows = self.database.query(f'SELECT id, data FROM "{self.name}" ORDER BY id')
+        return [self._decode(row) for row in rows]
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        rows = self.database.query(f'SELECT id, data FROM "{self.name}" WHERE id = ?', (record_id,))
+        return self._decode(rows[0]) if rows else None
+
+    def get_many(self, record_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        record_ids = list(record_ids)
+        records = {}
+        # SQLite begrenzt die Anzahl der Parameter pro Abfrage
+        for start in range(0, len(record_ids), 500):
+            chunk = record_ids[start:start + 500]
+            rows = self.database.query(
+                f'SELECT id, data FROM "{self.name}" WHERE id IN ({", ".join("?" for _ in chunk)})',
+                chunk
+            )
+            for row in rows:
+                records[row[0]] = self._decode(row)
+        return records
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        if field in self.indexed_fields:
+            rows = self.database.query(
+                f'SELECT id, data FROM "{self.name}" WHERE "{field}" IS ? ORDER BY id', (value,)
+            )
+            return [self._decode(row) for row in rows]
+        return [r for r in self.all() if r.get(field) == value]
+
+    def page(self, after_id: Optional[int], limit: int, field: Optional[str] = None, value: Any = None,
+             predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """Keyset-Paginierung über den Primärschlüssel, siehe JsonFileStore.page"""
+        scan_field = field
+        where = 'id > ?'
+        params: List[Any] = []
+        if field in self.indexed_fields:
+            where += f' AND "{field}" IS ?'
+            params.append(value)
+            scan_field = None
+        result = []
+        last_id = after_id if after_id is not None else -1
+        while len(result) < limit:
+            rows = self.database.query(
+                f'SELECT id, data FROM "{self.name}" WHERE {where} ORDER BY id LIMIT ?',
+                [last_id] + params + [limit]
+            )
+            for row in rows:
+                last_id = row[0]
+                record = self._decode(row)
+                if scan_field is not None and record.get(scan_field) != value:
+                    continue
+                if predicate is None or predicate(record):
+                    result.append(record)
+                    if len(result) >= limit:
+                        break
+            if len(rows) < limit:
+                break
+        return result
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        record = _to_jsonable(record)
+        record['id'] = None
+        with self.database.transaction() as connection:
+            record['id'] = self._write(connection, record)
+        return record
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self.database.transaction() as connection:
+            record = self.get(record_id)
+            if record is None:
+                return None
+            changes = _to_jsonable(changes)
+            changes.pop('id', None)
+            record.update(changes)
+            self._write(connection, record)
+        return record
+
+    def delete(self, record_id: int) -> bool:
+        with self.database.transaction() as connection:
+            cursor = connection.execute(f'DELETE FROM "{self.name}" WHERE id = ?', (record_id,))
+        return cursor.rowcount > 0
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Entfernt alle passenden Datensätze in einer Transaktion, gibt die Anzahl zurück"""
+        with self.database.transaction() as connection:
+            expired = [(record['id'],) for record in self.all() if predicate(record)]
+            connection.executemany(f'DELETE FROM "{self.name}" WHERE id = ?', expired)
+        return len(expired)
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Übernimmt Datensätze mit ihren vorhandenen IDs (Migration, Import)"""
+        count = 0
+        with self.database.transaction() as connection:
+            for record in records:
+                self._write(connection, _to_jsonable(record))
+                count += 1
+        return count
@@ -0,0 +1,779 @@
+"""
+Speicher-Backends für den E-Commerce-Service
+Hält die JSON-Dateien im Speicher und schreibt Änderungen direkt auf die Platte durch
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+import zlib
+import heapq
+from itertools import islice
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: keine prozessübergreifenden Sperren
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # optional, beschleunigt das Schreiben großer Dateien
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _to_jsonable(value: Any) -> Any:
+    """Wandelt Datumswerte (auch verschachtelt) in ISO-Strings um"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+def _read_json(file_path: str, default=None):
+    if default is None:
+        default = []
+    if not os.path.exists(file_path):
+        return default
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Fehler beim Laden der Daten aus {file_path}: {str(e)}")
+        return default
+
+
+def _encode_json(data) -> bytes:
+    """Kodiert einen Dateiinhalt eingerückt wie bisher, mit orjson deutlich schneller"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    # Gleiches Format ohne orjson, aber im reinen Python-Encoder (bei großen Dateien langsam)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _write_json(file_path: str, data) -> bool:
+    # Erst in eine temporäre Datei schreiben, damit Leser nie eine halbe Datei sehen
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(file_path), suffix='.tmp',
+                                        dir=os.path.dirname(file_path) or '.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_encode_json(data))
+        os.replace(tmp_path, file_path)
+        return True
+    except Exception as e:
+        logger.error(f"Fehler beim Speichern der Daten in {file_path}: {str(e)}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def _stat_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _sorted_add(ids: List[int], record_id: int) -> None:
+    # IDs kommen fast immer aufsteigend an, dann genügt ein append
+    if not ids or ids[-1] < record_id:
+        ids.append(record_id)
+    else:
+        position = bisect_left(ids, record_id)
+        if position == len(ids) or ids[position] != record_id:
+            ids.insert(position, record_id)
+
+
+def _sorted_remove(ids: List[int], record_id: int) -> None:
+    position = bisect_left(ids, record_id)
+    if position < len(ids) and ids[position] == record_id:
+        del ids[position]
+
+
+@contextmanager
+def _file_lock(lock_path: str) -> Iterator[None]:
+    """Exklusive Sperre über eine Lock-Datei, wirkt auch zwischen Worker-Prozessen"""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class IdSequences:
+    """
+    Persistente ID-Sequenzen für alle Stores eines Datenverzeichnisses
+
+    Jeder Prozess reserviert sich unter einer Dateisperre einen Block von
+    ``block_size`` IDs und vergibt diese danach ohne weiteren Dateizugriff.
+    Mehrere Worker erhalten so disjunkte IDs; nicht vergebene IDs eines
+    Blocks gehen beim Neustart verloren (Lücken sind unkritisch).
+    """
+
+    def __init__(self, file_path: str, block_size: int = 50):
+        self.file_path = file_path
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self._blocks: Dict[str, List[int]] = {}  # name -> [nächste ID, letzte ID]
+
+    def _reserve(self, name: str, floor: int) -> List[int]:
+        with _file_lock(f"{self.file_path}.lock"):
+            sequences = _read_json(self.file_path, default={})
+            start = max(sequences.get(name, 0), floor) + 1
+            sequences[name] = start + self.block_size - 1
+            if not _write_json(self.file_path, sequences):
+                raise IOError(f"ID-Sequenz {name} konnte nicht gespeichert werden")
+        return [start, sequences[name]]
+
+    def next_id(self, name: str, floor: int = 0) -> int:
+        """Gibt die nächste freie ID zurück, ``floor`` ist die höchste bereits bekannte ID"""
+        with self.lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] > block[1]:
+                block = self._blocks[name] = self._reserve(name, floor)
+            next_id = block[0]
+            block[0] += 1
+            return next_id
+
+
+@contextmanager
+def transaction(*stores: "JsonFileStore") -> Iterator[None]:
+    """
+    Führt Änderungen an mehreren Stores gemeinsam aus
+
+    Jeder Store wird am Ende genau einmal geschrieben. Tritt vorher ein
+    Fehler auf, werden die Änderungen in allen Stores verworfen. Die Sperren
+    werden in fester Reihenfolge geholt, damit sich Transaktionen nicht
+    gegenseitig blockieren.
+    """
+    with ExitStack() as stack:
+        for store in sorted(set(stores), key=lambda store: store.file_path):
+            stack.enter_context(store.batch())
+        yield
+
+
+class JsonFileStore:
+    """
+    Datensatz-Speicher für eine JSON-Datei mit In-Memory-Cache
+
+    Die Datei wird beim ersten Zugriff einmal geladen, Lesezugriffe werden aus
+    dem Speicher bedient und jede Änderung wird sofort in die Datei
+    durchgeschrieben. Ändert sich die Datei von außen (mtime/Größe/Inode),
+    wird der Cache beim nächsten Zugriff verworfen und neu geladen.
+    Änderungen laufen unter einer Dateisperre (``<datei>.lock``) auf dem
+    frisch geladenen Stand, damit mehrere Worker keine Updates verlieren.
+
+    Neue IDs kommen aus ``sequences`` (falls angegeben), sonst aus der
+    höchsten bekannten ID. Neben dem Primärindex auf ``id`` pflegt der Store
+    für jedes Feld in ``indexes`` einen Sekundärindex (Wert -> aufsteigend
+    sortierte IDs), der bei jeder Änderung mitgeführt wird.
+
+    Zurückgegebene Datensätze sind die gecachten Objekte selbst und dürfen
+    vom Aufrufer nicht verändert werden.
+    """
+
+    def __init__(self, file_path: str, indexes: Tuple[str, ...] = (),
+                 sequences: Optional[IdSequences] = None):
+        self.file_path = file_path
+        self.lock_path = f"{file_path}.lock"
+        self.name = os.path.splitext(os.path.basename(file_path))[0]
+        self.indexed_fields = tuple(indexes)
+        self.sequences = sequences
+        self.lock = threading.RLock()
+        self._records: Optional[Dict[int, Dict[str, Any]]] = None
+        # Feld -> Wert -> aufsteigend sortierte IDs
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {}
+        self._sorted_ids: List[int] = []
+        self._max_id = 0
+        self._signature = None
+        # Zählt Übernahmen von außen geänderter Daten (Neuladen, Journal-Nachzug)
+        self._generation = 0
+        self._batch_depth = 0
+        self._dirty = False
+
+    # Pflege von Primär- und Sekundärindizes
+    def _reset(self, records: List[Dict[str, Any]]) -> None:
+        self._generation += 1
+        self._records = {record['id']: record for record in records}
+        self._sorted_ids = sorted(self._records)
+        self._max_id = self._sorted_ids[-1] if self._sorted_ids else 0
+        self._indexes = {field: {} for field in self.indexed_fields}
+        for record_id in self._sorted_ids:
+            record = self._records[record_id]
+            for field, index in self._indexes.items():
+                index.setdefault(record.get(field), []).append(record_id)
+
+    def _index_add(self, record: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            _sorted_add(index.setdefault(record.get(field), []), record['id'])
+
+    def _index_remove(self, record: Dict[str, Any]) -> None:
+        for field, index in self._indexes.items():
+            bucket = index.get(record.get(field))
+            if bucket is not None:
+                _sorted_remove(bucket, record['id'])
+                if not bucket:
+                    del index[record.get(field)]
+
+    def _put(self, record: Dict[str, Any]) -> None:
+        existing = self._records.get(record['id'])
+        if existing is not None:
+            self._index_remove(existing)
+        else:
+            _sorted_add(self._sorted_ids, record['id'])
+        self._records[record['id']] = record
+        self._index_add(record)
+        if record['id'] > self._max_id:
+            self._max_id = record['id']
+
+    def _patch(self, record: Dict[str, Any], changes: Dict[str, Any]) -> None:
+        reindex = any(field in changes for field in self._indexes)
+        if reindex:
+            self._index_remove(record)
+        record.update(changes)
+        if reindex:
+            self._index_add(record)
+
+    def _drop(self, record_id: int) -> Optional[Dict[str, Any]]:
+        record = self._records.pop(record_id, None)
+        if record is not None:
+            self._index_remove(record)
+            _sorted_remove(self._sorted_ids, record_id)
+        return record
+
+    def _next_id(self) -> int:
+        if self.sequences is not None:
+            return self.sequences.next_id(self.name, self._max_id)
+        return self._max_id + 1
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        """Spielt einen Änderungseintrag ein (idempotent)"""
+        op = change.get('op')
+        if op == 'insert':
+            self._put(change['record'])
+        elif op == 'update':
+            record = self._records.get(change['id'])
+            if record is not None:
+                self._patch(record, change['changes'])
+        elif op == 'delete':
+            self._drop(change['id'])
+        else:
+            logger.warning(f"Unbekannter Änderungseintrag: {change}")
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        if self._records is not None and self._dirty:
+            # Ungeschriebene Änderungen eines laufenden Batches nicht überschreiben
+            return self._records
+        signature = _stat_signature(self.file_path)
+        if self._records is None or signature != self._signature:
+            self._reset(_read_json(self.file_path))
+            self._signature = signature
+        return self._records
+
+    def _persist(self) -> bool:
+        self._dirty = False
+        if _write_json(self.file_path, list(self._records.values())):
+            self._signature = _stat_signature(self.file_path)
+            return True
+        # Speicher und Datei sind nicht mehr konsistent: beim nächsten Zugriff neu laden
+        self._records = None
+        return False
+
+    def _changed(self, change: Dict[str, Any]) -> None:
+        self._dirty = True
+
+    def invalidate(self) -> None:
+        """Verwirft den Cache, der nächste Zugriff lädt die Datei neu"""
+        with self.lock:
+            self._records = None
+            self._dirty = False
+
+    def generation(self) -> int:
+        """
+        Gibt einen Zähler zurück, der sich ändert, sobald Daten von außen übernommen werden
+
+        Eigene Änderungen über diesen Store verändern den Zähler nicht. Abgeleitete
+        Strukturen (z.B. der Suchindex) können eigene Änderungen daher direkt
+        nachführen und müssen sich nur bei einem neuen Zählerstand neu aufbauen.
+        """
+        with self.lock:
+            self._load()
+            return self._generation
+
+    @contextmanager
+    def batch(self) -> Iterator["JsonFileStore"]:
+        """
+        Fasst mehrere Änderungen zu einem einzigen Schreibvorgang zusammen
+
+        Der äußerste Batch hält die Dateisperre des Stores; Lesezugriffe im
+        Batch sehen daher den aktuellen Stand aller Prozesse.
+        """
+        with self.lock, ExitStack() as stack:
+            if not self._batch_depth:
+                stack.enter_context(_file_lock(self.lock_path))
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    # Halbfertige Änderungen verwerfen
+                    self.invalidate()
+                raise
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self._persist()
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Gibt alle Datensätze aufsteigend nach ID zurück"""
+        with self.lock:
+            records = self._load()
+            return [records[record_id] for record_id in self._sorted_ids]
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """Gibt einen Datensatz nach ID zurück"""
+        with self.lock:
+            return self._load().get(record_id)
+
+    def get_many(self, record_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Gibt die vorhandenen Datensätze zu mehreren IDs in einem Zugriff zurück"""
+        with self.lock:
+            records = self._load()
+            return {record_id: records[record_id] for record_id in record_ids if record_id in records}
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Gibt alle Datensätze zurück, deren Feld den angegebenen Wert hat"""
+        with self.lock:
+            records = self._load()
+            if field in self._indexes:
+                return [records[record_id] for record_id in self._indexes[field].get(value, ())]
+            return [records[record_id] for record_id in self._sorted_ids
+                    if records[record_id].get(field) == value]
+
+    def page(self, after_id: Optional[int], limit: int, field: Optional[str] = None, value: Any = None,
+             predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        """
+        Gibt bis zu ``limit`` Datensätze mit ID größer ``after_id`` zurück (Keyset-Paginierung)
+
+        Mit ``field``/``value`` wird nur der passende Indexeintrag durchlaufen,
+        ``predicate`` filtert zusätzlich. Der Aufwand hängt von ``limit`` und
+        den übersprungenen Datensätzen ab, nicht von der Seitenzahl.
+        """
+        with self.lock:
+            records = self._load()
+            ids = self._sorted_ids
+            scan_field = field
+            if field in self._indexes:
+                ids = self._indexes[field].get(value, [])
+                scan_field = None
+            start = bisect_right(ids, after_id) if after_id is not None else 0
+            result = []
+            for position in range(start, len(ids)):
+                if len(result) >= limit:
+                    break
+                record = records[ids[position]]
+                if scan_field is not None and record.get(scan_field) != value:
+                    continue
+                if predicate is None or predicate(record):
+                    result.append(record)
+            return result
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Fügt einen Datensatz mit neuer ID hinzu"""
+        with self.batch():
+            self._load()
+            record = _to_jsonable(record)
+            record['id'] = self._next_id()
+            self._put(record)
+            self._changed({'op': 'insert', 'record': record})
+            return record
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Aktualisiert einen Datensatz, gibt None zurück, falls er nicht existiert"""
+        with self.batch():
+            record = self._load().get(record_id)
+            if record is None:
+                return None
+            changes = _to_jsonable(changes)
+            changes.pop('id', None)
+            self._patch(record, changes)
+            self._changed({'op': 'update', 'id': record_id, 'changes': changes})
+            return record
+
+    def delete(self, record_id: int) -> bool:
+        """Entfernt einen Datensatz"""
+        with self.batch():
+            self._load()
+            if self._drop(record_id) is None:
+                return False
+            self._changed({'op': 'delete', 'id': record_id})
+            return True
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Entfernt alle passenden Datensätze mit einem Schreibvorgang, gibt die Anzahl zurück"""
+        with self.batch():
+            records = self._load()
+            expired = [record_id for record_id in self._sorted_ids if predicate(records[record_id])]
+            for record_id in expired:
+                self._drop(record_id)
+                self._changed({'op': 'delete', 'id': record_id})
+            return len(expired)
+
+    def import_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Übernimmt Datensätze mit ihren vorhandenen IDs (Migration, Import)"""
+        count = 0
+        with self.batch():
+            self._load()
+            for record in records:
+                record = _to_jsonable(record)
+                self._put(record)
+                self._changed({'op': 'insert', 'record': record})
+                count += 1
+        return count
+
+
+class JournalStore(JsonFileStore):
+    """
+    Datensatz-Speicher mit Append-Only-Journal
+
+    Änderungen werden als kompakte NDJSON-Zeilen an ``<datei>.journal``
+    angehängt, statt die ganze Datei neu zu schreiben. Die JSON-Datei dient als
+    Snapshot: Beim Laden wird sie gelesen und das Journal darauf eingespielt.
+    Sobald das Journal ``compact_threshold`` Einträge erreicht, schreibt ein
+    Hintergrund-Thread unter der Dateisperre einen neuen Snapshot und löscht
+    das Journal. Das Einspielen ist idempotent, ein Absturz zwischen beiden
+    Schritten verliert daher keine Änderungen.
+    """
+
+    def __init__(self, file_path: str, indexes: Tuple[str, ...] = (),
+                 sequences: Optional[IdSequences] = None, compact_threshold: int = 1000):
+        super().__init__(file_path, indexes, sequences)
+        self.journal_path = f"{file_path}.journal"
+        self.compact_threshold = compact_threshold
+        self._pending: List[str] = []
+        self._journal_signature = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._compacting = False
+        self._compact_requested = False
+
+    def _replay(self, path: str, offset: int = 0) -> int:
+        """Spielt vollständige Journal-Zeilen ab ``offset`` ein und gibt das neue Offset zurück"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return offset
+        # Eine unvollständige letzte Zeile (laufender Schreibvorgang) wird später gelesen
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply_change(json.loads(line))
+            except Exception as e:
+                logger.error(f"Ungültiger Journal-Eintrag in {path}: {str(e)}")
+                continue
+            self._journal_entries += 1
+        return offset + end
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        if self._records is not None and self._dirty:
+            return self._records
+        signature = _stat_signature(self.file_path)
+        journal_signature = _stat_signature(self.journal_path)
+        if self._records is not None and signature == self._signature:
+            if journal_signature == self._journal_signature:
+                return self._records
+            if (journal_signature and self._journal_signature
+                    and journal_signature[2] == self._journal_signature[2]
+                    and journal_signature[1] >= self._journal_offset):
+                # Ein anderer Prozess hat nur angehängt: nur den neuen Teil einspielen
+                self._journal_offset = self._replay(self.journal_path, self._journal_offset)
+                self._journal_signature = journal_signature
+                self._generation += 1
+                return self._records
+
+        self._reset(_read_json(self.file_path))
+        self._signature = signature
+        self._journal_entries = 0
+        self._journal_offset = self._replay(self.journal_path)
+        self._journal_signature = journal_signature
+        return self._records
+
+    def _changed(self, change: Dict[str, Any]) -> None:
+        self._pending.append(json.dumps(change, ensure_ascii=False, separators=(',', ':')))
+        super()._changed(change)
+
+    def _persist(self) -> bool:
+        self._dirty = False
+        lines, self._pending = self._pending, []
+        if not lines:
+            return True
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                offset = f.tell()
+        except Exception as e:
+            logger.error(f"Fehler beim Schreiben des Journals {self.journal_path}: {str(e)}")
+            self._records = None
+            return False
+        self._journal_offset = offset
+        self._journal_signature = _stat_signature(self.journal_path)
+        self._journal_entries += len(lines)
+        if ((self._journal_entries >= self.compact_threshold or self._compact_requested)
+                and not self._compacting):
+            self._compacting = True
+            self._compact_requested = False
+            threading.Thread(target=self.compact, name=f"compact-{os.path.basename(self.file_path)}",
+                             daemon=True).start()
+        return True
+
+    def invalidate(self) -> None:
+        with self.lock:
+            super().invalidate()
+            self._pending = []
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Wie JsonFileStore.delete_where, kompaktiert danach, damit das Journal nicht wächst"""
+        deleted = super().delete_where(predicate)
+        if deleted:
+            self.compact()
+        return deleted
+
+    def compact(self) -> bool:
+        """
+        Schreibt einen neuen Snapshot und leert das Journal
+
+        Innerhalb eines Batches hält der Thread die Dateisperre bereits; eine
+        zweite Sperre auf einem neuen Deskriptor würde ihn selbst blockieren.
+        Die Kompaktierung läuft dann nach dem Batch im Hintergrund.
+        """
+        with self.lock:
+            if self._batch_depth:
+                self._compact_requested = True
+                return False
+        try:
+            with self.lock, _file_lock(self.lock_path):
+                records = list(self._load().values())
+                if not _write_json(self.file_path, records):
+                    return False
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                self._signature = _stat_signature(self.file_path)
+                self._journal_signature = None
+                self._journal_offset = 0
+                self._journal_entries = 0
+            return True
+        except Exception as e:
+            logger.error(f"Fehler bei der Kompaktierung von {self.file_path}: {str(e)}")
+            return False
+        finally:
+            self._compacting = False
+
+
+def _legacy_exists(legacy_path: str) -> bool:
+    """Prüft, ob eine Altdatei zu migrieren ist; im Journal-Modus kann es nur das Journal geben"""
+    return os.path.exists(legacy_path) or os.path.exists(f"{legacy_path}.journal")
+
+
+class _StridedSequences:
+    """
+    Vergibt IDs einer Shard so, dass ``id % num_shards`` die Shard-Nummer ergibt
+
+    ``floor`` liefert die höchste ID, die in irgendeiner Shard außerhalb des
+    Schemas liegen kann (migrierte Altdaten); neue IDs liegen stets darüber.
+    """
+
+    def __init__(self, sequences: Optional[IdSequences], num_shards: int, shard: int,
+                 floor: Callable[[], int]):
+        self.sequences = sequences
+        self.num_shards = num_shards
+        self.shard = shard
+        self.floor = floor
+
+    def next_id(self, name: str, floor: int = 0) -> int:
+        local_floor = max(floor, self.floor()) // self.num_shards
+        if self.sequences is not None:
+            local_id = self.sequences.next_id(name, local_floor)
+        else:
+            local_id = local_floor + 1
+        return local_id * self.num_shards + self.shard
+
+
+class ShardedStore:
+    """
+    Auf mehrere Dateien verteilter Datensatz-Speicher
+
+    Datensätze werden über einen Hash von ``shard_key`` (z.B. der Session-ID)
+    auf ``num_shards`` Dateien verteilt. Jede Shard ist ein eigener Store mit
+    eigener Sperre, gleichzeitige Änderungen an verschiedenen Shards blockieren
+    sich also nicht. IDs werden so vergeben, dass ``id % num_shards`` auf die
+    Shard zeigt. Eine vorhandene, nicht geteilte Datei (``legacy_path``) wird
+    beim ersten Start auf die Shards verteilt; ihre IDs bleiben erhalten, neue
+    IDs werden in allen Shards oberhalb der höchsten übernommenen ID vergeben.
+    """
+
+    def __init__(self, directory: str, shard_key: str, num_shards: int = 16,
+                 store_class=JsonFileStore, indexes: Tuple[str, ...] = (),
+                 sequences: Optional[IdSequences] = None, legacy_path: Optional[str] = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_key = shard_key
+        self.name = os.path.basename(directory)
+        self.meta_path = os.path.join(directory, "shards.json")
+        self.num_shards = self._read_shard_count(num_shards)
+        self._legacy_max_id = 0
+        self.shards = [
+            store_class(
+                os.path.join(directory, f"{self.name}_{shard:02d}.json"),
+                indexes=indexes,
+                sequences=_StridedSequences(sequences, self.num_shards, shard, lambda: self._legacy_max_id)
+            )
+            for shard in range(self.num_shards)
+        ]
+        if legacy_path:
+            if _legacy_exists(legacy_path):
+                self._migrate_legacy(legacy_path)
+            self._legacy_max_id = self._read_legacy_max_id(legacy_path)
+
+    def _read_shard_count(self, num_shards: int) -> int:
+        # Die Shard-Anzahl darf sich nach dem ersten Start nicht mehr ändern
+        meta_path = self.meta_path
+        with _file_lock(f"{meta_path}.lock"):
+            meta = _read_json(meta_path, default={})
+            if meta.get('num_shards') and meta['num_shards'] != num_shards:
+                logger.warning(
+                    f"{self.directory} ist in {meta['num_shards']} Shards aufgeteilt, "
+                    f"konfiguriert sind {num_shards}; verwende {meta['num_shards']}"
+                )
+                return meta['num_shards']
+            if not meta:
+                _write_json(meta_path, {'num_shards': num_shards, 'shard_key': self.shard_key})
+        return num_shards
+
+    def _migrate_legacy(self, legacy_path: str) -> None:
+        with _file_lock(f"{legacy_path}.lock"):
+            if not _legacy_exists(legacy_path):
+                return
+            # Als Journal-Store gelesen, damit ein nicht kompaktiertes Journal mitkommt
+            legacy = JournalStore(legacy_path)
+            by_shard: Dict[int, List[Dict[str, Any]]] = {}
+            for record in legacy.all():
+                by_shard.setdefault(self._shard_index(record.get(self.shard_key)), []).append(record)
+            for shard, records in by_shard.items():
+                self.shards[shard].import_records(records)
+            # Vor dem Umbenennen festhalten, damit jeder Prozess die Untergrenze kennt
+            self._write_legacy_max_id(max((r['id'] for rs in by_shard.values() for r in rs), default=0))
+            for path in (legacy_path, legacy.journal_path):
+                if os.path.exists(path):
+                    os.replace(path, f"{path}.migrated")
+            logger.info(f"{legacy_path} wurde auf {self.num_shards} Shards verteilt")
+
+    def _write_legacy_max_id(self, legacy_max_id: int) -> None:
+        with _file_lock(f"{self.meta_path}.lock"):
+            meta = _read_json(self.meta_path, default={})
+            meta['legacy_max_id'] = legacy_max_id
+            if not _write_json(self.meta_path, meta):
+                raise IOError(f"{self.meta_path} konnte nicht gespeichert werden")
+
+    def _read_legacy_max_id(self, legacy_path: str) -> int:
+        """Gibt die höchste aus der Altdatei übernommene ID zurück (0 ohne Migration)"""
+        meta = _read_json(self.meta_path, default={})
+        if 'legacy_max_id' in meta:
+            return meta['legacy_max_id']
+        # Vor Einführung des Eintrags migriert: aus der umbenannten Altdatei bestimmen
+        migrated_path = f"{legacy_path}.migrated"
+        if not os.path.exists(migrated_path):
+            return 0
+        legacy_max_id = max((record['id'] for record in _read_json(migrated_path)), default=0)
+        self._write_legacy_max_id(legacy_max_id)
+        return legacy_max_id
+
+    def _shard_index(self, key: Any) -> int:
+        return zlib.crc32(str(key).encode('utf-8')) % self.num_shards
+
+    def shard_for(self, key: Any) -> JsonFileStore:
+        """Gibt den Store der Shard zurück, die für ``key`` zuständig ist"""
+        return self.shards[self._shard_index(key)]
+
+    def _shard_for_id(self, record_id: int) -> Optional[JsonFileStore]:
+        shard = self.shards[record_id % self.num_shards]
+        if shard.get(record_id) is not None:
+            return shard
+        # Aus einer Migration übernommene IDs folgen nicht dem Modulo-Schema
+        for shard in self.shards:
+            if shard.get(record_id) is not None:
+                return shard
+        return None
+
+    def invalidate(self) -> None:
+        for shard in self.shards:
+            shard.invalidate()
+
+    def generation(self) -> int:
+        return sum(shard.generation() for shard in self.shards)
+
+    def all(self) -> List[Dict[str, Any]]:
+        records = []
+        for shard in self.shards:
+            records.extend(shard.all())
+        return records
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        shard = self._shard_for_id(record_id)
+        return shard.get(record_id) if shard else None
+
+    def get_many(self, record_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        records = {}
+        for record_id in record_ids:
+            record = self.get(record_id)
+            if record is not None:
+                records[record_id] = record
+        return records
+
+    def page(self, after_id: Optional[int], limit: int, field: Optional[str] = None, value: Any = None,
+             predicate: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Dict[str, Any]]:
+        if field == self.shard_key:
+            return self.shard_for(value).page(after_id, limit, field, value, predicate)
+        pages = [shard.page(after_id, limit, field, value, predicate) for shard in self.shards]
+        return list(islice(heapq.merge(*pages, key=lambda record: record['id']), limit))
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        if field == self.shard_key:
+            return self.shard_for(value).find(field, value)
+        records = []
+        for shard in self.shards:
+            records.extend(shard.find(field, value))
+        return records
+
+    def insert(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return self.shard_for(record.get(self.shard_key)).insert(record)
+
+    def update(self, record_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        shard = self._shard_for_id(record_id)
+        return shard.update(record_id, changes) if shard else None
+
+    def delete(self, record_id: int) -> bool:
+        shard = self._shard_for_id(record_id)
+        return shard.delete(record_id) if shard else False
+
+    def delete_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        return sum(shard.delete_where(predicate) for shard in self.shards)
@@ -0,0 +1,15 @@
+"""
+Gemeinsame Einstellungen für die Backend-Tests
+
+Die Services importieren ihre Module relativ zum Backend-Verzeichnis
+(``services.…``, ``models.…``), Dokumentenmodule relativ zum Projektverzeichnis
+(``backend.…``); beide Pfade werden daher vorangestellt.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BACKEND_DIR, os.path.dirname(BACKEND_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
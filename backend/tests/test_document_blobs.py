@@ -0,0 +1,139 @@
+"""Tests für die inhaltsadressierte Ablage der Dokumentversionen"""
+
+import hashlib
+import os
+import stat
+
+import pytest
+
+from backend.models.document import DocumentType
+from backend.services import document_blobs
+from backend.services.document_blobs import BlobStore
+from backend.services.document_service import DocumentService
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "rechnung.pdf"
+    path.write_bytes(os.urandom(3 * document_blobs.CHUNK_SIZE + 17))
+    return path
+
+
+def test_identical_uploads_share_one_blob(tmp_path, upload):
+    store = BlobStore(str(tmp_path / "blobs"))
+    digest = store.add(str(upload), str(tmp_path / "v1_a.pdf"))
+    assert store.add(str(upload), str(tmp_path / "v1_b.pdf")) == digest
+
+    assert digest == hashlib.sha256(upload.read_bytes()).hexdigest()
+    assert store.references(digest) == 2
+    assert (tmp_path / "v1_b.pdf").read_bytes() == upload.read_bytes()
+    # Keine temporären Dateien bleiben zurück
+    assert [entry.name for entry in os.scandir(store.directory) if entry.is_file()] == []
+
+
+def test_upload_is_read_once(tmp_path, upload, monkeypatch):
+    reads = []
+    real_open = open
+
+    def counting_open(path, mode='r', *args, **kwargs):
+        if os.fspath(path) == str(upload):
+            reads.append(mode)
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", counting_open)
+    BlobStore(str(tmp_path / "blobs")).add(str(upload), str(tmp_path / "v1.pdf"))
+    assert reads == ['rb']
+
+
+def test_existing_version_file_is_not_overwritten(tmp_path, upload):
+    store = BlobStore(str(tmp_path / "blobs"))
+    dest = tmp_path / "v1.pdf"
+    dest.write_bytes(b"bestehend")
+    with pytest.raises(FileExistsError):
+        store.add(str(upload), str(dest))
+    assert dest.read_bytes() == b"bestehend"
+
+    # Derselbe Inhalt unter demselben Pfad ist kein Fehler
+    linked = tmp_path / "v2.pdf"
+    digest = store.add(str(upload), str(linked))
+    assert store.add(str(upload), str(linked)) == digest
+    assert store.references(digest) == 1
+
+
+def test_collect_garbage_removes_unreferenced_blobs(tmp_path, upload):
+    store = BlobStore(str(tmp_path / "blobs"))
+    kept = tmp_path / "v1.pdf"
+    dropped = tmp_path / "v2.txt"
+    other = tmp_path / "other.txt"
+    other.write_text("anderer Inhalt")
+    kept_digest = store.add(str(upload), str(kept))
+    dropped_digest = store.add(str(other), str(dropped))
+    dropped.unlink()
+
+    assert store.collect_garbage() == 0  # noch zu jung
+    assert store.collect_garbage(min_age=0) == 1
+    assert not os.path.exists(store.path(dropped_digest))
+    assert store.references(kept_digest) == 1
+
+
+def test_collect_garbage_skips_undeletable_blobs(tmp_path, upload, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"))
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("eins")
+    second.write_text("zwei")
+    digests = [store.add(str(source), str(tmp_path / f"v_{source.name}")) for source in (first, second)]
+    for source in (first, second):
+        (tmp_path / f"v_{source.name}").unlink()
+
+    locked = store.path(digests[0])
+    real_remove = os.remove
+
+    def remove(path):
+        if path == locked:
+            raise PermissionError(13, "Zugriff verweigert", path)
+        real_remove(path)
+
+    monkeypatch.setattr(document_blobs.os, "remove", remove)
+    assert store.collect_garbage(min_age=0) == 1
+    assert os.path.exists(locked) and not os.path.exists(store.path(digests[1]))
+
+
+def test_purge_removes_read_only_version_files(tmp_path, upload, monkeypatch):
+    service = DocumentService(str(tmp_path / "dokumente"))
+    document = service.create_document("Rechnung", str(upload), DocumentType.PDF, owner_id=1)
+    digest = hashlib.sha256(upload.read_bytes()).hexdigest()
+    service.delete_document(document.id)
+
+    # Wie unter Windows: schreibgeschützte Dateien lassen sich nicht löschen
+    real_remove = os.remove
+
+    def remove(path):
+        if not os.stat(path).st_mode & stat.S_IWRITE:
+            raise PermissionError(13, "Zugriff verweigert", path)
+        real_remove(path)
+
+    monkeypatch.setattr(document_blobs.os, "name", "nt")
+    monkeypatch.setattr(document_blobs.os, "remove", remove)
+    assert service.purge_document(document.id)
+    monkeypatch.undo()
+
+    assert not (tmp_path / "dokumente" / document.id).exists()
+    assert service.blobs.references(digest) == 0
+    assert service.collect_garbage(min_age=0) == 1
+
+
+def test_purge_reports_undeletable_files(tmp_path, upload, monkeypatch):
+    service = DocumentService(str(tmp_path / "dokumente"))
+    document = service.create_document("Rechnung", str(upload), DocumentType.PDF, owner_id=1)
+    service.delete_document(document.id)
+
+    def remove(path):
+        raise PermissionError(13, "Zugriff verweigert", path)
+
+    monkeypatch.setattr(document_blobs.os, "remove", remove)
+    with pytest.raises(PermissionError):
+        service.purge_document(document.id)
+    monkeypatch.undo()
+    # Das Dokument bleibt erhalten und kann erneut entfernt werden
+    assert service.get_document(document.id) is not None
+    assert service.purge_document(document.id)
@@ -0,0 +1,136 @@
+"""Tests für den Ordnerindex der Dokumentenverwaltung"""
+
+import pytest
+
+from backend.models.document import DocumentStatus, DocumentType
+from backend.services.document_folders import FolderIndex
+from backend.services.document_service import DocumentService
+
+
+@pytest.fixture
+def service(tmp_path):
+    return DocumentService(str(tmp_path / "dokumente"))
+
+
+@pytest.fixture
+def create(tmp_path, service):
+    def create(name, size, folder_id):
+        upload = tmp_path / f"{name}.bin"
+        upload.write_bytes(b"x" * size)
+        return service.create_document(name, str(upload), DocumentType.OTHER, owner_id=1, folder_id=folder_id)
+    return create
+
+
+def _folder(service, name, parent_id=None):
+    return service.create_folder(name, owner_id=1, parent_id=parent_id).id
+
+
+def _expected_size(service, folder_id):
+    """Zählt über alle Ordner und Dokumente, ohne den Index zu benutzen"""
+    def inside(candidate_id):
+        while candidate_id is not None:
+            if candidate_id == folder_id:
+                return True
+            candidate_id = service.folders[candidate_id].parent_id if candidate_id in service.folders else None
+        return False
+
+    folders = [f for f in service.folders.values() if f.id != folder_id and inside(f.id)]
+    documents = [d for d in service.documents.values()
+                 if d.status != DocumentStatus.DELETED and inside(d.folder_id)]
+    return {"folders": len(folders), "documents": len(documents), "size": sum(d.size for d in documents)}
+
+
+def test_folder_index_subtree_lists_parents_first():
+    index = FolderIndex()
+    parents = {"a": None, "b": "a", "c": "b", "d": "a", "e": None}
+    for folder_id, parent_id in parents.items():
+        index.add_folder(folder_id, parent_id)
+    subtree = index.subtree("a")
+    assert sorted(subtree) == ["a", "b", "c", "d"] and subtree[0] == "a"
+    assert all(subtree.index(parents[folder_id]) < subtree.index(folder_id) for folder_id in subtree[1:])
+
+    index.move_folder("b", "a", "e")
+    assert index.subtree("a") == ["a", "d"]
+    assert index.subtree("e") == ["e", "b", "c"]
+    index.remove_folder("c", "b")
+    assert index.subfolders("b") == [] and index.subtree("e") == ["e", "b"]
+
+
+def test_move_folder_takes_subtree_along(service, create):
+    root = _folder(service, "Projekte")
+    archive = _folder(service, "Archiv")
+    project = _folder(service, "Projekt A", root)
+    drafts = _folder(service, "Entwürfe", project)
+    document = create("plan", 10, drafts)
+
+    service.move_folder(project, archive)
+    folders, documents = service.get_folder_tree(archive)
+    assert [f.id for f in folders] == [project, drafts]
+    assert [d.id for d in documents] == [document.id]
+    assert service.get_folder_tree(root) == ([], [])
+
+    # Kein Verschieben in den eigenen Unterbaum, auch nicht über update_folder
+    with pytest.raises(ValueError):
+        service.move_folder(archive, drafts)
+    with pytest.raises(ValueError):
+        service.update_folder(project, parent_id=drafts)
+    with pytest.raises(ValueError):
+        service.move_folder(project, project)
+    assert service.get_folder(archive).parent_id is None
+    assert [f.id for f in service.get_folder_tree(archive)[0]] == [project, drafts]
+
+    service.move_folder(project, None)
+    assert [f.id for f in service.get_folder_contents(None)[0]] == [root, archive, project]
+    reloaded = DocumentService(service.storage_path)
+    assert [f.id for f in reloaded.get_folder_tree(project)[0]] == [drafts]
+
+
+def test_delete_folder_removes_subtree(service, create):
+    root = _folder(service, "Kunden")
+    customer = _folder(service, "Kunde 1", root)
+    invoices = _folder(service, "Rechnungen", customer)
+    sibling = _folder(service, "Kunde 2", root)
+    deleted = [create("angebot", 5, customer), create("rechnung", 7, invoices)]
+    kept = create("vertrag", 3, sibling)
+
+    assert service.delete_folder(customer)
+    assert customer not in service.folders and invoices not in service.folders
+    assert [f.id for f in service.get_folder_contents(root)[0]] == [sibling]
+    assert all(service.get_document(d.id).status == DocumentStatus.DELETED for d in deleted)
+    assert service.get_folder_size(root) == {"folders": 1, "documents": 1, "size": 3}
+    assert [d.id for d in service.get_folder_tree(root)[1]] == [kept.id]
+
+    reloaded = DocumentService(service.storage_path)
+    assert invoices not in reloaded.folders
+    assert reloaded.get_folder_size(root) == {"folders": 1, "documents": 1, "size": 3}
+
+
+def test_folder_sizes_follow_document_changes(tmp_path, service, create):
+    root = _folder(service, "Wurzel")
+    left = _folder(service, "Links", root)
+    left_child = _folder(service, "Links unten", left)
+    right = _folder(service, "Rechts", root)
+    documents = [create("a", 100, left), create("b", 20, left_child), create("c", 3, right)]
+
+    def check():
+        for folder_id in (root, left, left_child, right):
+            assert service.get_folder_size(folder_id) == _expected_size(service, folder_id)
+
+    check()
+    create("d", 4000, left_child)
+    check()
+    service.delete_document(documents[0].id)
+    check()
+    # Dokument in einen anderen Teilbaum verschieben
+    service.update_document(documents[1].id, folder_id=right)
+    check()
+    # Neue Dateiversion mit anderer Größe
+    new_version = tmp_path / "b2.bin"
+    new_version.write_bytes(b"y" * 555)
+    service.update_document(documents[1].id, file_path=str(new_version))
+    check()
+    # Ordner samt Inhalt unter einen anderen Ordner hängen
+    service.move_folder(left_child, right)
+    check()
+    assert service.get_folder_size(right) == {"folders": 1, "documents": 3, "size": 3 + 555 + 4000}
+    assert service.get_folder_size(left) == {"folders": 0, "documents": 0, "size": 0}
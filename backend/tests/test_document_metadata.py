@@ -0,0 +1,120 @@
+"""Tests für Snapshot und Änderungslog der Dokument-Metadaten"""
+
+import threading
+
+from backend.models.document import DocumentType
+from backend.services.document_metadata import DocumentMetadataStore
+from backend.services.document_service import DocumentService
+
+
+def _store(directory, state, compact_min=1000):
+    def snapshot():
+        return {kind: list(records.values()) for kind, records in state.items()}
+    return DocumentMetadataStore(str(directory), snapshot, compact_min)
+
+
+def _put(store, state, kind, record):
+    state[kind][record['id']] = record
+    store.put(kind, record)
+
+
+def _empty_state():
+    return {"documents": {}, "folders": {}, "tags": {}}
+
+
+def test_log_is_replayed_over_snapshot(tmp_path):
+    state = _empty_state()
+    store = _store(tmp_path, state)
+    _put(store, state, "documents", {'id': "d1", 'name': "Alt"})
+    _put(store, state, "folders", {'id': "f1", 'name': "Ordner"})
+    assert store.compact()
+
+    _put(store, state, "documents", {'id': "d1", 'name': "Neu"})
+    _put(store, state, "tags", {'id': "t1", 'name': "Wichtig"})
+    store.delete("folders", "f1")
+    store.close()
+
+    records = _store(tmp_path, _empty_state()).load()
+    assert records["documents"] == {"d1": {'id': "d1", 'name': "Neu"}}
+    assert records["folders"] == {}
+    assert records["tags"] == {"t1": {'id': "t1", 'name': "Wichtig"}}
+
+
+def test_torn_last_line_is_dropped_and_later_changes_survive(tmp_path):
+    state = _empty_state()
+    store = _store(tmp_path, state)
+    _put(store, state, "documents", {'id': "d1", 'name': "Eins"})
+    store.close()
+    # Absturz mitten im Schreiben des nächsten Eintrags
+    with open(tmp_path / "changes.log", 'ab') as f:
+        f.write(b'{"op":"put","kind":"documents","record":{"id":"d2","na')
+
+    restarted = _store(tmp_path, _empty_state())
+    assert list(restarted.load()["documents"]) == ["d1"]
+    restarted.put("documents", {'id': "d3", 'name': "Drei"})
+    restarted.close()
+
+    assert list(_store(tmp_path, _empty_state()).load()["documents"]) == ["d1", "d3"]
+
+
+def test_compaction_writes_snapshot_and_empties_log(tmp_path):
+    state = _empty_state()
+    store = _store(tmp_path, state, compact_min=5)
+    for number in range(4):
+        _put(store, state, "documents", {'id': f"d{number}", 'name': f"Dokument {number}"})
+    assert not (tmp_path / "snapshot.json").exists()
+
+    compacted = threading.Event()
+    original = store.compact
+
+    def compact():
+        try:
+            return original()
+        finally:
+            compacted.set()
+
+    store.compact = compact
+    _put(store, state, "documents", {'id': "d4", 'name': "Dokument 4"})
+    assert compacted.wait(5)
+    assert (tmp_path / "changes.log").stat().st_size == 0
+
+    store.delete("documents", "d0")
+    store.close()
+    records = _store(tmp_path, _empty_state()).load()
+    assert sorted(records["documents"]) == ["d1", "d2", "d3", "d4"]
+
+
+def test_second_instance_sees_appended_changes(tmp_path):
+    state = _empty_state()
+    writer = _store(tmp_path, state)
+    reader = _store(tmp_path, _empty_state())
+    _put(writer, state, "documents", {'id': "d1", 'name': "Eins"})
+    assert list(reader.load()["documents"]) == ["d1"]
+
+    _put(writer, state, "documents", {'id': "d1", 'name': "Geändert"})
+    writer.delete("documents", "d1")
+    _put(writer, state, "folders", {'id': "f1", 'name': "Ordner"})
+    records = reader.load()
+    assert records["documents"] == {} and list(records["folders"]) == ["f1"]
+
+
+def test_document_service_round_trip(tmp_path):
+    upload = tmp_path / "notiz.txt"
+    upload.write_text("Inhalt")
+    service = DocumentService(str(tmp_path / "dokumente"), compact_min=3)
+    folder = service.create_folder("Verträge", owner_id=1)
+    tag = service.create_tag("Wichtig")
+    documents = [service.create_document(f"Notiz {number}", str(upload), DocumentType.TEXT, owner_id=1,
+                                         tags=[tag.id], folder_id=folder.id)
+                 for number in range(4)]
+    service.update_document(documents[0].id, name="Umbenannt")
+    service.delete_document(documents[1].id)
+    assert service.metadata.compact()
+    service.update_document(documents[2].id, description="Nach dem Snapshot")
+    service.close()
+
+    reloaded = DocumentService(str(tmp_path / "dokumente"))
+    assert reloaded.get_document(documents[0].id).name == "Umbenannt"
+    assert reloaded.get_document(documents[2].id).description == "Nach dem Snapshot"
+    assert reloaded.get_folder(folder.id).documents == {documents[0].id, documents[2].id, documents[3].id}
+    assert reloaded.get_tag(tag.id).documents == {documents[0].id, documents[2].id, documents[3].id}
@@ -0,0 +1,112 @@
+"""Tests für die Dokumentensuche über den Trigramm-Index"""
+
+import random
+
+import pytest
+
+from backend.models.document import DocumentStatus, DocumentType
+from backend.services.document_service import DocumentService
+
+WORDS = ["Rechnung", "Überweisung", "Größe", "Straße", "Äpfel", "Öl", "Mahnung", "Vertrag",
+         "Angebot", "Lieferschein", "Müller", "Ab", "x"]
+
+
+@pytest.fixture
+def service(tmp_path):
+    return DocumentService(str(tmp_path / "dokumente"))
+
+
+@pytest.fixture
+def create(tmp_path, service):
+    upload = tmp_path / "datei.pdf"
+    upload.write_bytes(b"%PDF")
+
+    def create(name, description=""):
+        return service.create_document(name, str(upload), DocumentType.PDF, owner_id=1, description=description)
+    return create
+
+
+def _names(documents):
+    return sorted(document.name for document in documents)
+
+
+def _linear(service, query, status=None):
+    """Bisherige Suche: Teilstring in Name oder Beschreibung, ohne Index"""
+    query = query.lower()
+    return sorted(
+        document.name for document in service.documents.values()
+        if (status is not None or document.status != DocumentStatus.DELETED)
+        and (status is None or document.status == status)
+        and (query in document.name.lower() or query in document.description.lower())
+    )
+
+
+def test_short_queries_find_substrings(service, create):
+    create("Ab 2024")
+    create("Rechnung", "Kopie")
+    create("x")
+
+    assert _names(service.search_documents("x")) == ["x"]
+    assert _names(service.search_documents("AB")) == ["Ab 2024"]
+    assert _names(service.search_documents("ch")) == ["Rechnung"]
+    assert _names(service.search_documents("op")) == ["Rechnung"]
+    assert _names(service.search_documents("4")) == ["Ab 2024"]
+    assert service.search_documents("qz") == []
+
+
+def test_queries_with_umlauts(service, create):
+    create("Überweisung März")
+    create("Größe", "Straße 5")
+    create("Uberweisung ohne Umlaut")
+
+    assert _names(service.search_documents("überw")) == ["Überweisung März"]
+    assert _names(service.search_documents("ÜBER")) == ["Überweisung März"]
+    assert _names(service.search_documents("ö")) == ["Größe"]
+    assert _names(service.search_documents("ße")) == ["Größe"]
+    assert _names(service.search_documents("straße")) == ["Größe"]
+    assert _names(service.search_documents("ärz")) == ["Überweisung März"]
+
+
+def test_index_follows_rename_and_delete(service, create):
+    document = create("Entwurf")
+    other = create("Vertrag")
+    assert _names(service.search_documents("entw")) == ["Entwurf"]
+
+    service.update_document(document.id, name="Angebot", description="Endfassung")
+    assert service.search_documents("entw") == []
+    assert _names(service.search_documents("gebo")) == ["Angebot"]
+    assert _names(service.search_documents("fassung")) == ["Angebot"]
+
+    service.delete_document(other.id)
+    assert service.search_documents("vertrag") == []
+    assert _names(service.search_documents("vertrag", status=DocumentStatus.DELETED)) == ["Vertrag"]
+    service.purge_document(other.id)
+    assert service.search_documents("vertrag", status=DocumentStatus.DELETED) == []
+
+
+def test_index_agrees_with_linear_scan(service, create):
+    rng = random.Random(22)
+
+    def text():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+    documents = [create(text(), rng.choice(["", text()])) for _ in range(60)]
+    queries = ["ü", "ß", "ab", "Ab ", "ung", "RECHNUNG", "größe", "aße", "ertr", "l", "e M", "zz", "Öl x"]
+    queries += [word[start:start + length] for word in WORDS
+                for start in range(len(word)) for length in (1, 2, 4)]
+
+    def check():
+        for query in queries:
+            assert _names(service.search_documents(query)) == _linear(service, query), query
+
+    check()
+    # Änderungen nach dem Aufbau des Index werden inkrementell nachgeführt
+    for document in rng.sample(documents, 20):
+        service.update_document(document.id, name=text(), description=text())
+    for document in rng.sample(documents, 10):
+        service.delete_document(document.id)
+    for _ in range(10):
+        create(text(), text())
+    check()
+    assert _names(service.search_documents("e", status=DocumentStatus.DELETED)) == \
+        _linear(service, "e", DocumentStatus.DELETED)
@@ -0,0 +1,99 @@
+"""Tests für den Bitmap-Index der Tag-Zuordnungen"""
+
+import pytest
+
+from backend.models.document import DocumentStatus, DocumentType
+from backend.services.document_service import DocumentService
+from backend.services.document_tags import Bitmap
+
+
+@pytest.fixture
+def service(tmp_path):
+    return DocumentService(str(tmp_path / "dokumente"))
+
+
+@pytest.fixture
+def create(tmp_path, service):
+    upload = tmp_path / "datei.pdf"
+    upload.write_bytes(b"%PDF")
+
+    def create(name, tags):
+        return service.create_document(name, str(upload), DocumentType.PDF, owner_id=1, tags=tags)
+    return create
+
+
+def _names(documents):
+    return sorted(document.name for document in documents)
+
+
+def test_bitmap_operations_across_chunks():
+    first, second = Bitmap(), Bitmap()
+    for value in (1, 5, 70000, 200000):
+        first.add(value)
+    for value in (5, 70000, 131072):
+        second.add(value)
+
+    assert list(first & second) == [5, 70000]
+    assert list(first | second) == [1, 5, 70000, 131072, 200000]
+    first.discard(70000)
+    assert 70000 not in first and 200000 in first and len(first) == 3
+
+
+def test_and_or_tag_filters(service, create):
+    red, blue, green = (service.create_tag(name).id for name in ("Rot", "Blau", "Grün"))
+    create("rot", [red])
+    create("rot-blau", [red, blue])
+    create("blau-grün", [blue, green])
+    create("alle", [red, blue, green])
+    create("ohne", [])
+
+    assert _names(service.search_documents(tags=[red, blue])) == ["alle", "rot-blau"]
+    assert _names(service.search_documents(tags=[red, green], match_all_tags=False)) == \
+        ["alle", "blau-grün", "rot", "rot-blau"]
+    assert _names(service.search_documents(tags=[blue, blue])) == ["alle", "blau-grün", "rot-blau"]
+    # Unbekannte Tags: kein Treffer bei Und, ignoriert bei Oder
+    assert service.search_documents(tags=[red, "unbekannt"]) == []
+    assert _names(service.search_documents(tags=[green, "unbekannt"], match_all_tags=False)) == \
+        ["alle", "blau-grün"]
+    # Zusammen mit einem Suchbegriff
+    assert _names(service.search_documents("blau", tags=[green])) == ["blau-grün"]
+
+
+def test_ordinals_of_purged_documents_are_not_reused(service, create):
+    tag = service.create_tag("Archiv").id
+    old = create("alt", [tag])
+    kept = create("bleibt", [tag])
+    assert _names(service.search_documents(tags=[tag])) == ["alt", "bleibt"]
+
+    service.delete_document(old.id)
+    assert _names(service.search_documents(tags=[tag])) == ["bleibt"]
+    assert _names(service.search_documents(tags=[tag], status=DocumentStatus.DELETED)) == ["alt"]
+
+    service.purge_document(old.id)
+    new = create("neu", [tag])
+    assert service.ordinals.get(new.id) not in (service.ordinals.get(old.id), service.ordinals.get(kept.id))
+    assert _names(service.search_documents(tags=[tag])) == ["bleibt", "neu"]
+    assert service.search_documents(tags=[tag], status=DocumentStatus.DELETED) == []
+
+    # Nach dem Neuladen werden die Ordinalzahlen neu vergeben
+    reloaded = DocumentService(service.storage_path)
+    assert _names(reloaded.search_documents(tags=[tag])) == ["bleibt", "neu"]
+
+
+def test_update_and_tag_delete_remove_memberships(service, create):
+    red, blue = (service.create_tag(name).id for name in ("Rot", "Blau"))
+    document = create("dokument", [red, blue])
+    assert _names(service.search_documents(tags=[red])) == ["dokument"]
+
+    service.update_document(document.id, tags=[blue])
+    assert service.search_documents(tags=[red]) == []
+    assert service.search_documents(tags=[red, blue]) == []
+    assert _names(service.search_documents(tags=[blue])) == ["dokument"]
+    assert document.id not in service.get_tag(red).documents
+
+    service.delete_tag(blue)
+    assert service.search_documents(tags=[blue], match_all_tags=False) == []
+    assert service.get_document(document.id).tags == set()
+    reloaded = DocumentService(service.storage_path)
+    assert reloaded.get_document(document.id).tags == set()
+    assert reloaded.search_documents(tags=[red]) == []
@@ -0,0 +1,14 @@
+"""Tests für die Parameterprüfung der E-Commerce-Routen"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from api.v1.endpoints import ecommerce
+
+
+def test_product_list_rejects_cursor_with_sort():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ecommerce.get_products(cursor="10", sort="popular"))
+    assert error.value.status_code == 400
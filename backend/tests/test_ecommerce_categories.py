@@ -0,0 +1,66 @@
+"""Tests für den Kategoriebaum und die Produktlisten mit Unterkategorien"""
+
+import threading
+
+from models.ecommerce import Product, ProductCategory
+from services.ecommerce_service import ECommerceService
+
+
+def _category(service, name, parent_id=None):
+    return service.create_category(ProductCategory(name=name, parent_id=parent_id)).id
+
+
+def test_subcategory_listing_skips_inactive_subtrees(tmp_path):
+    service = ECommerceService(str(tmp_path))
+    root = _category(service, "Möbel")
+    tables = _category(service, "Tische", root)
+    outdoor = _category(service, "Garten", tables)
+    chairs = _category(service, "Stühle", root)
+    for number, category_id in enumerate((root, tables, outdoor, chairs)):
+        service.create_product(Product(sku=f"P{number}", name=f"Produkt {number}", price=1.0,
+                                       category_id=category_id))
+
+    def listed(**kwargs):
+        return [p.sku for p in service.get_products(category_id=root, include_subcategories=True, **kwargs)]
+
+    assert listed() == ["P0", "P1", "P2", "P3"]
+    assert service.delete_category(tables)
+    # Die deaktivierte Kategorie fällt samt Unterbaum heraus, seitenweise ebenso
+    assert listed() == ["P0", "P3"]
+    page, _ = service.get_products_page(category_id=root, include_subcategories=True)
+    assert [p.sku for p in page] == ["P0", "P3"]
+    assert listed(active_only=False) == ["P0", "P1", "P2", "P3"]
+
+    service.update_category(tables, ProductCategory(name="Tische", parent_id=root, active=True))
+    assert listed() == ["P0", "P1", "P2", "P3"]
+    # Ein anderer Prozess liest den Zustand aus der Datei
+    assert [p.sku for p in ECommerceService(str(tmp_path)).get_products(
+        category_id=root, include_subcategories=True)] == ["P0", "P1", "P2", "P3"]
+
+
+def test_category_writes_and_subcategory_reads_do_not_deadlock(tmp_path):
+    service = ECommerceService(str(tmp_path))
+    root = _category(service, "Wurzel")
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            service.get_products(category_id=root, include_subcategories=True)
+            # Erzwingt den Neuaufbau wie nach einer Änderung durch einen anderen Prozess
+            service._category_generation = None
+
+    def write():
+        for number in range(200):
+            category_id = _category(service, f"K{number}", root)
+            service.update_category(category_id, ProductCategory(name=f"K{number}", parent_id=root))
+
+    readers = [threading.Thread(target=read, daemon=True) for _ in range(3)]
+    writer = threading.Thread(target=write, daemon=True)
+    for thread in readers + [writer]:
+        thread.start()
+    writer.join(timeout=30)
+    stop.set()
+    assert not writer.is_alive(), "Kategorie-Schreiber blockiert mit parallelen Lesern"
+    for thread in readers:
+        thread.join(timeout=5)
+    assert len(service._subcategory_ids(root)) == 201
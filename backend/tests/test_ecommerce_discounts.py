@@ -0,0 +1,86 @@
+"""Tests für den Rabattindex und die Zählung eingelöster Rabatte"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from models.ecommerce import Discount, Product
+from services.ecommerce_discounts import DiscountIndex, compile_discount
+from services.ecommerce_service import ECommerceService
+
+START = datetime(2024, 1, 1)
+
+
+def _record(discount_id, begin, days, code=None, active=True):
+    return {
+        'id': discount_id, 'code': code or f"CODE{discount_id}", 'discount_type': "prozentual",
+        'discount_value': 10.0, 'valid_from': (START + timedelta(days=begin)).isoformat(),
+        'valid_to': None if days is None else (START + timedelta(days=begin + days)).isoformat(),
+        'active': active,
+    }
+
+
+def _linear(records, when):
+    compiled = (compile_discount(record) for record in records.values())
+    return sorted(d.id for d in compiled if d.is_valid_at(when.timestamp()))
+
+
+def test_discount_index_matches_linear_scan():
+    rng = random.Random(7)
+    records = {
+        discount_id: _record(discount_id, rng.randrange(60), rng.choice([None, 0, 1, 5, 30]),
+                             active=rng.random() > 0.2)
+        for discount_id in range(1, 301)
+    }
+    index = DiscountIndex(records.values())
+    moments = [START + timedelta(days=day, hours=hour) for day in range(-1, 95) for hour in (0, 12)]
+
+    for when in moments:
+        assert [d.id for d in index.valid_at(when)] == _linear(records, when)
+
+    # Geänderte Zeiträume, Aktivierung und neue Rabatte werden einzeln nachgeführt
+    for discount_id in rng.sample(sorted(records), 60):
+        records[discount_id] = _record(discount_id, rng.randrange(60), rng.choice([None, 2, 10]),
+                                       active=rng.random() > 0.5)
+        index.put(records[discount_id])
+    records[301] = _record(301, 10, None)
+    index.put(records[301])
+    for when in moments:
+        assert [d.id for d in index.valid_at(when)] == _linear(records, when)
+
+
+def test_discount_index_codes_follow_updates():
+    index = DiscountIndex([_record(1, 0, None, code="Sommer"), _record(2, 0, None, code="SOMMER")])
+    # Bei doppelten Codes gewinnt der zuerst angelegte Rabatt
+    assert index.lookup(" sommer ").id == 1
+
+    index.put(_record(1, 0, None, code="Winter"))
+    assert index.lookup("sommer").id == 2
+    assert index.lookup("WINTER").id == 1
+
+    index.put({**_record(2, 0, None, code="SOMMER"), 'usage_limit': 1, 'used_count': 1})
+    assert index.lookup("sommer").is_exhausted()
+
+
+def test_checkout_counts_discount_use_without_rebuilding_index(tmp_path):
+    service = ECommerceService(str(tmp_path))
+    product = service.create_product(Product(sku="X1", name="Lampe", price=50.0))
+    service.create_discount(Discount(code="EINMAL", description="Einmalig", discount_type="prozentual",
+                                     discount_value=10.0, valid_from=datetime.now() - timedelta(days=1),
+                                     usage_limit=1))
+    index = service._discount_index_snapshot()
+
+    service.add_to_cart("s1", product.id, 1)
+    service.apply_discount_to_cart("s1", "einmal")
+    order = service.create_order(service.get_cart("s1"), customer_id=1, shipping_address_id=1,
+                                 billing_address_id=1, payment_method="invoice", shipping_method="standard")
+    assert order.discount_amount == 5.0
+
+    assert service._discount_index_snapshot() is index
+    assert index.lookup("EINMAL").used_count == 1
+    service.add_to_cart("s2", product.id, 1)
+    with pytest.raises(ValueError):
+        service.apply_discount_to_cart("s2", "EINMAL")
+    # Ein anderer Prozess sieht die Einlösung ebenfalls
+    assert ECommerceService(str(tmp_path)).get_discount_by_code("einmal").used_count == 1
@@ -0,0 +1,36 @@
+"""Tests für den gestreamten Produktimport"""
+
+import asyncio
+import json
+
+from services.ecommerce_async import AsyncECommerceService
+from services.ecommerce_service import ECommerceService
+
+
+def test_import_consumes_request_stream_incrementally(tmp_path):
+    service = ECommerceService(str(tmp_path))
+    facade = AsyncECommerceService(service, max_workers=2)
+    lines = [json.dumps({'sku': f"S{number}", 'name': f"Müsli {number}", 'price': 1.5}, ensure_ascii=False)
+             for number in range(6)]
+    body = ("\n".join(lines) + "\n").encode('utf-8')
+    saved_while_streaming = []
+
+    async def chunks():
+        # Kleine Teile, auch mitten in einem mehrbytigen Zeichen getrennt
+        for start in range(0, len(body), 7):
+            if start > len(body) // 2:
+                saved_while_streaming.append(len(service.products.all()))
+            yield body[start:start + 7]
+            await asyncio.sleep(0)
+
+    async def run():
+        try:
+            return await facade.import_products_stream(chunks(), "ndjson", batch_size=2)
+        finally:
+            facade.shutdown()
+
+    result = asyncio.run(run())
+    assert (result.created, result.failed) == (6, 0)
+    assert service.products.find('sku', "S5")[0]['name'] == "Müsli 5"
+    # Die ersten Blöcke waren gespeichert, bevor der Body vollständig empfangen war
+    assert saved_while_streaming and saved_while_streaming[0] < 6 and max(saved_while_streaming) > 0
@@ -0,0 +1,60 @@
+"""Tests für Bestandsführung und Reservierungen im E-Commerce-Service"""
+
+import pytest
+
+from models.ecommerce import Product
+from services.ecommerce_inventory import InsufficientStockError, StockLedger
+from services.ecommerce_service import ECommerceService
+
+
+def _order(service: ECommerceService, session_id: str):
+    cart = service.get_cart(session_id)
+    return service.create_order(cart, customer_id=1, shipping_address_id=1, billing_address_id=1,
+                                payment_method="invoice", shipping_method="standard")
+
+
+def test_default_product_can_be_ordered(tmp_path):
+    service = ECommerceService(str(tmp_path))
+    product = service.create_product(Product(sku="X1", name="Ohne Bestand", price=10.0))
+
+    cart = service.add_to_cart("s1", product.id, 2)
+    assert cart.items[0].quantity == 2
+
+    order = _order(service, "s1")
+    assert order.subtotal == 20.0
+    assert service.get_cart("s1").items == []
+
+
+def test_reservation_prevents_overselling(tmp_path):
+    service = ECommerceService(str(tmp_path), stock_reservation=True)
+    product = service.create_product(Product(sku="X1", name="Knapp", price=5.0, inventory_level=3))
+
+    service.add_to_cart("s1", product.id, 2)
+    with pytest.raises(InsufficientStockError):
+        service.add_to_cart("s2", product.id, 2)
+    # Die fehlgeschlagene Reservierung verändert den Warenkorb nicht
+    assert service.get_cart("s2").items == []
+
+    service.add_to_cart("s2", product.id, 1)
+    assert service.get_stock(product.id).available == 0
+
+    _order(service, "s1")
+    service.flush_stock_levels()
+    stock = service.get_stock(product.id)
+    assert (stock.on_hand, stock.reserved) == (1, 1)
+    assert service.get_product(product.id).inventory_level == 1
+
+
+def test_ledger_commit_is_all_or_nothing(tmp_path):
+    ledger = StockLedger(str(tmp_path))
+    ledger.set_on_hand("A", 5)  # noch nicht geführt: bleibt unverändert
+    assert ledger.level("A") is None
+
+    with pytest.raises(InsufficientStockError) as error:
+        ledger.commit([("A", 2, 5), ("B", 4, 3)], "s1")
+    assert error.value.sku == "B"
+    assert ledger.level("A") is None and ledger.level("B") is None
+
+    assert ledger.commit([("A", 2, 5), ("B", 1, 3)], "s1") == {"A": 3, "B": 2}
+    ledger.restock({"A": 2})
+    assert ledger.level("A")["on_hand"] == 5
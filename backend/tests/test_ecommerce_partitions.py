@@ -0,0 +1,131 @@
+"""Tests für den nach Monaten partitionierten Bestell-Speicher"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from services.ecommerce_partitions import PartitionedStore, _shift_month
+from services.ecommerce_storage import IdSequences, JournalStore
+
+
+def _current_month():
+    return datetime.now().strftime("%Y-%m")
+
+
+def _open(tmp_path, **kwargs):
+    return PartitionedStore(str(tmp_path / "orders"), indexes=("customer_id",),
+                            sequences=IdSequences(str(tmp_path / "sequences.json")), **kwargs)
+
+
+def test_legacy_migration_partitions_and_archives_old_months(tmp_path):
+    current = _current_month()
+    legacy = [
+        {'id': 1, 'customer_id': 1, 'created_at': "2020-01-05T10:00:00"},
+        {'id': 2, 'customer_id': 2, 'created_at': "2020-02-01T10:00:00"},
+        {'id': 30, 'customer_id': 1, 'created_at': f"{current}-01T10:00:00"},
+    ]
+    legacy_path = tmp_path / "orders.json"
+    legacy_path.write_text(json.dumps(legacy), encoding='utf-8')
+
+    orders = _open(tmp_path, legacy_path=str(legacy_path))
+    # Wartet auf die im Hintergrund gestartete Archivierung (gleiche Manifest-Sperre)
+    orders.archive()
+
+    assert not legacy_path.exists() and (tmp_path / "orders.json.migrated").exists()
+    files = sorted(path.name for path in (tmp_path / "orders").iterdir())
+    assert "orders_2020-01.json.gz" in files and "orders_2020-01.json" not in files
+    assert f"orders_{current}.json" in files
+    assert [record['id'] for record in orders.all()] == [1, 2, 30]
+    assert [record['id'] for record in orders.find('customer_id', 1)] == [1, 30]
+
+    # Neue IDs liegen über allen übernommenen, auch nach einem Neustart
+    assert orders.insert({'customer_id': 3})['id'] == 31
+    reopened = _open(tmp_path, legacy_path=str(legacy_path))
+    assert reopened.get(1)['customer_id'] == 1
+    assert reopened.insert({'customer_id': 4})['id'] > 31
+
+
+def test_partitioned_ids_stay_unique_after_legacy_migration(tmp_path):
+    # Vormonat: noch nicht archiviert, beim Einfügen in den laufenden Monat aber nicht geladen
+    previous = _shift_month(_current_month(), -1)
+    legacy = [{'id': number, 'customer_id': number, 'created_at': f"{previous}-01T10:00:00"}
+              for number in range(1, 6)]
+    legacy_path = tmp_path / "orders.json"
+    legacy_path.write_text(json.dumps(legacy), encoding='utf-8')
+    first = _open(tmp_path, legacy_path=str(legacy_path))
+    # Ein weiterer Prozess, der nur noch die umbenannte Altdatei vorfindet
+    second = _open(tmp_path, legacy_path=str(legacy_path))
+
+    created = [second.insert({'customer_id': 9})['id'], first.insert({'customer_id': 9})['id']]
+    assert min(created) > 5
+    ids = [record['id'] for record in _open(tmp_path).all()]
+    assert len(ids) == len(set(ids)) == 7
+    assert second.get(1)['customer_id'] == 1
+
+
+def test_partitioned_floor_recovered_for_earlier_migrations(tmp_path):
+    legacy = [{'id': 40, 'customer_id': 1, 'created_at': f"{_current_month()}-01T10:00:00"}]
+    legacy_path = tmp_path / "orders.json"
+    legacy_path.write_text(json.dumps(legacy), encoding='utf-8')
+    _open(tmp_path, legacy_path=str(legacy_path))
+    # Stand vor Einführung von imported_max_id
+    manifest_path = tmp_path / "orders" / "partitions.json"
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    del manifest['imported_max_id']
+    manifest_path.write_text(json.dumps(manifest), encoding='utf-8')
+    (tmp_path / "sequences.json").unlink(missing_ok=True)
+
+    orders = _open(tmp_path, legacy_path=str(legacy_path))
+    assert orders.insert({'customer_id': 2})['id'] == 41
+
+
+def test_archived_records_are_read_only(tmp_path):
+    orders = _open(tmp_path)
+    orders.import_records([{'id': 5, 'customer_id': 1, 'created_at': "2020-03-01T00:00:00"}])
+    # Der Import startet die Archivierung bereits im Hintergrund; archive() wartet auf sie
+    orders.archive()
+    assert (tmp_path / "orders" / "orders_2020-03.json.gz").exists()
+    assert not (tmp_path / "orders" / "orders_2020-03.json").exists()
+
+    assert orders.get(5)['customer_id'] == 1
+    with pytest.raises(ValueError):
+        orders.update(5, {'status': "cancelled"})
+    with pytest.raises(ValueError):
+        orders.delete(5)
+    # Ein Datensatz für einen archivierten Monat landet im laufenden Monat
+    created = orders.insert({'customer_id': 2, 'created_at': "2020-03-02T00:00:00"})
+    assert created['id'] == 6
+    assert (tmp_path / "orders" / f"orders_{_current_month()}.json").exists()
+
+
+def test_partitioned_batch_rolls_back_and_reload_sees_other_workers(tmp_path):
+    orders = _open(tmp_path)
+    first = orders.insert({'customer_id': 1})
+
+    with pytest.raises(RuntimeError):
+        with orders.batch():
+            orders.update(first['id'], {'status': "paid"})
+            orders.insert({'customer_id': 2})
+            raise RuntimeError("Abbruch")
+    assert [record.get('status') for record in orders.all()] == [None]
+
+    other = _open(tmp_path)
+    second = other.insert({'customer_id': 2})
+    assert second['id'] != first['id']
+    assert orders.get(second['id'])['customer_id'] == 2
+    assert [record['id'] for record in orders.page(None, 10)] == sorted([first['id'], second['id']])
+
+
+def test_journal_partitions_migrate_uncompacted_journal(tmp_path):
+    legacy_path = str(tmp_path / "orders.json")
+    legacy = JournalStore(legacy_path)
+    legacy.insert({'customer_id': 1, 'created_at': f"{_current_month()}-01T00:00:00"})
+    legacy.update(1, {'status': "paid"})
+    # Noch kein Snapshot geschrieben, die Bestellung steht nur im Journal
+    assert not (tmp_path / "orders.json").exists()
+
+    orders = _open(tmp_path, store_class=JournalStore, legacy_path=legacy_path)
+    assert orders.get(1)['status'] == "paid"
+    assert (tmp_path / "orders.json.journal.migrated").exists()
+    assert orders.insert({'customer_id': 2})['id'] == 2
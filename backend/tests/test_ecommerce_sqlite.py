@@ -0,0 +1,134 @@
+"""Tests für das SQLite-Backend und die Migration aus den JSON-Dateien"""
+
+import json
+import sqlite3
+
+import pytest
+
+from services.ecommerce_migration import migrate_to_sqlite
+from services.ecommerce_service import ECommerceService
+from services.ecommerce_sqlite import SqliteDatabase, SqliteStore
+from services.ecommerce_storage import transaction
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = SqliteDatabase(str(tmp_path / "ecommerce.db"))
+    yield database
+    database.close()
+
+
+def test_sqlite_store_allocates_ids_after_imported_records(database):
+    products = SqliteStore(database, "products", ("sku",))
+    assert products.insert({'sku': "A"})['id'] == 1
+    products.import_records([{'id': 40, 'sku': "B"}])
+    assert products.insert({'sku': "C"})['id'] == 41
+    assert [record['id'] for record in products.find('sku', "C")] == [41]
+
+
+def test_sqlite_store_never_reuses_deleted_ids(tmp_path, database):
+    carts = SqliteStore(database, "carts", ("session_id",))
+    first = carts.insert({'session_id': "s1"})
+    last = carts.insert({'session_id': "s2"})
+    assert carts.delete(last['id'])
+    assert carts.insert({'session_id': "s3"})['id'] == last['id'] + 1
+
+    # Auch nach dem erneuten Öffnen der Datenbank
+    carts.delete_where(lambda record: True)
+    other = SqliteDatabase(str(tmp_path / "ecommerce.db"))
+    try:
+        assert SqliteStore(other, "carts", ("session_id",)).insert({'session_id': "s4"})['id'] > first['id'] + 2
+    finally:
+        other.close()
+
+
+def test_sqlite_upgrades_tables_without_autoincrement(tmp_path):
+    path = str(tmp_path / "alt.db")
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE "reviews" (id INTEGER PRIMARY KEY, data TEXT NOT NULL, "product_id")')
+    connection.executemany('INSERT INTO "reviews" VALUES (?, ?, ?)',
+                           [(1, json.dumps({'product_id': 7}), 7), (2, json.dumps({'product_id': 8}), 8)])
+    connection.commit()
+    connection.close()
+
+    database = SqliteDatabase(path)
+    try:
+        reviews = SqliteStore(database, "reviews", ("product_id",))
+        assert [record['id'] for record in reviews.find('product_id', 8)] == [2]
+        assert reviews.delete(2)
+        assert reviews.insert({'product_id': 9})['id'] == 3
+        assert reviews.insert({'product_id': 9})['id'] == 4
+    finally:
+        database.close()
+
+
+def test_sqlite_batch_and_transaction_roll_back(database):
+    carts = SqliteStore(database, "carts", ("session_id",))
+    orders = SqliteStore(database, "orders", ("customer_id",))
+    carts.insert({'session_id': "s1"})
+
+    with pytest.raises(RuntimeError):
+        with carts.batch():
+            carts.update(1, {'session_id': "s2"})
+            carts.insert({'session_id': "s3"})
+            raise RuntimeError("Abbruch")
+    assert [record['session_id'] for record in carts.all()] == ["s1"]
+
+    with pytest.raises(RuntimeError):
+        with transaction(carts, orders):
+            orders.insert({'customer_id': 1})
+            carts.delete(1)
+            raise RuntimeError("Abbruch")
+    assert orders.all() == [] and carts.get(1) is not None
+
+    # Nach einem Abbruch sind weitere Transaktionen möglich
+    with transaction(carts, orders):
+        orders.insert({'customer_id': 1})
+        carts.delete(1)
+    assert carts.all() == [] and len(orders.all()) == 1
+
+
+def test_sqlite_reload_sees_data_and_new_indexes(tmp_path, database):
+    products = SqliteStore(database, "products")
+    products.insert({'sku': "A", 'category_id': 3})
+    generation = products.generation()
+
+    other = SqliteDatabase(str(tmp_path / "ecommerce.db"))
+    try:
+        # Neu hinzugekommenes Indexfeld wird für bestehende Zeilen befüllt
+        reopened = SqliteStore(other, "products", ("category_id",))
+        assert [record['sku'] for record in reopened.find('category_id', 3)] == ["A"]
+        reopened.insert({'sku': "B", 'category_id': 3})
+    finally:
+        other.close()
+
+    assert products.generation() != generation
+    assert [record['sku'] for record in products.all()] == ["A", "B"]
+
+
+def test_migration_keeps_ids_and_continues_after_them(tmp_path):
+    data_dir = tmp_path / "ecommerce"
+    data_dir.mkdir()
+    products = [{'id': 7, 'name': "Tisch", 'sku': "T-1", 'category_id': 1, 'price': 10.0}]
+    carts = [{'id': 12, 'session_id': "alt", 'items': []}]
+    (data_dir / "products.json").write_text(json.dumps(products), encoding='utf-8')
+    (data_dir / "carts.json").write_text(json.dumps(carts), encoding='utf-8')
+
+    counts = migrate_to_sqlite(str(data_dir))
+    assert counts['products'] == 1 and counts['carts'] == 1
+
+    service = ECommerceService(str(data_dir), storage_mode="sqlite")
+    try:
+        assert service.products.get(7)['sku'] == "T-1"
+        assert service.carts.find('session_id', "alt")[0]['id'] == 12
+        assert service.carts.insert({'session_id': "neu", 'items': []})['id'] == 13
+    finally:
+        service.database.close()
+
+    # Ein erneuter Lauf überschreibt die Zeilen, statt sie zu verdoppeln
+    migrate_to_sqlite(str(data_dir))
+    service = ECommerceService(str(data_dir), storage_mode="sqlite")
+    try:
+        assert len(service.products.all()) == 1
+    finally:
+        service.database.close()
@@ -0,0 +1,268 @@
+"""Tests für die Speicher-Backends des E-Commerce-Service"""
+
+import json
+import threading
+
+from services import ecommerce_storage
+from services.ecommerce_storage import IdSequences, JsonFileStore, JournalStore, ShardedStore
+
+
+def _write_legacy_carts(path, count):
+    carts = [{'id': cart_id, 'session_id': f"legacy-{cart_id}", 'items': []} for cart_id in range(1, count + 1)]
+    path.write_text(json.dumps(carts), encoding='utf-8')
+
+
+def test_sharded_ids_stay_unique_after_legacy_migration(tmp_path):
+    legacy_path = tmp_path / "carts.json"
+    _write_legacy_carts(legacy_path, 40)
+    sequences = IdSequences(str(tmp_path / "sequences.json"))
+    carts = ShardedStore(str(tmp_path / "carts"), "session_id", num_shards=4, indexes=("session_id",),
+                         sequences=sequences, legacy_path=str(legacy_path))
+    for number in range(60):
+        carts.insert({'session_id': f"new-{number}", 'items': []})
+
+    records = carts.all()
+    ids = [record['id'] for record in records]
+    assert len(ids) == 100 and len(set(ids)) == 100
+    assert all(record['id'] > 40 for record in records if record['session_id'].startswith("new-"))
+    for record in records:
+        assert carts.get(record['id'])['session_id'] == record['session_id']
+
+    # Ein weiterer Prozess findet nur noch die umbenannte Altdatei vor
+    reopened = ShardedStore(str(tmp_path / "carts"), "session_id", num_shards=4,
+                            sequences=IdSequences(str(tmp_path / "sequences.json")),
+                            legacy_path=str(legacy_path))
+    created = reopened.insert({'session_id': "legacy-3", 'items': []})
+    assert created['id'] not in ids
+
+
+def test_sharded_floor_recovered_for_earlier_migrations(tmp_path):
+    legacy_path = tmp_path / "carts.json"
+    _write_legacy_carts(legacy_path, 40)
+    ShardedStore(str(tmp_path / "carts"), "session_id", num_shards=4, legacy_path=str(legacy_path))
+    # Stand vor Einführung von legacy_max_id
+    meta_path = tmp_path / "carts" / "shards.json"
+    meta = json.loads(meta_path.read_text(encoding='utf-8'))
+    del meta['legacy_max_id']
+    meta_path.write_text(json.dumps(meta), encoding='utf-8')
+
+    carts = ShardedStore(str(tmp_path / "carts"), "session_id", num_shards=4, legacy_path=str(legacy_path))
+    created = [carts.insert({'session_id': f"new-{number}", 'items': []})['id'] for number in range(20)]
+    assert min(created) > 40
+
+
+def test_sharded_migration_includes_uncompacted_journal(tmp_path):
+    legacy_path = str(tmp_path / "carts.json")
+    legacy = JournalStore(legacy_path)
+    for number in range(3):
+        legacy.insert({'session_id': f"legacy-{number}", 'items': []})
+    legacy.update(2, {'items': [7]})
+    # Noch kein Snapshot geschrieben, alle Warenkörbe stehen nur im Journal
+    assert not (tmp_path / "carts.json").exists()
+
+    carts = ShardedStore(str(tmp_path / "carts"), "session_id", num_shards=4,
+                         store_class=JournalStore, legacy_path=legacy_path)
+    assert [record['id'] for record in sorted(carts.all(), key=lambda record: record['id'])] == [1, 2, 3]
+    assert carts.get(2)['items'] == [7]
+    assert (tmp_path / "carts.json.journal.migrated").exists()
+    assert carts.insert({'session_id': "new", 'items': []})['id'] > 3
+
+
+def test_journal_compaction_inside_batch_does_not_deadlock(tmp_path):
+    store = JournalStore(str(tmp_path / "carts.json"))
+    for number in range(5):
+        store.insert({'session_id': f"s{number}", 'stale': number % 2 == 0})
+
+    def sweep():
+        with store.batch():
+            store.delete_where(lambda record: record['stale'])
+
+    worker = threading.Thread(target=sweep, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive(), "delete_where im Batch blockiert sich selbst"
+
+    # Die Kompaktierung läuft nach dem Batch im Hintergrund
+    for _ in range(100):
+        if not (tmp_path / "carts.json.journal").exists():
+            break
+        threading.Event().wait(0.05)
+    assert not (tmp_path / "carts.json.journal").exists()
+    reloaded = JournalStore(str(tmp_path / "carts.json"))
+    assert [record['session_id'] for record in reloaded.all()] == ["s1", "s3"]
+
+
+def test_json_files_keep_their_format_without_orjson(tmp_path, monkeypatch):
+    records = [{'id': 1, 'name': "Müsli", 'tags': [], 'price': 1.5, 'meta': {'neu': True}}]
+    assert ecommerce_storage._write_json(str(tmp_path / "a.json"), records)
+    monkeypatch.setattr(ecommerce_storage, "orjson", None)
+    assert ecommerce_storage._write_json(str(tmp_path / "b.json"), records)
+
+    written = (tmp_path / "b.json").read_text(encoding='utf-8')
+    assert written == json.dumps(records, ensure_ascii=False, indent=2)
+    assert (tmp_path / "a.json").read_text(encoding='utf-8') == written
+
+
+def test_json_store_reloads_after_external_change(tmp_path):
+    path = str(tmp_path / "products.json")
+    store = JsonFileStore(path, indexes=("sku",))
+    store.insert({'sku': "A", 'name': "Alt"})
+    assert store.find('sku', "A")[0]['name'] == "Alt"
+
+    # Ein zweiter Worker ändert die Datei
+    other = JsonFileStore(path, indexes=("sku",))
+    other.update(1, {'name': "Neu"})
+    other.insert({'sku': "B"})
+
+    assert store.get(1)['name'] == "Neu"
+    assert [record['sku'] for record in store.find('sku', "B")] == ["B"]
+    assert store.insert({'sku': "C"})['id'] == 3
+
+
+def test_json_store_batch_rolls_back_on_error(tmp_path):
+    path = str(tmp_path / "products.json")
+    store = JsonFileStore(path, indexes=("sku",))
+    store.insert({'sku': "A"})
+
+    try:
+        with store.batch():
+            store.insert({'sku': "B"})
+            store.update(1, {'sku': "X"})
+            raise RuntimeError("Abbruch")
+    except RuntimeError:
+        pass
+
+    assert [record['sku'] for record in store.all()] == ["A"]
+    assert store.find('sku', "X") == []
+    assert [record['sku'] for record in JsonFileStore(path).all()] == ["A"]
+
+
+def test_transaction_rolls_back_all_stores(tmp_path):
+    carts = JournalStore(str(tmp_path / "carts.json"))
+    orders = JsonFileStore(str(tmp_path / "orders.json"))
+    carts.insert({'session_id': "s1"})
+
+    try:
+        with ecommerce_storage.transaction(carts, orders):
+            orders.insert({'cart_id': 1})
+            carts.delete(1)
+            raise RuntimeError("Abbruch")
+    except RuntimeError:
+        pass
+
+    assert orders.all() == [] and carts.get(1) is not None
+    assert not (tmp_path / "orders.json").exists()
+    assert [record['id'] for record in JournalStore(str(tmp_path / "carts.json")).all()] == [1]
+
+    with ecommerce_storage.transaction(carts, orders):
+        orders.insert({'cart_id': 1})
+        carts.delete(1)
+    assert JournalStore(str(tmp_path / "carts.json")).all() == []
+    assert [record['cart_id'] for record in JsonFileStore(str(tmp_path / "orders.json")).all()] == [1]
+
+
+def test_journal_store_replays_journal_on_reload(tmp_path):
+    path = str(tmp_path / "carts.json")
+    store = JournalStore(path, indexes=("session_id",))
+    for number in range(3):
+        store.insert({'session_id': f"s{number}", 'items': []})
+    store.update(2, {'items': [1]})
+    store.delete(1)
+    # Noch kein Snapshot, alles steht im Journal
+    assert not (tmp_path / "carts.json").exists()
+
+    reloaded = JournalStore(path, indexes=("session_id",))
+    assert [record['id'] for record in reloaded.all()] == [2, 3]
+    assert reloaded.find('session_id', "s1")[0]['items'] == [1]
+    assert reloaded.insert({'session_id': "s3"})['id'] == 4
+
+    # Nur angehängte Zeilen werden im ersten Store nachgezogen
+    assert store.get(4)['session_id'] == "s3"
+
+
+def test_journal_store_ignores_torn_last_line(tmp_path):
+    path = str(tmp_path / "carts.json")
+    store = JournalStore(path)
+    store.insert({'session_id': "s0"})
+    # Absturz mitten im Schreiben der nächsten Zeile
+    with open(f"{path}.journal", 'a', encoding='utf-8') as f:
+        f.write('{"op":"insert","record":{"id":2,"sess')
+
+    reloaded = JournalStore(path)
+    assert [record['id'] for record in reloaded.all()] == [1]
+
+
+def test_journal_store_rollback_writes_nothing(tmp_path):
+    path = str(tmp_path / "carts.json")
+    store = JournalStore(path)
+    store.insert({'session_id': "s0"})
+    journal = (tmp_path / "carts.json.journal").read_bytes()
+
+    try:
+        with store.batch():
+            store.insert({'session_id': "s1"})
+            store.delete(1)
+            raise RuntimeError("Abbruch")
+    except RuntimeError:
+        pass
+
+    assert (tmp_path / "carts.json.journal").read_bytes() == journal
+    assert [record['session_id'] for record in store.all()] == ["s0"]
+    # Verworfene Einträge dürfen auch nicht mit dem nächsten Batch geschrieben werden
+    store.insert({'session_id': "s2"})
+    assert [record['session_id'] for record in JournalStore(path).all()] == ["s0", "s2"]
+
+
+def test_id_sequences_hand_out_disjoint_blocks(tmp_path):
+    path = str(tmp_path / "sequences.json")
+    first = IdSequences(path, block_size=5)
+    second = IdSequences(path, block_size=5)
+
+    ids = [first.next_id("orders"), second.next_id("orders"), first.next_id("orders")]
+    assert ids == [1, 6, 2]
+    ids += [sequences.next_id("orders") for sequences in (first, second) for _ in range(5)]
+    assert len(set(ids)) == len(ids)
+
+    # Nach einem Neustart geht es hinter allen reservierten Blöcken weiter
+    assert IdSequences(path, block_size=5).next_id("orders") == 21
+    # Bekannte höhere IDs werden übersprungen, andere Namen sind unabhängig
+    assert IdSequences(path).next_id("orders", floor=100) == 101
+    assert IdSequences(path).next_id("carts") == 1
+
+
+def test_stores_share_sequence_without_reusing_ids(tmp_path):
+    path = str(tmp_path / "orders.json")
+    first = JsonFileStore(path, sequences=IdSequences(str(tmp_path / "sequences.json")))
+    second = JsonFileStore(path, sequences=IdSequences(str(tmp_path / "sequences.json")))
+    ids = []
+    for _ in range(10):
+        ids.append(first.insert({})['id'])
+        ids.append(second.insert({})['id'])
+
+    assert len(set(ids)) == 20
+    assert sorted(record['id'] for record in JsonFileStore(path).all()) == sorted(ids)
+
+
+def test_sharded_store_reload_and_rollback(tmp_path):
+    directory = str(tmp_path / "carts")
+    carts = ShardedStore(directory, "session_id", num_shards=4, indexes=("session_id",))
+    created = [carts.insert({'session_id': f"s{number}", 'items': []}) for number in range(12)]
+    for record in created:
+        assert record['id'] % 4 == carts._shard_index(record['session_id'])
+
+    shard = carts.shard_for("s0")
+    try:
+        with shard.batch():
+            carts.update(created[0]['id'], {'items': [1]})
+            carts.insert({'session_id': "s0", 'items': []})
+            raise RuntimeError("Abbruch")
+    except RuntimeError:
+        pass
+    assert carts.get(created[0]['id'])['items'] == []
+    assert len(carts.find('session_id', "s0")) == 1
+
+    # Eine abweichende Shard-Anzahl wird beim erneuten Öffnen ignoriert
+    reopened = ShardedStore(directory, "session_id", num_shards=8, indexes=("session_id",))
+    assert reopened.num_shards == 4
+    assert sorted(record['id'] for record in reopened.all()) == sorted(record['id'] for record in created)
+    assert reopened.find('session_id', "s5")[0]['id'] == created[5]['id']
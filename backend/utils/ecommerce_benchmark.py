@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Benchmark für die Serialisierung von E-Commerce-Listen
+
+Vergleicht die Kosten pro Datensatz für den bisherigen Weg
+(Pydantic-Modell bauen, über das response_model erneut validieren,
+jsonable_encoder und json.dumps) mit dem schnellen Pfad
+(Projektion der gespeicherten Datensätze und direkte JSON-Kodierung).
+
+Aufruf aus dem backend-Verzeichnis:
+    python -m utils.ecommerce_benchmark [--items 1000] [--repeat 20]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from models.ecommerce import Product
+from services.ecommerce_serialization import dumps, orjson, projector
+
+
+def sample_products(count: int) -> List[Dict]:
+    """Erzeugt Produktdatensätze, wie sie im Store gespeichert sind"""
+    now = datetime.now().isoformat()
+    return [
+        {
+            'id': i + 1,
+            'sku': f"ART-{i:06d}",
+            'name': f"Testprodukt {i}",
+            'description': "Beschreibung " * 10,
+            'price': 9.99 + i % 100,
+            'cost_price': 5.0,
+            'inventory_level': i % 50,
+            'category_id': i % 20,
+            'tax_rate': 19.0,
+            'weight': 1.5,
+            'dimensions': "10 x 20 x 30",
+            'active': True,
+            'created_at': now,
+            'updated_at': None,
+            'image_urls': [f"/bilder/{i}.jpg"],
+            'tags': ["werkzeug", "garten"],
+        }
+        for i in range(count)
+    ]
+
+
+def validated_path(records: List[Dict]) -> bytes:
+    """Bisheriger Weg: Modell bauen, im response_model erneut validieren, kodieren"""
+    models = [Product(**record) for record in records]
+    validated = [Product.validate(model.dict()) for model in models]
+    return json.dumps(jsonable_encoder(validated)).encode('utf-8')
+
+
+def construct_path(records: List[Dict]) -> bytes:
+    """Modelle ohne Validierung bauen, dann kodieren"""
+    models = [Product.construct(**record) for record in records]
+    return dumps([model.dict() for model in models])
+
+
+def fast_path(records: List[Dict]) -> bytes:
+    """Schneller Pfad: Projektion auf die Modellfelder und direkte Kodierung"""
+    return dumps(projector(Product).project_all(records))
+
+
+def measure(func: Callable[[List[Dict]], bytes], records: List[Dict], repeat: int) -> float:
+    """Gibt die beste Zeit pro Datensatz in Mikrosekunden zurück"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(records)
+        best = min(best, time.perf_counter() - start)
+    return best / len(records) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serialisierung von Produktlisten messen")
+    parser.add_argument("--items", type=int, default=1000, help="Datensätze pro Liste")
+    parser.add_argument("--repeat", type=int, default=20, help="Wiederholungen je Variante")
+    args = parser.parse_args()
+
+    records = sample_products(args.items)
+    assert json.loads(fast_path(records)) == json.loads(validated_path(records))
+
+    print(f"{args.items} Produkte, bester Lauf aus {args.repeat}, JSON-Encoder: "
+          f"{'orjson' if orjson is not None else 'json'}")
+    baseline = measure(validated_path, records, args.repeat)
+    for label, func in (("Validierung + jsonable_encoder", validated_path),
+                        ("construct() ohne Validierung", construct_path),
+                        ("Projektion + direkte Kodierung", fast_path)):
+        per_item = baseline if func is validated_path else measure(func, records, args.repeat)
+        print(f"  {label:32s} {per_item:8.2f} µs/Datensatz  ({baseline / per_item:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()